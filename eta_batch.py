@@ -0,0 +1,65 @@
+# -*- coding: utf-8-unix -*-
+# Python 3.9
+
+# ETA-Analyzer (Batch)
+# Select sessions and run them in worker processes for eta_csv_processor.py and eta_csv_plotter.py
+
+
+# Modules
+## Built-in
+import sys
+import os
+import glob
+import concurrent.futures
+import traceback
+
+# Configs
+CompressedFileExtensions = [".gz", ".bz2", ".xz", ".zst"]
+
+# Global Variables
+
+# Functions
+def ListSourcePaths(source, patterns, recursive=False):
+    # A directory (searched recursively, e.g. csvout/) or a glob pattern selects many sessions, otherwise a single file
+    if os.path.isdir(source):
+        searchDir = os.path.join(source, "**") if recursive else source
+        return sorted(path for pattern in patterns for path in glob.glob(os.path.join(searchDir, pattern), recursive=recursive))
+    if glob.has_magic(source):
+        return sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+    return [source]
+
+def IsBatchSource(source):
+    return os.path.isdir(source) or glob.has_magic(source)
+
+def CreateIdentifierFrom(sourcePath, suffix=""):
+    # File name without compression and file extensions, and without suffix
+    fileName = os.path.basename(sourcePath)
+    if os.path.splitext(fileName)[1].lower() in CompressedFileExtensions:
+        fileName = os.path.splitext(fileName)[0]
+    identifierString = os.path.splitext(fileName)[0]
+    if suffix and identifierString.endswith(suffix):
+        identifierString = identifierString[:-len(suffix)]
+    return identifierString
+
+def RunSessions(runSession, sourcePaths, identifiers, outputDir, mainArgs, jobs, verb):
+    # runSession(identifierString, sourcePath, outputDir, mainArgs) runs in a worker process
+    # and returns the traceback of an error instead of stopping the batch
+    failedSessions = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(runSession, identifierString, sourcePath, outputDir, mainArgs): (identifierString, sourcePath)
+                   for identifierString, sourcePath in zip(identifiers, sourcePaths)}
+        for future in concurrent.futures.as_completed(futures):
+            identifierString, sourcePath = futures[future]
+            try:
+                errorString = future.result()
+            except Exception:
+                # The worker itself died (e.g. killed by the OS)
+                errorString = traceback.format_exc()
+            if errorString is None:
+                print("Succeeded: " + identifierString + " (" + sourcePath + ")")
+            else:
+                print("Failed: " + identifierString + " (" + sourcePath + ")\n" + errorString, file=sys.stderr)
+                failedSessions.append(identifierString)
+    print(verb + " " + str(len(sourcePaths)) + " sessions: "
+          + str(len(sourcePaths) - len(failedSessions)) + " succeeded, " + str(len(failedSessions)) + " failed")
+    return failedSessions
@@ -0,0 +1,334 @@
+# -*- coding: utf-8-unix -*-
+# Python 3.9
+
+# ETA-Analyzer (Benchmark)
+# Measure rows/s and peak memory of each stage of eta_csv_processor.py
+# and each figure of eta_csv_plotter.py on raw csv files via eta_data_generator.py
+# Results depend on the machine, so no baseline is shipped: save one on the target machine and compare later runs with it
+#   python eta_benchmark.py --save-baseline benchmark_baseline.json
+#   python eta_benchmark.py --compare benchmark_baseline.json
+
+
+# Modules
+## Built-in
+import sys
+import os
+import argparse
+import json
+import time
+import platform
+import subprocess
+## Local
+from eta_resource_usage import ReadPeakRSSMegabytes, ReadMaxRSSMegabytes, ReadCPUSeconds
+
+# Configs
+BenchmarkSizes = ["10k", "100k", "1M", "10M", "50M"]
+ProcessorStages = ["filter", "categorize", "interpolate", "process", "all"]
+PlotterFigures = ["load", "summary",
+                  "fixation_time_summary", "fixated_category_time_series", "lfhf_summary",
+                  "lfhf_time_series", "fixated_category_and_lfhf_time_series",
+                  "startup_help", "startup_lfhf_summary"]
+RegressionThreshold = 0.1
+## Raw csv files of --compare-engines: ratio of aria-labels written as quoted fields
+EngineComparisonInputs = {"plain": 0.0, "quoted": 0.3}
+## --rss-sweep: allowed peak RSS growth of each stage from the smallest to the largest size, as stages stream rows
+RSSSweepAllowedGrowth = 0.2
+
+# Global Variables
+
+# Functions
+def CreateStagePaths(workDir):
+    return {
+        "raw": os.path.join(workDir, "raw.csv"),
+        "filter": os.path.join(workDir, "step_1_filtered_rows.csv"),
+        "categorize": os.path.join(workDir, "step_2_categorized.csv"),
+        "interpolate": os.path.join(workDir, "step_3_interpolated_lfhf.csv"),
+        "process": os.path.join(workDir, "step_4_processed_lfhf.csv"),
+        "all": os.path.join(workDir, "all_step_4_processed_lfhf.csv"),
+        "figures": os.path.join(workDir, "figures")
+    }
+
+## Run one measurement in this (child) process
+def RunProcessorStage(stage, paths, encoding, engine, lfhfEngine):
+    import eta_csv_processor as processor
+    if stage == "filter":
+        processor.FilterRows(paths["raw"], encoding, paths["filter"], encoding, engine)
+    elif stage == "categorize":
+        processor.Categorize(paths["filter"], encoding, processor.FilteredCsvColumns,
+                             paths["categorize"], encoding, processor.AriaLabelCategories)
+    elif stage == "interpolate":
+        processor.InterpolateLFHF(paths["categorize"], encoding, processor.CategorizedCsvColumns,
+                                  paths["interpolate"], encoding, False, lfhfEngine)
+    elif stage == "process":
+        processor.ProcessLFHF(paths["interpolate"], encoding, processor.InterpolatedCsvColumns,
+                              paths["process"], encoding, lfhfEngine)
+    elif stage == "all":
+        processor.ProcessAllStages(paths["raw"], encoding,
+                                   paths["filter"], processor.FilteredCsvColumns,
+                                   paths["categorize"], processor.CategorizedCsvColumns,
+                                   paths["interpolate"], processor.InterpolatedCsvColumns,
+                                   paths["all"], encoding,
+                                   processor.AriaLabelCategories, False, False,
+                                   engine, lfhfEngine)
+
+def PreparePlotterFigure(figure, paths, encoding):
+    # Returns the function to time: data is loaded beforehand, except for "load" itself
+    if figure.startswith("startup_"):
+        # The whole plotter process (imports, --help or a single figure via --figures),
+        # as called by tools rendering one figure at a time
+        plotterPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eta_csv_plotter.py")
+        plotterArgs = ["--help"] if figure == "startup_help" else [paths["process"], "-e", encoding, "-i", "startup",
+                                                                   "-d", paths["figures"], "--figures", figure[len("startup_"):]]
+        return lambda: subprocess.run([sys.executable, plotterPath] + plotterArgs, stdout=subprocess.DEVNULL, check=True)
+    import eta_csv_plotter as plotter
+    if figure == "load":
+        return lambda: plotter.CreateDataFrameFrom(paths["process"], encoding, plotter.ColumnsToPlot)
+    df = plotter.CreateDataFrameFrom(paths["process"], encoding, plotter.ColumnsToPlot)
+    if figure == "summary":
+        return lambda: plotter.CreateCategorySummary(df)
+    plotter.ImportPlotModules()
+    plotter.mpl.use("Agg")
+    plotStyle = plotter.CreatePlotStyle([8, 6], 300.0, False)
+    figureData = {"processed": df, "summary": plotter.CreateCategorySummary(df)}
+    processFigures = {
+        "fixation_time_summary": (plotter.ProcessFixationTimeSummary, "summary"),
+        "fixated_category_time_series": (plotter.ProcessFixatedCategoryTimeSeries, "processed"),
+        "lfhf_summary": (plotter.ProcessLFHFSummary, "summary"),
+        "lfhf_time_series": (plotter.ProcessLFHFTimeSeries, "processed"),
+        "fixated_category_and_lfhf_time_series": (plotter.ProcessFixatedCategoryAndLFHFTimeSeries, "processed")
+    }
+    processFigure, figureDataName = processFigures[figure]
+    os.makedirs(paths["figures"], exist_ok=True)
+    figurePath = os.path.join(paths["figures"], figure + ".png")
+    return lambda: processFigure("benchmark", figureData[figureDataName], figurePath, plotStyle)
+
+def RunMeasurement(measurement):
+    # Prints one json line: wall seconds, cpu seconds and peak RSS of this process
+    paths = CreateStagePaths(measurement["workDir"])
+    sys.stdout = open(os.devnull, mode="w")
+    if measurement["component"] == "processor":
+        run = lambda: RunProcessorStage(measurement["name"], paths, measurement["encoding"],
+                                        measurement["engine"], measurement["lfhfEngine"])
+    else:
+        run = PreparePlotterFigure(measurement["name"], paths, measurement["encoding"])
+    startedTime = time.perf_counter()
+    startedCPUTime = time.process_time()
+    run()
+    seconds = time.perf_counter() - startedTime
+    cpuSeconds = time.process_time() - startedCPUTime
+    sys.stdout = sys.__stdout__
+    peakRSSMB = ReadPeakRSSMegabytes()
+    if measurement["name"].startswith("startup_"):
+        # The plotter ran in a child process
+        cpuSeconds = ReadCPUSeconds(children=True)
+        peakRSSMB = ReadMaxRSSMegabytes(children=True)
+    print(json.dumps({"seconds": seconds, "cpuSeconds": cpuSeconds, "peakRSSMB": peakRSSMB}))
+
+## Run measurements in child processes, so that peak RSS is per measurement
+def Measure(measurement, repeat):
+    # Best of repeat runs
+    results = []
+    for _ in range(repeat):
+        completedProcess = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-one", json.dumps(measurement)],
+                                          stdout=subprocess.PIPE, check=True, text=True)
+        results.append(json.loads(completedProcess.stdout.strip().splitlines()[-1]))
+    best = min(results, key=lambda result: result["seconds"])
+    # Peak RSS is None where it cannot be read (Windows)
+    peakRSSMBs = [result["peakRSSMB"] for result in results if result["peakRSSMB"] is not None]
+    best["peakRSSMB"] = max(peakRSSMBs) if peakRSSMBs else None
+    best["rowsPerSecond"] = measurement["rows"] / best["seconds"] if best["seconds"] > 0 else float("inf")
+    return best
+
+def PrepareRawCsv(workDir, rows, encoding, seed, quotedRatio=0.0):
+    import eta_data_generator as generator
+    rawCsvPath = CreateStagePaths(workDir)["raw"]
+    if not os.path.exists(rawCsvPath):
+        os.makedirs(workDir, exist_ok=True)
+        generator.GenerateRawCsv(rawCsvPath, encoding, rows, seed=seed, quotedRatio=quotedRatio)
+
+def RunBenchmarks(sizes, components, workDir, encoding, engine, lfhfEngine, repeat, seed):
+    import eta_data_generator as generator
+    results = {}
+    for size in sizes:
+        rows = generator.ParseRowCount(size)
+        sizeWorkDir = os.path.abspath(os.path.join(workDir, size))
+        PrepareRawCsv(sizeWorkDir, rows, encoding, seed)
+        measurements = []
+        if "processor" in components:
+            measurements += [("processor", stage) for stage in ProcessorStages]
+        if "plotter" in components:
+            if "processor" not in components:
+                # Figures need the step 4 csv file
+                measurements = [("processor", stage) for stage in ["filter", "categorize", "interpolate", "process"]]
+            measurements += [("plotter", figure) for figure in PlotterFigures]
+        results[size] = {}
+        for component, name in measurements:
+            measurement = {"component": component, "name": name, "workDir": sizeWorkDir, "rows": rows,
+                           "encoding": encoding, "engine": engine, "lfhfEngine": lfhfEngine}
+            result = Measure(measurement, repeat)
+            if component in components:
+                results[size][component + ":" + name] = result
+                PrintResult(size, component + ":" + name, result)
+    return results
+
+def RunEngineComparison(sizes, workDir, encoding, engines, lfhfEngine, repeat, seed):
+    # All stages with each engine; processed csv files must not differ from those of the first engine
+    import eta_data_generator as generator
+    from eta_csv_processor import HashFile
+    results = {}
+    mismatches = []
+    for size in sizes:
+        rows = generator.ParseRowCount(size)
+        results[size] = {}
+        for inputName, quotedRatio in EngineComparisonInputs.items():
+            inputWorkDir = os.path.abspath(os.path.join(workDir, size if quotedRatio == 0 else size + "-" + inputName))
+            PrepareRawCsv(inputWorkDir, rows, encoding, seed, quotedRatio)
+            firstHash = None
+            for engine in engines:
+                measurement = {"component": "processor", "name": "all", "workDir": inputWorkDir, "rows": rows,
+                               "encoding": encoding, "engine": engine, "lfhfEngine": lfhfEngine}
+                result = Measure(measurement, repeat)
+                key = "engine:" + inputName + ":" + engine
+                results[size][key] = result
+                PrintResult(size, key, result)
+                processedHash = HashFile(CreateStagePaths(inputWorkDir)["all"])
+                firstHash = firstHash or processedHash
+                if processedHash != firstHash:
+                    print("%-6s %-50s output differs from %s" % (size, key, engines[0]))
+                    mismatches.append(size + " " + key)
+    return results, mismatches
+
+def RunRSSSweep(sizes, workDir, encoding, engine, lfhfEngine, repeat, seed):
+    # Each processor stage over all sizes; peak RSS must stay flat instead of growing with rows
+    import eta_data_generator as generator
+    sizes = sorted(sizes, key=generator.ParseRowCount)
+    results = RunBenchmarks(sizes, ["processor"], workDir, encoding, engine, lfhfEngine, repeat, seed)
+    growingStages = []
+    for stage in ProcessorStages:
+        key = "processor:" + stage
+        smallestRSSMB = results[sizes[0]][key]["peakRSSMB"]
+        largestRSSMB = results[sizes[-1]][key]["peakRSSMB"]
+        if smallestRSSMB is None or largestRSSMB is None:
+            print("%-6s %-50s peak RSS not available" % (sizes[0] + "-" + sizes[-1], key))
+            continue
+        growth = largestRSSMB / smallestRSSMB - 1.0
+        isGrowing = growth > RSSSweepAllowedGrowth
+        print("%-6s %-50s peak RSS %.1f MB -> %.1f MB (%+.0f%%)%s" % (sizes[0] + "-" + sizes[-1], key, smallestRSSMB, largestRSSMB,
+                                                                   growth * 100, "  GROWING" if isGrowing else ""))
+        if isGrowing:
+            growingStages.append(key)
+    return results, growingStages
+
+def PrintResult(size, key, result):
+    peakRSSString = "%9.1f MB" % result["peakRSSMB"] if result["peakRSSMB"] is not None else "%9s MB" % "-"
+    print("%-6s %-50s %9.3f s %12.0f rows/s %s" % (size, key, result["seconds"], result["rowsPerSecond"], peakRSSString))
+    sys.stdout.flush()
+
+def CreateEnvironment(engine, lfhfEngine):
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "engine": engine,
+        "lfhfEngine": lfhfEngine
+    }
+
+def CompareWithBaseline(results, baseline, threshold):
+    # Regression: rows/s drops or peak RSS grows by more than threshold
+    regressions = []
+    for size, sizeResults in results.items():
+        for key, result in sizeResults.items():
+            baselineResult = baseline["results"].get(size, {}).get(key)
+            if baselineResult is None:
+                continue
+            speedRatio = result["rowsPerSecond"] / baselineResult["rowsPerSecond"]
+            memoryRatio = (result["peakRSSMB"] / baselineResult["peakRSSMB"]
+                           if result["peakRSSMB"] is not None and baselineResult["peakRSSMB"] is not None else 1.0)
+            isRegression = speedRatio < 1.0 - threshold or memoryRatio > 1.0 + threshold
+            print("%-6s %-50s speed x%.2f  memory x%.2f%s" % (size, key, speedRatio, memoryRatio,
+                                                              "  REGRESSION" if isRegression else ""))
+            if isRegression:
+                regressions.append(size + " " + key)
+    return regressions
+
+
+# Main Function
+def Main(sizes, components, workDir, encoding, engine, lfhfEngine, repeat, seed,
+         saveBaselinePath, comparePath, threshold, comparedEngines, rssSweep):
+    mismatches = []
+    growingStages = []
+    if comparedEngines is not None:
+        results, mismatches = RunEngineComparison(sizes, workDir, encoding, comparedEngines, lfhfEngine, repeat, seed)
+    elif rssSweep:
+        results, growingStages = RunRSSSweep(sizes, workDir, encoding, engine, lfhfEngine, repeat, seed)
+    else:
+        results = RunBenchmarks(sizes, components, workDir, encoding, engine, lfhfEngine, repeat, seed)
+    report = {"environment": CreateEnvironment(engine, lfhfEngine), "results": results}
+    if saveBaselinePath is not None:
+        with open(saveBaselinePath, mode="w", encoding="utf_8") as baselineFile:
+            json.dump(report, baselineFile, indent=2)
+        print("Successfully saved: " + saveBaselinePath)
+    if comparePath is not None:
+        with open(comparePath, mode="r", encoding="utf_8") as baselineFile:
+            baseline = json.load(baselineFile)
+        regressions = CompareWithBaseline(results, baseline, threshold)
+        if regressions:
+            print(str(len(regressions)) + " regressions over " + str(threshold * 100) + "% against " + comparePath)
+            return 1
+    if mismatches:
+        print(str(len(mismatches)) + " engines with outputs differing from " + comparedEngines[0])
+        return 1
+    if growingStages:
+        print(str(len(growingStages)) + " stages with peak RSS growing over " + str(RSSSweepAllowedGrowth * 100) + "% across sizes")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--run-one":
+        RunMeasurement(json.loads(sys.argv[2]))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="ETA-Analyzer: Benchmark",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("-s", "--sizes", type=str, default=",".join(BenchmarkSizes),
+                        help="Comma separated row counts of generated raw csv files \n(e.g. 10k,100k for a quick run) \n (default: " + ",".join(BenchmarkSizes) + ")")
+    parser.add_argument("-c", "--components", type=str, default="processor,plotter",
+                        help="Comma separated components to measure \n (default: processor,plotter)")
+    parser.add_argument("-d", "--work-dir", type=str, default="benchout",
+                        help="Directory for generated and processed csv files, \nreused across runs \n (default: benchout)")
+    parser.add_argument("-e", "--encoding", type=str, choices=["utf_8", "shift_jis"], default="shift_jis",
+                        help="Encoding of all csv files \n (default: shift_jis)")
+    parser.add_argument("--engine", type=str, default="python",
+                        help="--engine of eta_csv_processor.py \n (default: python)")
+    parser.add_argument("--lfhf-engine", type=str, default="python",
+                        help="--lfhf-engine of eta_csv_processor.py \n (default: python)")
+    parser.add_argument("-r", "--repeat", type=int, default=1,
+                        help="Runs per measurement, the fastest is reported \n (default: 1)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of generated raw csv files \n (default: 0)")
+    parser.add_argument("--save-baseline", type=str, default=None,
+                        help="Save results as a baseline json file \n(e.g. benchmark_baseline.json, created on the machine to compare on)")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="Compare results with a baseline json file saved by --save-baseline \nwith the same sizes, and exit with 1 on regressions")
+    parser.add_argument("-t", "--threshold", type=float, default=RegressionThreshold,
+                        help="Allowed slowdown / memory growth against the baseline \n (default: " + str(RegressionThreshold) + ")")
+    parser.add_argument("--compare-engines", type=str, default=None,
+                        help="Comma separated --engine values to run all stages with instead, \non raw csv files with and without quoted aria-labels, \nand exit with 1 when processed csv files differ \n(e.g. python,csv,pandas,pyarrow)")
+    parser.add_argument("--rss-sweep", action="store_true",
+                        help="Run processor stages over --sizes instead, \nand exit with 1 when peak RSS of a stage grows \nby more than " + str(RSSSweepAllowedGrowth * 100) + "%% from the smallest to the largest size \n(e.g. -s 10k,1M --rss-sweep)")
+    args = parser.parse_args()
+    components = args.components.split(",")
+    if not set(components) <= {"processor", "plotter"}:
+        parser.error("--components takes processor and/or plotter")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.rss_sweep and len(args.sizes.split(",")) < 2:
+        parser.error("--rss-sweep needs at least 2 sizes")
+    if args.rss_sweep and args.compare_engines is not None:
+        parser.error("--rss-sweep and --compare-engines cannot be used together")
+    comparedEngines = args.compare_engines.split(",") if args.compare_engines is not None else None
+
+    sys.exit(Main(args.sizes.split(","), components, args.work_dir, args.encoding, args.engine, args.lfhf_engine,
+                  args.repeat, args.seed, args.save_baseline, args.compare, args.threshold, comparedEngines,
+                  args.rss_sweep))
@@ -11,220 +11,484 @@ import sys
 import os
 import argparse
 import datetime
-## Additional
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
-import seaborn as sns
+import concurrent.futures
+import traceback
+import functools
+import json
+import time
+import cProfile
+## Additional (imported via ImportDataModules only when data is loaded, so --help starts fast)
+pd = None
+np = None
+## Additional (imported via ImportPlotModules only when figures are rendered)
+mpl = None
+plt = None
+sns = None
+## Local
+from eta_batch import CompressedFileExtensions, ListSourcePaths, IsBatchSource, CreateIdentifierFrom, RunSessions
+from eta_resource_usage import ReadPeakRSSMegabytes
 
 # Configs
+ProcessedFileSuffix = "_step_4_processed_lfhf"
+ProcessedFilePatterns = (["*" + ProcessedFileSuffix + ".csv", "*" + ProcessedFileSuffix + ".parquet", "*" + ProcessedFileSuffix + ".feather"]
+                         + ["*" + ProcessedFileSuffix + ".csv" + extension for extension in CompressedFileExtensions])
+SummaryFormats = ["csv", "json"]
+FixationTimePercentiles = [25, 75, 90, 95]
 
 # Global Variables
 Colormaps = ["Dark2", "tab10"]
+ColumnsToPlot = ["Category", "AppTime", "TimeSpan", "LFHF(Element)", "LFHF(Element:Delta)"]
+ColumnsToSummarize = ["Category", "TimeSpan", "LFHF(Element)", "LFHF(Element:Delta)"]
+## Columns read for each figure ("summary" figures use the category summary)
+FigureColumns = {
+    "fixation_time_summary": ColumnsToSummarize,
+    "fixated_category_time_series": ["Category", "AppTime", "TimeSpan"],
+    "lfhf_summary": ColumnsToSummarize,
+    "lfhf_time_series": ["AppTime", "LFHF(Element)"],
+    "fixated_category_and_lfhf_time_series": ["Category", "AppTime", "TimeSpan", "LFHF(Element)"]
+}
+FigureNames = list(FigureColumns.keys())
+SummaryFigureNames = ["fixation_time_summary", "lfhf_summary"]
+## Figures drawing fixation intervals with the seaborn palette
+SeabornFigureNames = ["fixated_category_time_series", "fixated_category_and_lfhf_time_series"]
+PlotMarginFor4PlotsWithXCategories = {
+    "figure.subplot.left": 0.08,
+    "figure.subplot.right": 0.95,
+    "figure.subplot.bottom": 0.15,
+    "figure.subplot.top": 0.95,
+    "figure.subplot.wspace": 0.15,
+    "figure.subplot.hspace": 0.6
+}
+PlotMarginFor1PlotWithXTime = {
+    "figure.subplot.left": 0.10,
+    "figure.subplot.right": 0.95,
+    "figure.subplot.bottom": 0.11,
+    "figure.subplot.top": 0.93,
+    "figure.subplot.wspace": 0.2,
+    "figure.subplot.hspace": 0.2
+}
+PlotMarginFor1PlotWithXTimeYCategories = {
+    "figure.subplot.left": 0.23,
+    "figure.subplot.right": 0.90,
+    "figure.subplot.bottom": 0.11,
+    "figure.subplot.top": 0.93,
+    "figure.subplot.wspace": 0.2,
+    "figure.subplot.hspace": 0.2
+}
+## Set in worker processes rendering figures concurrently
+FigureWorkerData = None
 
 # Functions
-def CreateDataFrameFrom(csvPath, csvEncoding):
-    dataFrame = pd.read_csv(csvPath, encoding=csvEncoding)
+def CreateDataFrameFrom(processedPath, csvEncoding, columns=None):
+    ImportDataModules()
+    # A processed table in memory (DataFrame or dict of arrays, e.g. via SessionProcessor of eta_csv_processor.py)
+    if not isinstance(processedPath, (str, os.PathLike)):
+        if columns is None:
+            return pd.DataFrame(processedPath)
+        return pd.DataFrame({column: processedPath[column] for column in columns})
+    if processedPath == "-":
+        return pd.read_csv(sys.stdin.buffer, encoding=csvEncoding, usecols=columns)
+    # Columnar files written via eta_csv_processor.py -F parquet/feather,
+    # csv files are decompressed by pandas by extension (.gz/.bz2/.xz/.zst)
+    extension = os.path.splitext(processedPath)[1].lower()
+    if extension == ".parquet":
+        dataFrame = pd.read_parquet(processedPath, columns=columns)
+    elif extension == ".feather":
+        dataFrame = pd.read_feather(processedPath, columns=columns)
+    else:
+        dataFrame = pd.read_csv(processedPath, encoding=csvEncoding, usecols=columns)
     return dataFrame
 
-def SetPlotMarginFor4PlotsWithXCategories():
-    plt.rcParams["figure.subplot.left"] = 0.08
-    plt.rcParams["figure.subplot.right"] = 0.95
-    plt.rcParams["figure.subplot.bottom"] = 0.15
-    plt.rcParams["figure.subplot.top"] = 0.95
-    plt.rcParams["figure.subplot.wspace"] = 0.15
-    plt.rcParams["figure.subplot.hspace"] = 0.6
-
-def SetPlotMarginFor1PlotWithXTime():
-    plt.rcParams["figure.subplot.left"] = 0.10
-    plt.rcParams["figure.subplot.right"] = 0.95
-    plt.rcParams["figure.subplot.bottom"] = plt.rcParamsDefault["figure.subplot.bottom"]
-    plt.rcParams["figure.subplot.top"] = 0.93
-    plt.rcParams["figure.subplot.wspace"] = plt.rcParamsDefault["figure.subplot.wspace"]
-    plt.rcParams["figure.subplot.hspace"] = plt.rcParamsDefault["figure.subplot.hspace"]
-
-def SetPlotMarginFor1PlotWithXTimeYCategories():
-    plt.rcParams["figure.subplot.left"] = 0.23
-    plt.rcParams["figure.subplot.right"] = 0.90
-    plt.rcParams["figure.subplot.bottom"] = plt.rcParamsDefault["figure.subplot.bottom"]
-    plt.rcParams["figure.subplot.top"] = 0.93
-    plt.rcParams["figure.subplot.wspace"] = plt.rcParamsDefault["figure.subplot.wspace"]
-    plt.rcParams["figure.subplot.hspace"] = plt.rcParamsDefault["figure.subplot.hspace"]
-
-
-def ProcessFixationTimeSummary(identifier, df, figurePath):
-    #print(df.columns)
-    dfPivotSum = pd.pivot_table(df, index="Category", values="TimeSpan", margins=False, aggfunc=np.sum)
-    dfPivotSum = dfPivotSum.rename(columns={"TimeSpan": "Total fixation time"})
-    dfPivotSumSorted = dfPivotSum.sort_values("Total fixation time", ascending=False)
-
-    dfPivotMean = pd.pivot_table(df, index="Category", values="TimeSpan", margins=False, aggfunc=np.mean)
-    dfPivotMean = dfPivotMean.rename(columns={"TimeSpan": "Mean fixation time"})
-    dfPivotMeanSorted = dfPivotMean.sort_values("Mean fixation time", ascending=False)
-
-    SetPlotMarginFor4PlotsWithXCategories()
-    currentFigSize = list(plt.rcParams["figure.figsize"])
-    multiFigSize = [currentFigSize[0] * 2, currentFigSize[1] * 2]
-    fig, axes = plt.subplots(nrows=2, ncols=2, figsize=tuple(multiFigSize))
-    dfPivotSum.plot(ax=axes[0, 0],
-                    kind="bar", title="Total fixation time by categories (" + identifier + ")", legend=None, grid=True,
-                    xlabel="Category of elements in HTML", ylabel="Total fixation time [ms]", colormap=Colormaps[0])
-    dfPivotSumSorted.plot(ax=axes[1, 0],
-                          kind="bar", title="Sorted total fixation time by categories (" + identifier + ")", legend=None, grid=True,
-                          xlabel="Category of elements in HTML", ylabel="Total fixation time [ms]", colormap=Colormaps[0])
-    dfPivotMean.plot(ax=axes[0, 1],
-                     kind="bar", title="Mean fixation time by categories (" + identifier + ")", legend=None, grid=True,
-                     xlabel="Category of elements in HTML", ylabel="Mean fixation time [ms]", colormap=Colormaps[1])
-    dfPivotMeanSorted.plot(ax=axes[1, 1],
-                           kind="bar", title="Sorted mean fixation time by categories (" + identifier + ")", legend=None, grid=True,
-                           xlabel="Category of elements in HTML", ylabel="Mean fixation time [ms]", colormap=Colormaps[1])
-    plt.savefig(figurePath)
+def ImportDataModules():
+    global pd, np
+    import pandas as pd
+    import numpy as np
+
+def ImportPlotModules(withSeaborn=True):
+    # matplotlib and seaborn are slow to import and not needed for --stats-only,
+    # seaborn only for the figures in SeabornFigureNames
+    global mpl, plt, sns
+    import matplotlib as mpl
+    import matplotlib.pyplot as plt
+    if withSeaborn:
+        import seaborn as sns
+
+def CreatePlotStyle(outputSize, outputDpi, outputGridDisable):
+    # Passed to every figure and applied via plt.rc_context (global rcParams are never changed)
+    return {
+        "figure.figsize": outputSize,
+        "figure.dpi": outputDpi,
+        "grid.alpha": 0.0 if outputGridDisable else 0.3,
+        "grid.color": "gray",
+        "grid.linestyle": "dotted"
+    }
+
+
+## Per-category metrics in a single grouped aggregation
+def CreateCategorySummary(df):
+    groupedByCategory = df.groupby("Category", observed=True)
+    dfSummary = groupedByCategory.agg(FixationCount=("TimeSpan", "count"),
+                                      TotalFixationTime=("TimeSpan", "sum"),
+                                      MeanFixationTime=("TimeSpan", "mean"),
+                                      MedianFixationTime=("TimeSpan", "median"),
+                                      TotalLFHFDelta=("LFHF(Element:Delta)", "sum"),
+                                      MeanLFHF=("LFHF(Element)", "mean"))
+    dfPercentiles = groupedByCategory["TimeSpan"].quantile([p / 100.0 for p in FixationTimePercentiles]).unstack()
+    dfPercentiles.columns = ["FixationTimeP" + str(p) for p in FixationTimePercentiles]
+    return dfSummary.join(dfPercentiles)
+
+def WriteCategorySummary(dfSummary, summaryPath, summaryFormat, csvEncoding):
+    if summaryFormat == "json":
+        dfSummary.reset_index().to_json(summaryPath, orient="records", force_ascii=False, indent=2)
+    else:
+        dfSummary.to_csv(summaryPath, encoding=csvEncoding)
+    print("Successfully saved: " + summaryPath)
+
+def ProcessFixationTimeSummary(identifier, dfSummary, figurePath, plotStyle):
+    dfSum = dfSummary[["TotalFixationTime"]].rename(columns={"TotalFixationTime": "Total fixation time"})
+    dfSumSorted = dfSum.sort_values("Total fixation time", ascending=False)
+
+    # Categories without fixations have no mean
+    dfMean = dfSummary[["MeanFixationTime"]].dropna().rename(columns={"MeanFixationTime": "Mean fixation time"})
+    dfMeanSorted = dfMean.sort_values("Mean fixation time", ascending=False)
+
+    with plt.rc_context(plotStyle), plt.rc_context(PlotMarginFor4PlotsWithXCategories):
+        currentFigSize = list(plt.rcParams["figure.figsize"])
+        multiFigSize = [currentFigSize[0] * 2, currentFigSize[1] * 2]
+        fig, axes = plt.subplots(nrows=2, ncols=2, figsize=tuple(multiFigSize))
+        dfSum.plot(ax=axes[0, 0],
+                   kind="bar", title="Total fixation time by categories (" + identifier + ")", legend=None, grid=True,
+                   xlabel="Category of elements in HTML", ylabel="Total fixation time [ms]", colormap=Colormaps[0])
+        dfSumSorted.plot(ax=axes[1, 0],
+                         kind="bar", title="Sorted total fixation time by categories (" + identifier + ")", legend=None, grid=True,
+                         xlabel="Category of elements in HTML", ylabel="Total fixation time [ms]", colormap=Colormaps[0])
+        dfMean.plot(ax=axes[0, 1],
+                    kind="bar", title="Mean fixation time by categories (" + identifier + ")", legend=None, grid=True,
+                    xlabel="Category of elements in HTML", ylabel="Mean fixation time [ms]", colormap=Colormaps[1])
+        dfMeanSorted.plot(ax=axes[1, 1],
+                          kind="bar", title="Sorted mean fixation time by categories (" + identifier + ")", legend=None, grid=True,
+                          xlabel="Category of elements in HTML", ylabel="Mean fixation time [ms]", colormap=Colormaps[1])
+        plt.savefig(figurePath)
     plt.close("all")
     print("Successfully saved: " + figurePath)
 
-def CreateDataFrameForCategorizedPlotFrom(df):
-    #print(df.columns)
-    # > ["#", "Event", "Category", "AppTime", "X", "Y", "AriaLabel", "TimeSpan", "LFHF(Element)", "LFHF(Element:Delta)"]
-    dfFiltered = df.drop(["#", "Event", "X", "Y", "AriaLabel", "TimeSpan", "LFHF(Element)", "LFHF(Element:Delta)"], axis=1)
-    #print(dfFiltered.columns)
-    # > ["Category", "AppTime"]
-
-    dfIndexed = dfFiltered.set_index("AppTime", drop=True)
-    dfIndexed = dfIndexed[~dfIndexed.index.duplicated(keep="first")]
-    #print(dfIndexed.head())
-
-    dfFilled = dfIndexed.reindex(index=range(dfIndexed.index.to_series().min(),
-                                             dfIndexed.index.to_series().max(),
-                                             1000),
-                                 method="ffill")
-
-    convertMillSecToSec = lambda t: round(t / 1000.0)
-    dfFilled["AppTimeSec"] = dfFilled.index.to_series().apply(convertMillSecToSec)
-    #print(dfFilled.head())
-
-    return dfFilled
-
-def ProcessFixatedCategoryTimeSeries(identifier, df, figurePath):
-    dfForCategories = CreateDataFrameForCategorizedPlotFrom(df)
-
-    SetPlotMarginFor1PlotWithXTimeYCategories()
-    plt.title("Fixated categories (" + identifier + ")")
-    sp = sns.stripplot(data=dfForCategories, x=dfForCategories["AppTimeSec"], y=dfForCategories["Category"],
-                       order=sorted(dfForCategories["Category"].unique().tolist()),
-                       marker="s", size=2.5, jitter=0.0, palette=sns.color_palette("bright"), rasterized=True)
-    sp.set(xlabel="Time [s]",
+def CreateFixationIntervalTableFrom(df):
+    # One row per fixation from the FixationEnded rows,
+    # which carry the category and the time span since FixationStarted
+    dfEnded = df.loc[df["TimeSpan"].notna() & df["Category"].notna(), ["Category", "AppTime", "TimeSpan"]]
+    dfIntervals = pd.DataFrame({
+        "Category": dfEnded["Category"].astype(str),
+        "Start": (dfEnded["AppTime"] - dfEnded["TimeSpan"]) / 1000.0,
+        "End": dfEnded["AppTime"] / 1000.0
+    })
+    return dfIntervals.reset_index(drop=True)
+
+def MergeIntervalsCloserThan(starts, ends, minimumGap):
+    # Intervals (sorted by start) separated by less than minimumGap become one,
+    # so no more bars are drawn than the axes has pixels
+    if len(starts) == 0:
+        return starts, ends
+    coveredEnds = np.maximum.accumulate(ends)
+    isNewInterval = np.empty(len(starts), dtype=bool)
+    isNewInterval[0] = True
+    isNewInterval[1:] = (starts[1:] - coveredEnds[:-1]) >= minimumGap
+    firstIndices = np.flatnonzero(isNewInterval)
+    return starts[firstIndices], np.maximum.reduceat(ends, firstIndices)
+
+def DrawFixationIntervals(ax, dfIntervals):
+    # Drawing cost scales with the number of fixations (at most one bar per pixel), not with session length
+    categories = sorted(dfIntervals["Category"].unique().tolist())
+    palette = sns.color_palette("bright")
+    intervalsByCategory = dict(tuple(dfIntervals.groupby("Category", sort=False)))
+    axesWidthPixels = max(ax.get_window_extent().width, 1.0)
+    secondsPerPixel = (dfIntervals["End"].max() - dfIntervals["Start"].min()) / axesWidthPixels if len(dfIntervals) > 0 else 0.0
+    for categoryIndex, category in enumerate(categories):
+        dfCategory = intervalsByCategory[category].sort_values("Start")
+        starts, ends = MergeIntervalsCloserThan(dfCategory["Start"].to_numpy(dtype=float),
+                                                dfCategory["End"].to_numpy(dtype=float),
+                                                secondsPerPixel)
+        ax.broken_barh(np.column_stack([starts, ends - starts]), (categoryIndex - 0.4, 0.8),
+                       facecolors=palette[categoryIndex % len(palette)], rasterized=True)
+    ax.set_yticks(range(len(categories)))
+    ax.set_yticklabels(categories)
+    ax.set_ylim(len(categories) - 0.5, -0.5)
+    ax.set(xlabel="Time [s]",
            ylabel="Category of elements in HTML")
-    plt.savefig(figurePath)
+
+def ProcessFixatedCategoryTimeSeries(identifier, df, figurePath, plotStyle):
+    dfIntervals = CreateFixationIntervalTableFrom(df)
+
+    with plt.rc_context(plotStyle), plt.rc_context(PlotMarginFor1PlotWithXTimeYCategories):
+        fig, ax = plt.subplots()
+        ax.set_title("Fixated categories (" + identifier + ")")
+        DrawFixationIntervals(ax, dfIntervals)
+        plt.savefig(figurePath)
     plt.close("all")
     print("Successfully saved: " + figurePath)
 
-def ProcessLFHFSummary(identifier, df, figurePath):
-    #print(df.columns)
-    dfPivotDeltaSum = pd.pivot_table(df, index="Category", values="LFHF(Element:Delta)", margins=False, aggfunc=np.sum)
-    dfPivotDeltaSum = dfPivotDeltaSum.rename(columns={"LFHF(Element:Delta)": "Total LF/HF Delta"})
-    dfPivotDeltaSumSorted = dfPivotDeltaSum.sort_values("Total LF/HF Delta", ascending=False)
-
-    dfPivotMean = pd.pivot_table(df, index="Category", values="LFHF(Element)", margins=False, aggfunc=np.mean)
-    dfPivotMean = dfPivotMean.rename(columns={"LFHF(Element)": "Mean LF/HF"})
-    dfPivotMeanSorted = dfPivotMean.sort_values("Mean LF/HF", ascending=False)
-
-    SetPlotMarginFor4PlotsWithXCategories()
-    currentFigSize = list(plt.rcParams["figure.figsize"])
-    multiFigSize = [currentFigSize[0] * 2, currentFigSize[1] * 2]
-    fig, axes = plt.subplots(nrows=2, ncols=2, figsize=tuple(multiFigSize))
-    dfPivotDeltaSum.plot(ax=axes[0, 0],
-                         kind="bar", title="Total LF/HF delta by categories (" + identifier + ")", legend=None, grid=True,
-                         xlabel="Category of elements in HTML", ylabel="Total LF/HF delta", colormap=Colormaps[0])
-    dfPivotDeltaSumSorted.plot(ax=axes[1, 0],
-                               kind="bar", title="Sorted total LF/HF delta by categories (" + identifier + ")", legend=None, grid=True,
-                               xlabel="Category of elements in HTML", ylabel="Total LF/HF delta", colormap=Colormaps[0])
-    dfPivotMean.plot(ax=axes[0, 1],
-                     kind="bar", title="Mean LF/HF by categories (" + identifier + ")", legend=None, grid=True,
-                     xlabel="Category of elements in HTML", ylabel="Mean LF/HF", colormap=Colormaps[1])
-    dfPivotMeanSorted.plot(ax=axes[1, 1],
-                           kind="bar", title="Sorted mean LF/HF by categories (" + identifier + ")", legend=None, grid=True,
-                           xlabel="Category of elements in HTML", ylabel="Mean LF/HF", colormap=Colormaps[1])
-    plt.savefig(figurePath)
+def ProcessLFHFSummary(identifier, dfSummary, figurePath, plotStyle):
+    dfDeltaSum = dfSummary[["TotalLFHFDelta"]].rename(columns={"TotalLFHFDelta": "Total LF/HF Delta"})
+    dfDeltaSumSorted = dfDeltaSum.sort_values("Total LF/HF Delta", ascending=False)
+
+    # Categories without element LF/HF have no mean
+    dfMean = dfSummary[["MeanLFHF"]].dropna().rename(columns={"MeanLFHF": "Mean LF/HF"})
+    dfMeanSorted = dfMean.sort_values("Mean LF/HF", ascending=False)
+
+    with plt.rc_context(plotStyle), plt.rc_context(PlotMarginFor4PlotsWithXCategories):
+        currentFigSize = list(plt.rcParams["figure.figsize"])
+        multiFigSize = [currentFigSize[0] * 2, currentFigSize[1] * 2]
+        fig, axes = plt.subplots(nrows=2, ncols=2, figsize=tuple(multiFigSize))
+        dfDeltaSum.plot(ax=axes[0, 0],
+                        kind="bar", title="Total LF/HF delta by categories (" + identifier + ")", legend=None, grid=True,
+                        xlabel="Category of elements in HTML", ylabel="Total LF/HF delta", colormap=Colormaps[0])
+        dfDeltaSumSorted.plot(ax=axes[1, 0],
+                              kind="bar", title="Sorted total LF/HF delta by categories (" + identifier + ")", legend=None, grid=True,
+                              xlabel="Category of elements in HTML", ylabel="Total LF/HF delta", colormap=Colormaps[0])
+        dfMean.plot(ax=axes[0, 1],
+                    kind="bar", title="Mean LF/HF by categories (" + identifier + ")", legend=None, grid=True,
+                    xlabel="Category of elements in HTML", ylabel="Mean LF/HF", colormap=Colormaps[1])
+        dfMeanSorted.plot(ax=axes[1, 1],
+                          kind="bar", title="Sorted mean LF/HF by categories (" + identifier + ")", legend=None, grid=True,
+                          xlabel="Category of elements in HTML", ylabel="Mean LF/HF", colormap=Colormaps[1])
+        plt.savefig(figurePath)
     plt.close("all")
     print("Successfully saved: " + figurePath)
 
-def CreateDataFrameForLFHFPlotFrom(df):
+def DownsampleMinMax(values, maxPoints):
+    # Indices of at most maxPoints values: the minimum and maximum of each of
+    # maxPoints / 2 equal-count buckets, plus the first and last value,
+    # so peaks and troughs survive (0 or enough maxPoints keeps all, at least 4 are kept)
+    values = np.asarray(values, dtype=float)
+    if maxPoints <= 0 or len(values) <= maxPoints:
+        return np.arange(len(values))
+    bucketCount = max((maxPoints - 2) // 2, 1)
+    bucketIds = np.arange(len(values)) * bucketCount // len(values)
+    # Sorted by bucket then value: the first and last index of each bucket are its min and max
+    orderedIndices = np.lexsort((values, bucketIds))
+    bucketStarts = np.searchsorted(bucketIds[orderedIndices], np.arange(bucketCount))
+    bucketEnds = np.append(bucketStarts[1:], len(values)) - 1
+    selectedIndices = np.concatenate([[0, len(values) - 1],
+                                      orderedIndices[bucketStarts],
+                                      orderedIndices[bucketEnds]])
+    return np.unique(selectedIndices)
+
+def CreateDataFrameForLFHFPlotFrom(df, maxPoints=0):
     # print(df.columns)
-    # > ["#", "Event", "Category", "AppTime", "X", "Y", "AriaLabel", "TimeSpan", "LFHF(Element)", "LFHF(Element:Delta)"]
-    convertMillSecToSec = lambda t: round(t / 1000.0)
-    dfLFHFElement = df.drop(["#", "Event", "Category", "X", "Y", "AriaLabel", "TimeSpan", "LFHF(Element:Delta)"], axis=1)
+    # > ["Category", "AppTime", "TimeSpan", "LFHF(Element)", "LFHF(Element:Delta)"]
+    dfLFHFElement = df[["AppTime", "LFHF(Element)"]]
     dfLFHFElement = dfLFHFElement.dropna(subset=["LFHF(Element)"])
-    dfLFHFElement["AppTime"] = dfLFHFElement["AppTime"].apply(convertMillSecToSec)
+    dfLFHFElement = dfLFHFElement.iloc[DownsampleMinMax(dfLFHFElement["LFHF(Element)"].to_numpy(), maxPoints)]
+    dfLFHFElement["AppTime"] = (dfLFHFElement["AppTime"] / 1000.0).round().astype("int64")
 
     return dfLFHFElement
 
-def ProcessLFHFTimeSeries(identifier, df, figurePath):
-    dfForLFHF = CreateDataFrameForLFHFPlotFrom(df)
-
-    plt.gca().get_yaxis().get_major_formatter().set_useOffset(False)
-    #plt.gca().get_yaxis().set_major_locator(mpl.ticker.MaxNLocator(integer=True))
-    plt.gca().get_yaxis().set_major_formatter(mpl.ticker.FormatStrFormatter("%.1f"))
-    SetPlotMarginFor1PlotWithXTime()
-    dfForLFHF.plot(x="AppTime", y="LFHF(Element)",
-                   kind="line", title="LF/HF ratio (" + identifier + ")", legend=None, grid=True,
-                   xlabel="Time [s]", ylabel="LF/HF ratio for each element in HTML", colormap=Colormaps[0],
-                   style=["o-"], ms=3, lw=1)
-    plt.savefig(figurePath)
+def ProcessLFHFTimeSeries(identifier, df, figurePath, plotStyle, maxPoints=0):
+    dfForLFHF = CreateDataFrameForLFHFPlotFrom(df, maxPoints)
+
+    with plt.rc_context(plotStyle), plt.rc_context(PlotMarginFor1PlotWithXTime):
+        plt.gca().get_yaxis().get_major_formatter().set_useOffset(False)
+        #plt.gca().get_yaxis().set_major_locator(mpl.ticker.MaxNLocator(integer=True))
+        plt.gca().get_yaxis().set_major_formatter(mpl.ticker.FormatStrFormatter("%.1f"))
+        dfForLFHF.plot(x="AppTime", y="LFHF(Element)",
+                       kind="line", title="LF/HF ratio (" + identifier + ")", legend=None, grid=True,
+                       xlabel="Time [s]", ylabel="LF/HF ratio for each element in HTML", colormap=Colormaps[0],
+                       style=["o-"], ms=3, lw=1)
+        plt.savefig(figurePath)
     plt.close("all")
     print("Successfully saved: " + figurePath)
 
-def ProcessFixatedCategoryAndLFHFTimeSeries(identifier, df, figurePath):
-    dfForLFHF = CreateDataFrameForLFHFPlotFrom(df)
-    dfForCategories = CreateDataFrameForCategorizedPlotFrom(df)
-
-    SetPlotMarginFor1PlotWithXTimeYCategories()
-    fig, axBase = plt.subplots()
-    axAlt = axBase.twinx()
-    axAlt.get_yaxis().get_major_formatter().set_useOffset(False)
-    #axAlt.get_yaxis().set_major_locator(mpl.ticker.MaxNLocator(integer=True))
-    axAlt.get_yaxis().set_major_formatter(mpl.ticker.FormatStrFormatter("%.1f"))
-    dfForLFHF.plot(ax=axAlt,
-                   x="AppTime", y="LFHF(Element)",
-                   kind="line", title="Fixated categories and LF/HF ratio (" + identifier + ")", legend=None, grid=True,
-                   xlabel="Time [s]", ylabel="LF/HF ratio for each element in HTML", colormap=Colormaps[0],
-                   style=["x-"], ms=3.5, lw=2, alpha=0.5)
-    sp = sns.stripplot(ax=axBase,
-                       data=dfForCategories, x=dfForCategories["AppTimeSec"], y=dfForCategories["Category"],
-                       order=sorted(dfForCategories["Category"].unique().tolist()),
-                       marker="s", size=2.5, jitter=0.0, palette=sns.color_palette("bright"), rasterized=True)
-    sp.set(xlabel="Time [s]",
-           ylabel="Category of elements in HTML")
-    plt.savefig(figurePath)
+def ProcessFixatedCategoryAndLFHFTimeSeries(identifier, df, figurePath, plotStyle, maxPoints=0):
+    dfForLFHF = CreateDataFrameForLFHFPlotFrom(df, maxPoints)
+    dfIntervals = CreateFixationIntervalTableFrom(df)
+
+    with plt.rc_context(plotStyle), plt.rc_context(PlotMarginFor1PlotWithXTimeYCategories):
+        fig, axBase = plt.subplots()
+        axAlt = axBase.twinx()
+        axAlt.get_yaxis().get_major_formatter().set_useOffset(False)
+        #axAlt.get_yaxis().set_major_locator(mpl.ticker.MaxNLocator(integer=True))
+        axAlt.get_yaxis().set_major_formatter(mpl.ticker.FormatStrFormatter("%.1f"))
+        dfForLFHF.plot(ax=axAlt,
+                       x="AppTime", y="LFHF(Element)",
+                       kind="line", title="Fixated categories and LF/HF ratio (" + identifier + ")", legend=None, grid=True,
+                       xlabel="Time [s]", ylabel="LF/HF ratio for each element in HTML", colormap=Colormaps[0],
+                       style=["x-"], ms=3.5, lw=2, alpha=0.5)
+        DrawFixationIntervals(axBase, dfIntervals)
+        plt.savefig(figurePath)
     plt.close("all")
     print("Successfully saved: " + figurePath)
 
 
-# Main Function
-def Main(identifierString, processedCsvPath, processedCsvEncoding, outputDir, outputFormat):
-    # Create dataframe
-    df = CreateDataFrameFrom(processedCsvPath, processedCsvEncoding)
-    dfFiltered = df.drop(["EventID", "ServerTime", "LFHF", "LFHF(Interpolated)"], axis=1)
-
-    # Fixation time summary
-    fixationTimeSummaryFigurePath = outputDir + identifierString + "/" + identifierString + "_fixation_time_summary." + outputFormat
-    ProcessFixationTimeSummary(identifierString, dfFiltered, fixationTimeSummaryFigurePath)
-
-    # Fixated category time series
-    fixatedCategoryTimeSeriesFigurePath = outputDir + identifierString + "/" + identifierString + "_fixated_category_time_series." + outputFormat
-    ProcessFixatedCategoryTimeSeries(identifierString, dfFiltered, fixatedCategoryTimeSeriesFigurePath)
+## Render figures concurrently in worker processes
+def InitializeFigureWorker(figureData, withSeaborn=True):
+    # The loaded dataframes are handed to each worker once, not once per figure
+    global FigureWorkerData
+    ImportDataModules()
+    ImportPlotModules(withSeaborn)
+    mpl.use("Agg")
+    FigureWorkerData = figureData
+
+def RenderFigureInWorker(processFigure, identifier, figureDataName, figurePath, plotStyle, profile=False):
+    # Returns the profile record of the figure when profile is set
+    stepRecords = [] if profile else None
+    RunStep(stepRecords, CreateStepNameFrom(processFigure), processFigure,
+            (identifier, FigureWorkerData[figureDataName], figurePath, plotStyle),
+            len(FigureWorkerData[figureDataName]), 0, figurePath)
+    return stepRecords[0] if profile else None
+
+def RenderFiguresConcurrently(identifier, figureData, figures, plotStyle, figureJobs, profile=False, withSeaborn=True):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=min(figureJobs, len(figures)),
+                                                initializer=InitializeFigureWorker, initargs=(figureData, withSeaborn)) as executor:
+        futures = [executor.submit(RenderFigureInWorker, processFigure, identifier, figureDataName, figurePath, plotStyle, profile)
+                   for processFigure, figureDataName, figurePath in figures]
+        return [future.result() for future in futures]
+
+
+## Profile data loading, the summary and each figure
+def ResetPeakRSS():
+    # Linux resets VmHWM by writing 5 to clear_refs, elsewhere the peak accumulates over steps
+    try:
+        with open("/proc/self/clear_refs", mode="w") as clearRefsFile:
+            clearRefsFile.write("5")
+        return True
+    except OSError:
+        return False
+
+def CreateStepNameFrom(processStep):
+    return getattr(processStep, "func", processStep).__name__
+
+def RunStep(stepRecords, stepName, processStep, stepArgs, rowsIn, bytesRead, outputPath, profiler=None):
+    # stepRecords: list to append the profile record to (None: just run the step)
+    if stepRecords is None:
+        return processStep(*stepArgs)
+    isPeakRSSPerStep = ResetPeakRSS()
+    startedTime = time.perf_counter()
+    startedCPUTime = time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        result = processStep(*stepArgs)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+    stepRecords.append({
+        "name": stepName,
+        "wallSeconds": time.perf_counter() - startedTime,
+        "cpuSeconds": time.process_time() - startedCPUTime,
+        "rowsIn": rowsIn,
+        "rowsOut": len(result) if isinstance(result, pd.DataFrame) else 0,
+        "bytesRead": bytesRead,
+        "bytesWritten": os.path.getsize(outputPath) if outputPath is not None and os.path.exists(outputPath) else 0,
+        "peakRSSMB": ReadPeakRSSMegabytes(),
+        "isPeakRSSPerStep": isPeakRSSPerStep
+    })
+    return result
+
+def WriteProfileReport(profilePath, stepRecords, stepProfilers, wallSeconds, cpuSeconds):
+    profileReport = {
+        "wallSeconds": wallSeconds,
+        "cpuSeconds": cpuSeconds,
+        "steps": stepRecords
+    }
+    # With cProfile, also dump the stats of the slowest step
+    if stepProfilers:
+        slowestStep = max(stepRecords, key=lambda step: step["wallSeconds"])
+        cProfilePath = os.path.splitext(profilePath)[0] + "_" + slowestStep["name"] + ".prof"
+        stepProfilers[slowestStep["name"]].dump_stats(cProfilePath)
+        profileReport["cProfile"] = {"name": slowestStep["name"], "path": cProfilePath}
+        print("Successfully saved: " + cProfilePath)
+    with open(profilePath, mode="w", encoding="utf_8") as profileFile:
+        json.dump(profileReport, profileFile, ensure_ascii=False, indent=2)
+    print("Successfully saved: " + profilePath)
 
-    # LF/HF summary
-    lfhfSummaryFigurePath = outputDir + identifierString + "/" + identifierString + "_lfhf_summary." + outputFormat
-    ProcessLFHFSummary(identifierString, dfFiltered, lfhfSummaryFigurePath)
 
-    # LF/HF time series
-    lfhfTimeSeriesFigurePath = outputDir + identifierString + "/" + identifierString + "_lfhf_time_series." + outputFormat
-    ProcessLFHFTimeSeries(identifierString, dfFiltered, lfhfTimeSeriesFigurePath)
+# Main Function
+def Main(identifierString, processedCsvPath, processedCsvEncoding, outputDir, outputFormat, plotStyle, figureJobs=1,
+         summaryFormat="csv", statsOnly=False, maxPoints=0, profile=False, profileWithCProfile=False, figureNames=None):
+    # processedCsvPath: a processed file, or a processed table in memory (see CreateDataFrameFrom)
+    # figureNames: figures to render (None: all figures and the category summary)
+    # Profile records of each step (None: no instrumentation)
+    stepRecords = None
+    stepProfilers = {}
+    if profile or profileWithCProfile:
+        stepRecords = []
+        startedTime = time.perf_counter()
+        startedCPUTime = time.process_time()
+    CreateProfiler = lambda stepName: None
+    if profileWithCProfile:
+        CreateProfiler = lambda stepName: stepProfilers.setdefault(stepName, cProfile.Profile())
+
+    # Only the columns and the summary of selected figures are prepared
+    selectedFigureNames = [] if statsOnly else [figureName for figureName in FigureNames if figureNames is None or figureName in figureNames]
+    writeSummary = statsOnly or figureNames is None or any(figureName in SummaryFigureNames for figureName in selectedFigureNames)
+    selectedColumns = set(ColumnsToSummarize if writeSummary else [])
+    for figureName in selectedFigureNames:
+        selectedColumns.update(FigureColumns[figureName])
 
-    # Fixated category and LF/HF time series
-    fixatedCategoryTimeAndLFHFSeriesFigurePath = outputDir + identifierString + "/" + identifierString + "_fixated_category_and_lfhf_time_series." + outputFormat
-    ProcessFixatedCategoryAndLFHFTimeSeries(identifierString, dfFiltered, fixatedCategoryTimeAndLFHFSeriesFigurePath)
+    # Create dataframe
+    dfFiltered = RunStep(stepRecords, "CreateDataFrameFrom", CreateDataFrameFrom,
+                         (processedCsvPath, processedCsvEncoding, [column for column in ColumnsToPlot if column in selectedColumns]),
+                         0, os.path.getsize(processedCsvPath) if isinstance(processedCsvPath, (str, os.PathLike)) and os.path.isfile(processedCsvPath) else 0,
+                         None, CreateProfiler("CreateDataFrameFrom"))
+
+    # Category summary
+    dfSummary = None
+    if writeSummary:
+        summaryPath = outputDir + identifierString + "/" + identifierString + "_category_summary." + summaryFormat
+        dfSummary = RunStep(stepRecords, "CreateCategorySummary", CreateCategorySummary, (dfFiltered,),
+                            len(dfFiltered), 0, None, CreateProfiler("CreateCategorySummary"))
+        WriteCategorySummary(dfSummary, summaryPath, summaryFormat, processedCsvEncoding)
+    if statsOnly:
+        if stepRecords is not None:
+            WriteProfileReport(outputDir + identifierString + "/" + identifierString + "_plot_profile.json",
+                               stepRecords, stepProfilers, time.perf_counter() - startedTime, time.process_time() - startedCPUTime)
+        return
+
+    withSeaborn = any(figureName in SeabornFigureNames for figureName in selectedFigureNames)
+    ImportPlotModules(withSeaborn)
+    figureData = {"processed": dfFiltered, "summary": dfSummary}
+    processFigures = {
+        # Fixation time summary
+        "fixation_time_summary": (ProcessFixationTimeSummary, "summary"),
+        # Fixated category time series
+        "fixated_category_time_series": (ProcessFixatedCategoryTimeSeries, "processed"),
+        # LF/HF summary
+        "lfhf_summary": (ProcessLFHFSummary, "summary"),
+        # LF/HF time series
+        "lfhf_time_series": (functools.partial(ProcessLFHFTimeSeries, maxPoints=maxPoints), "processed"),
+        # Fixated category and LF/HF time series
+        "fixated_category_and_lfhf_time_series": (functools.partial(ProcessFixatedCategoryAndLFHFTimeSeries, maxPoints=maxPoints), "processed")
+    }
+    figures = [processFigures[figureName] + (outputDir + identifierString + "/" + identifierString + "_" + figureName + "." + outputFormat,)
+               for figureName in selectedFigureNames]
+    if figureJobs > 1:
+        figureRecords = RenderFiguresConcurrently(identifierString, figureData, figures, plotStyle, figureJobs,
+                                                  stepRecords is not None, withSeaborn)
+        if stepRecords is not None:
+            stepRecords.extend(figureRecords)
+    else:
+        for processFigure, figureDataName, figurePath in figures:
+            stepName = CreateStepNameFrom(processFigure)
+            RunStep(stepRecords, stepName, processFigure,
+                    (identifierString, figureData[figureDataName], figurePath, plotStyle),
+                    len(figureData[figureDataName]), 0, figurePath, CreateProfiler(stepName))
+
+    if stepRecords is not None:
+        WriteProfileReport(outputDir + identifierString + "/" + identifierString + "_plot_profile.json",
+                           stepRecords, stepProfilers, time.perf_counter() - startedTime, time.process_time() - startedCPUTime)
+
+
+# Batch Functions
+def PlotSession(identifierString, sourcePath, outputDir, mainArgs):
+    # Run in a worker process: report the error instead of stopping the batch
+    try:
+        os.makedirs(outputDir + identifierString, exist_ok=True)
+        Main(identifierString, sourcePath, mainArgs[0], outputDir, *mainArgs[1:])
+        return None
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        if plt is not None:
+            plt.close("all")
 
 
 if __name__ == "__main__":
@@ -234,9 +498,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="ETA-Analyzer: CSV Plotter",
                                      formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument("source", type=str,
-                        help="Processed csv file created via eta_csv_processor.py")
-    parser.add_argument("-i", "--identifier", type=str, default=currentDatetimeString,
-                        help="Unique identifier for output image files \n (default: YYYYMMDDhhmmss)")
+                        help="Processed csv (.gz/.bz2/.xz/.zst compressed, or - for stdin) or parquet/feather file \ncreated via eta_csv_processor.py, or a directory / glob pattern of them (batch mode)")
+    parser.add_argument("-i", "--identifier", type=str, default=None,
+                        help="Unique identifier for output image files \n (default: YYYYMMDDhhmmss, file name in batch mode)")
     parser.add_argument("-e", "--input-encoding", type=str, choices=["utf_8", "shift_jis"], default="shift_jis",
                         help="Encoding of the input csv file \n (default: shift_jis)")
     parser.add_argument("-d", "--output-dir", type=str, default="plotout",
@@ -249,22 +513,58 @@ if __name__ == "__main__":
                         help="Output DPI \n (default: 300.0)")
     parser.add_argument("-G", "--output-grid-disable", action="store_true",
                         help="Disable grid on figures on output images")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of sessions plotted in parallel in batch mode \n (default: number of CPUs)")
+    parser.add_argument("--summary-format", type=str, choices=SummaryFormats, default="csv",
+                        help="File format of the per-category summary \n (default: csv)")
+    parser.add_argument("--max-points", type=int, default=0,
+                        help="Downsample LF/HF series to at most this many points \n(min/max per bucket, peaks and troughs are kept) \n (default: 0, plot all points)")
+    parser.add_argument("--figures", type=str, nargs="+", choices=FigureNames, default=None,
+                        help="Render only these figures, reading only the columns they need \n(the category summary is written with fixation_time_summary or lfhf_summary) \n (default: all figures and the category summary)")
+    parser.add_argument("--stats-only", action="store_true",
+                        help="Write only the per-category summary, \nwithout importing matplotlib or rendering figures")
+    parser.add_argument("--figure-jobs", type=int, default=1,
+                        help="Number of worker processes rendering the figures \nof a single session concurrently (not in batch mode) \n (default: 1, render one after another)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write wall/CPU time, rows, bytes and peak RSS of data loading, \nthe summary and each figure to <identifier>_plot_profile.json")
+    parser.add_argument("--profile-cprofile", action="store_true",
+                        help="--profile and also dump cProfile stats of the slowest step \n(not with --figure-jobs)")
     args = parser.parse_args()
+    isBatch = IsBatchSource(args.source)
+    if isBatch and args.identifier is not None:
+        parser.error("-i/--identifier takes a single source file")
+    if args.max_points != 0 and args.max_points < 4:
+        parser.error("--max-points must be 0 or at least 4")
+    if args.jobs < 1 or args.figure_jobs < 1:
+        parser.error("-j/--jobs and --figure-jobs must be at least 1")
+    if isBatch and args.figure_jobs > 1:
+        parser.error("--figure-jobs takes a single source file, use -j/--jobs in batch mode")
+    if args.profile_cprofile and args.figure_jobs > 1:
+        parser.error("--profile-cprofile renders figures one after another, without --figure-jobs")
+    if args.stats_only and args.figures is not None:
+        parser.error("--figures renders figures, not with --stats-only")
 
     # Get output directory path
     formattedOutputDir = args.output_dir
     if args.output_dir[-1] != "/":
         formattedOutputDir = args.output_dir + "/"
-    os.makedirs(formattedOutputDir + args.identifier, exist_ok=True)
-
-    # Set pyplot configs
-    plt.rcParams["figure.figsize"] = args.output_size
-    plt.rcParams["figure.dpi"] = args.output_dpi
-    if args.output_grid_disable:
-        plt.rcParams["grid.alpha"] = 0.0
-    else:
-        plt.rcParams["grid.alpha"] = 0.3
-    plt.rcParams["grid.color"] = "gray"
-    plt.rcParams["grid.linestyle"] = "dotted"
 
-    Main(args.identifier, args.source, args.input_encoding, formattedOutputDir, args.output_format)
+    plotStyle = CreatePlotStyle(args.output_size, args.output_dpi, args.output_grid_disable)
+    mainArgs = (args.input_encoding, args.output_format, plotStyle, 1, args.summary_format, args.stats_only,
+                args.max_points, args.profile, args.profile_cprofile, args.figures)
+    if isBatch:
+        sourcePaths = ListSourcePaths(args.source, ProcessedFilePatterns, recursive=True)
+        identifiers = [CreateIdentifierFrom(sourcePath, ProcessedFileSuffix) for sourcePath in sourcePaths]
+        if not sourcePaths:
+            parser.error("no processed files found: " + args.source)
+        if len(set(identifiers)) != len(identifiers):
+            parser.error("file names of processed files must be unique in batch mode")
+        failedSessions = RunSessions(PlotSession, sourcePaths, identifiers, formattedOutputDir, mainArgs, args.jobs, "Plotted")
+        sys.exit(1 if failedSessions else 0)
+
+    identifierString = args.identifier if args.identifier is not None else currentDatetimeString
+    os.makedirs(formattedOutputDir + identifierString, exist_ok=True)
+
+    Main(identifierString, args.source, args.input_encoding, formattedOutputDir, args.output_format,
+         plotStyle, args.figure_jobs, args.summary_format, args.stats_only,
+         args.max_points, args.profile, args.profile_cprofile, args.figures)
@@ -10,6 +10,25 @@ import sys
 import os
 import argparse
 import datetime
+import contextlib
+import operator
+import itertools
+import csv
+import re
+import functools
+import concurrent.futures
+import traceback
+import hashlib
+import io
+import codecs
+import json
+import time
+import cProfile
+import mmap
+import bisect
+import shutil
+from eta_batch import CompressedFileExtensions, ListSourcePaths, IsBatchSource, CreateIdentifierFrom, RunSessions
+from eta_resource_usage import ReadPeakRSSMegabytes
 
 
 # Configs
@@ -35,7 +54,104 @@ AriaLabelCategories = {
 }
 
 
-# Global Variables
+RawCsvEngines = ["python", "csv", "pandas", "pyarrow"]
+RawCsvChunkRows = 65536
+LFHFEngines = ["python", "numpy"]
+LFHFChunkRows = 65536
+AriaLabelCacheSize = 4096
+## Encodings whose multibyte characters contain no ASCII bytes, so rows are split and stripped as bytes
+BytesModeEncodings = ["utf-8", "shift_jis", "cp932", "euc_jp"]
+## Encodings where encoded identifiers only match at character boundaries
+SelfSynchronizingEncodings = ["utf-8"]
+## Literals of rows as text, encoded to process rows as bytes (see CreateBytesRowLiterals)
+TextRowLiterals = {
+    "encoding": None,
+    "separator": ",",
+    "quote": "\"",
+    # Looked up in rows with in, as a byte value in rows as bytes (see CreateBytesRowLiterals)
+    "quoteChar": "\"",
+    "newline": "\n",
+    "carriageReturn": "\r",
+    # Only ASCII whitespace, as stripped from bytes
+    "whitespace": " \t\n\r\x0b\x0c",
+    "emptyField": "",
+    "FixationStarted": "FixationStarted",
+    "FixationEnded": "FixationEnded",
+    "LFHFComputed": "LFHFComputed",
+    "fixationStartedRow": "%d,FixationStarted,%s,%s,\n",
+    "fixationEndedRow": "%d,FixationEnded,%s,%s,%d\n",
+    "lfhfComputedRow": "%d,LFHFComputed,,%s,\n",
+    "unknownRow": "%d,Unknown,,%s,\n",
+    "interpolatedRow": "%s,%.3f\n",
+    "lfhfValue": "%.3f",
+    "elementLFHFRow": "%s,%.3f,%.3f\n",
+    "firstElementLFHFRow": "%s,%.3f,\n",
+    "noElementLFHFRow": "%s,,\n"
+}
+ProcessedTableFormats = ["csv", "parquet", "feather"]
+FollowReadBytes = 1048576
+HashBlockBytes = 1048576
+RawCsvIndexRows = 8192
+WindowReadBytes = 1048576
+ChunksPerJob = 4
+CompressionFormats = ["none", "gz", "bz2", "xz", "zst"]
+RawCsvFilePatterns = ["*.csv"] + ["*.csv" + extension for extension in CompressedFileExtensions]
+GzipCompressionLevel = 6
+ZstdCompressionLevel = 3
+ProcessedTableEvents = ["FixationStarted", "FixationEnded", "LFHFComputed", "Unknown"]
+ProcessedTableColumnTypes = {
+    "#": "int64",
+    "Event": "dictionary",
+    "Category": "dictionary",
+    "EventID": "int64",
+    "AppTime": "int64",
+    "ServerTime": "string",
+    "X": "float64",
+    "Y": "float64",
+    "AriaLabel": "string",
+    "LFHF": "float64",
+    "TimeSpan": "int64",
+    "LFHF(Interpolated)": "float64",
+    "LFHF(Element)": "float64",
+    "LFHF(Element:Delta)": "float64"
+}
+FilteredCsvColumns = {
+    "EventID": 0,
+    "AppTime": 1,
+    "ServerTime": 2,
+    "X": 3,
+    "Y": 4,
+    "AriaLabel": 5,
+    "LFHF": 6
+}
+CategorizedCsvColumns = {
+    "Number": 0,
+    "Event": 1,
+    "Category": 2,
+    "EventID": 3,
+    "AppTime": 4,
+    "ServerTime": 5,
+    "X": 6,
+    "Y": 7,
+    "AriaLabel": 8,
+    "LFHF": 9,
+    "TimeSpan": 10
+}
+InterpolatedCsvColumns = {
+    "Number": 0,
+    "Event": 1,
+    "Category": 2,
+    "EventID": 3,
+    "AppTime": 4,
+    "ServerTime": 5,
+    "X": 6,
+    "Y": 7,
+    "AriaLabel": 8,
+    "LFHF": 9,
+    "TimeSpan": 10,
+    "InterpolatedLFHF": 11
+}
+## Columns to read from a raw csv, found in its headers (see InitializeColumnsToReadFromRawCsv)
 RawCsvColumns = {
     "EventID": 0,
     "AppTime": 0,
@@ -46,60 +162,198 @@ RawCsvColumns = {
     "LFHF": 0
 }
 
+
+# Global Variables
+
 # Functions
+def GenerateChunks(iterable, chunkSize):
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, chunkSize))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, chunkSize))
+
+## Open csv files
+## Plain or compressed (by extension) csv file, or "-" for stdin/stdout
+def OpenCsvFile(path, mode, encoding=None):
+    # mode: "r", "w" (text in encoding) or "rb", "wb"
+    textMode = mode if "b" in mode else mode + "t"
+    if path == "-":
+        # Keep stdin/stdout open after the file object is closed
+        # (original streams, as sys.stdout is redirected to stderr for messages)
+        standardStream = sys.__stdin__ if "r" in mode else sys.__stdout__
+        return open(standardStream.fileno(), mode=mode, encoding=encoding, closefd=False)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".gz":
+        import gzip
+        return gzip.open(path, mode=textMode, encoding=encoding, compresslevel=GzipCompressionLevel)
+    elif extension == ".bz2":
+        import bz2
+        return bz2.open(path, mode=textMode, encoding=encoding)
+    elif extension == ".xz":
+        import lzma
+        return lzma.open(path, mode=textMode, encoding=encoding)
+    elif extension == ".zst":
+        import zstandard
+        zstdFile = zstandard.open(path, mode=textMode, encoding=encoding,
+                                  cctx=zstandard.ZstdCompressor(level=ZstdCompressionLevel))
+        if "b" in mode:
+            # Binary streams of zstandard read no lines and write no lists of rows by themselves
+            return io.BufferedReader(zstdFile) if "r" in mode else io.BufferedWriter(zstdFile)
+        return zstdFile
+    return open(path, mode=mode, encoding=encoding)
+
+def IsSeekableCsvPath(path):
+    # Index, windows, chunks and --follow need byte offsets of a plain file
+    return path != "-" and os.path.splitext(path)[1].lower() not in CompressedFileExtensions
+
+def CreateCompressedPath(path, compression):
+    return path if compression == "none" else path + "." + compression
+
+## Split and join csv rows
+## Fields are quoted only when they contain a separator or a quote (csv.QUOTE_MINIMAL),
+## so rows without quotes are split and joined as plain strings
+def SplitQuotedRowString(rowString, rowLiterals=TextRowLiterals):
+    # rowString: a row without its newline, containing a quote
+    encoding = rowLiterals["encoding"]
+    if encoding is not None:
+        return [field.encode(encoding) for field in SplitQuotedRowString(rowString.decode(encoding))]
+    if rowString.count("\"") % 2 == 1:
+        # Rows are read line by line
+        raise ValueError("Line breaks in quoted fields are not supported: " + repr(rowString))
+    return next(csv.reader([rowString]))
+
+def SplitRowString(rowString, rowLiterals=TextRowLiterals):
+    if rowLiterals["quoteChar"] in rowString:
+        return SplitQuotedRowString(rowString, rowLiterals)
+    return rowString.split(rowLiterals["separator"])
+
+def JoinRowFields(fields, rowLiterals=TextRowLiterals):
+    separator = rowLiterals["separator"]
+    quote = rowLiterals["quote"]
+    rowString = separator.join(fields)
+    if rowLiterals["quoteChar"] in rowString or rowString.count(separator) >= len(fields):
+        rowString = separator.join(quote + field.replace(quote, quote + quote) + quote
+                                   if quote in field or separator in field else field
+                                   for field in fields)
+    if rowLiterals["newline"] in rowString or rowLiterals["carriageReturn"] in rowString:
+        raise ValueError("Line breaks in quoted fields are not supported: " + repr(rowString))
+    return rowString + rowLiterals["newline"]
+
 ## Filter rows
 ## Raw csv -> Filtered csv
 def InitializeColumnsToReadFromRawCsv(headerStrings):
+    # New mapping for each raw csv, so sessions can be processed concurrently
+    rawCsvColumns = dict(RawCsvColumns)
     for i, headerString in enumerate(headerStrings):
         if "EventID" in headerString:
-            RawCsvColumns["EventID"] = i
+            rawCsvColumns["EventID"] = i
         elif "Timestamp(App)" in headerString:
-            RawCsvColumns["AppTime"] = i
+            rawCsvColumns["AppTime"] = i
         elif "Timestamp(Server)" in headerString:
-            RawCsvColumns["ServerTime"] = i
+            rawCsvColumns["ServerTime"] = i
         elif "X" in headerString:
-            RawCsvColumns["X"] = i
+            rawCsvColumns["X"] = i
         elif "Y" in headerString:
-            RawCsvColumns["Y"] = i
+            rawCsvColumns["Y"] = i
         elif "X" in headerString:
-            RawCsvColumns["X"] = i
+            rawCsvColumns["X"] = i
         elif "LeafSideElem(1): aria-label"in headerString:
-            RawCsvColumns["AriaLabel"] = i
+            rawCsvColumns["AriaLabel"] = i
         elif "LFHF" in headerString:
-            RawCsvColumns["LFHF"] = i
-
-def ProcessRowStringsFromRawCsv(rowStrings, filteredCsv):
-    for rowIndex, rowString in enumerate(rowStrings):
-        strippedRowString = rowString.strip()
-        rowData = strippedRowString.split(",")
-        filteredRowString = ""
-        for i, columnIndexInOriginal in enumerate(RawCsvColumns.values()):
-            if i < len(RawCsvColumns.values()) -1:
-                filteredRowString = filteredRowString + rowData[columnIndexInOriginal] + ","
-            else:
-                filteredRowString = filteredRowString + rowData[columnIndexInOriginal] + "\n"
-        filteredCsv.write(filteredRowString)
+            rawCsvColumns["LFHF"] = i
+    return rawCsvColumns
+
+def GenerateRowStringsFromRawCsv(rowStrings, rawCsvColumns, rowLiterals=TextRowLiterals):
+    # rowLiterals: TextRowLiterals, or those of rows as bytes (see CreateBytesRowLiterals)
+    getColumns = operator.itemgetter(*rawCsvColumns.values())
+    separator = rowLiterals["separator"]
+    quoteChar = rowLiterals["quoteChar"]
+    newline = rowLiterals["newline"]
+    whitespace = rowLiterals["whitespace"]
+    for rowString in rowStrings:
+        strippedRowString = rowString.strip(whitespace)
+        if quoteChar in strippedRowString:
+            yield JoinRowFields(getColumns(SplitQuotedRowString(strippedRowString, rowLiterals)), rowLiterals)
+        else:
+            yield separator.join(getColumns(strippedRowString.split(separator))) + newline
+
+def GenerateRowStringsFromProjectedRows(projectedRows):
+    for rowData in projectedRows:
+        yield JoinRowFields(rowData)
+
+def ReadProjectedRowsWithCsvModule(originalCsv, columnIndices):
+    getColumns = operator.itemgetter(*columnIndices)
+    for rowData in csv.reader(originalCsv):
+        yield getColumns(rowData)
+
+def ReadProjectedRowsWithPandas(rawCsvPath, rawCsvEncoding, columnIndices):
+    import pandas as pd
+    # Parse only the columns to read with the C parser, keeping values as strings
+    chunks = pd.read_csv(rawCsvPath, encoding=rawCsvEncoding, engine="c",
+                         header=None, skiprows=1, usecols=sorted(set(columnIndices)),
+                         dtype=str, na_filter=False, chunksize=RawCsvChunkRows)
+    for chunk in chunks:
+        yield from zip(*[chunk[i].tolist() for i in columnIndices])
+
+def ReadProjectedRowsWithPyarrow(rawCsvPath, rawCsvEncoding, columnIndices):
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    # Parse only the columns to read with multithreaded reader, keeping values as strings
+    columnNames = ["f" + str(i) for i in sorted(set(columnIndices))]
+    readOptions = pacsv.ReadOptions(use_threads=True, skip_rows=1, autogenerate_column_names=True,
+                                    encoding=rawCsvEncoding)
+    convertOptions = pacsv.ConvertOptions(include_columns=columnNames,
+                                          column_types=dict.fromkeys(columnNames, pa.string()),
+                                          strings_can_be_null=False, quoted_strings_can_be_null=False)
+    # Decompressed via OpenCsvFile, as pyarrow detects only some compression formats by extension
+    with OpenCsvFile(rawCsvPath, "rb") as rawCsv, \
+         pacsv.open_csv(rawCsv, read_options=readOptions, convert_options=convertOptions) as reader:
+        for batch in reader:
+            yield from zip(*[batch.column("f" + str(i)).to_pylist() for i in columnIndices])
+
+def GenerateRowStringsFromRawCsvWithEngine(originalCsv, rawCsvPath, rawCsvEncoding, engine, rawCsvColumns):
+    columnIndices = list(rawCsvColumns.values())
+    if engine == "python":
+        return GenerateRowStringsFromRawCsv(originalCsv, rawCsvColumns)
+    elif engine == "csv":
+        projectedRows = ReadProjectedRowsWithCsvModule(originalCsv, columnIndices)
+    elif engine == "pandas":
+        projectedRows = ReadProjectedRowsWithPandas(rawCsvPath, rawCsvEncoding, columnIndices)
+    elif engine == "pyarrow":
+        projectedRows = ReadProjectedRowsWithPyarrow(rawCsvPath, rawCsvEncoding, columnIndices)
+    else:
+        raise ValueError("Unknown engine: " + engine)
+    return GenerateRowStringsFromProjectedRows(projectedRows)
+
+def ProcessRowStringsFromRawCsv(rowStrings, filteredCsv, rawCsvColumns):
+    filteredCsv.writelines(GenerateRowStringsFromRawCsv(rowStrings, rawCsvColumns))
+
+def ReadHeadersFromRawCsv(originalCsv):
+    # Headers for filtered csv and colmuns to read from original csv
+    originalHeaders = originalCsv.readline().strip()
+    originalHeaderStrings = originalHeaders.split(",")
+    rawCsvColumns = InitializeColumnsToReadFromRawCsv(originalHeaderStrings)
+    # Headers for filtered csv
+    headerString = ""
+    for i, col in enumerate(RawCsvColumns.keys()):
+        if i < len(RawCsvColumns.keys()) - 1:
+            headerString = headerString + col + ","
+        else:
+            headerString = headerString + col + "\n"
+    return headerString, rawCsvColumns
 
 def FilterRows(rawCsvPath, rawCsvEncoding,
-               filteredCsvPath, filteredCsvEncoding):
-    with open(rawCsvPath, mode="r", encoding=rawCsvEncoding) as originalCsv:
-        with open(filteredCsvPath, mode="w", encoding=filteredCsvEncoding) as filteredCsv:
-            # Set colmuns to read from original csv
-            originalHeaders = originalCsv.readline().strip()
-            originalHeaderStrings = originalHeaders.split(",")
-            InitializeColumnsToReadFromRawCsv(originalHeaderStrings)
+               filteredCsvPath, filteredCsvEncoding,
+               engine="python"):
+    with OpenCsvFile(rawCsvPath, "r", rawCsvEncoding) as originalCsv:
+        with OpenCsvFile(filteredCsvPath, "w", filteredCsvEncoding) as filteredCsv:
             # Write headers to filtered csv
-            headerString = ""
-            for i, col in enumerate(RawCsvColumns.keys()):
-                if i < len(RawCsvColumns.keys()) - 1:
-                    headerString = headerString + col + ","
-                else:
-                    headerString = headerString + col + "\n"
-            headerString = headerString
+            headerString, rawCsvColumns = ReadHeadersFromRawCsv(originalCsv)
             filteredCsv.write(headerString)
-            # Process rows
-            rowStrings = originalCsv.readlines()
-            ProcessRowStringsFromRawCsv(rowStrings, filteredCsv)
+            # Process rows one by one without holding whole file
+            rowStrings = GenerateRowStringsFromRawCsvWithEngine(originalCsv, rawCsvPath, rawCsvEncoding, engine, rawCsvColumns)
+            filteredCsv.writelines(rowStrings)
     print("Successfully saved: " + filteredCsvPath)
 
 ## Categorize filtered csv
@@ -112,191 +366,1394 @@ def CategorizeAriaLabel(AriaLabelCategories, string):
         return str(len(AriaLabelCategories.items())) + ":OtherElements"
     return str(len(AriaLabelCategories.items()) + 1) + ":Unknown"
 
+class AriaLabelCategorizer:
+    # Same result as CategorizeAriaLabel, built once from the category table
+    def __init__(self, AriaLabelCategories, cacheSize=AriaLabelCacheSize):
+        self.categories = list(AriaLabelCategories.keys())
+        self.otherElementsCategory = str(len(self.categories)) + ":OtherElements"
+        self.unknownCategory = str(len(self.categories) + 1) + ":Unknown"
+        self.identifierOrders = {}
+        for i, identifier in enumerate(AriaLabelCategories.values()):
+            self.identifierOrders.setdefault(identifier, i)
+        # Lookahead tries every position, so overlapping identifiers are all found,
+        # and at each position alternatives are tried in table order
+        alternation = "|".join(re.escape(identifier) for identifier in AriaLabelCategories.values()) or "(?!)"
+        self.pattern = re.compile("(?=(" + alternation + "))")
+        self.Categorize = functools.lru_cache(maxsize=cacheSize)(self.CategorizeWithoutCache)
+
+    def CategorizeWithoutCache(self, string):
+        matchedOrders = [self.identifierOrders[match.group(1)] for match in self.pattern.finditer(string)]
+        if len(matchedOrders) > 0:
+            # First match in table order wins
+            return self.categories[min(matchedOrders)]
+        if len(string) > 0:
+            return self.otherElementsCategory
+        return self.unknownCategory
+
+    def ListCategories(self):
+        return self.categories + [self.otherElementsCategory, self.unknownCategory]
+
+    def CacheInfo(self):
+        # (hits, misses, maxsize, currsize)
+        return self.Categorize.cache_info()
+
+class AriaLabelBytesCategorizer:
+    # Same result as AriaLabelCategorizer for encoded aria-labels, as encoded category
+    # Identifiers are matched as encoded bytes, so labels without any match are not decoded
+    def __init__(self, categorizer, encoding, cacheSize=AriaLabelCacheSize):
+        self.categorizer = categorizer
+        self.encoding = encoding
+        # Elsewhere a match may start inside a multibyte character (e.g. a shift_jis trail byte),
+        # so matched labels are decoded and categorized as text
+        self.isSelfSynchronizing = codecs.lookup(encoding).name in SelfSynchronizingEncodings
+        self.identifierOrders = {}
+        for identifier, order in categorizer.identifierOrders.items():
+            try:
+                self.identifierOrders[identifier.encode(encoding)] = order
+            except UnicodeEncodeError:
+                # Never found in labels of this encoding
+                pass
+        alternation = b"|".join(re.escape(identifier) for identifier in self.identifierOrders) or b"(?!)"
+        self.pattern = re.compile(b"(?=(" + alternation + b"))")
+        self.categories = [category.encode(encoding) for category in categorizer.categories]
+        self.otherElementsCategory = categorizer.otherElementsCategory.encode(encoding)
+        self.unknownCategory = categorizer.unknownCategory.encode(encoding)
+        self.Categorize = functools.lru_cache(maxsize=cacheSize)(self.CategorizeWithoutCache)
+
+    def CategorizeWithoutCache(self, byteString):
+        matchedOrders = [self.identifierOrders[match.group(1)] for match in self.pattern.finditer(byteString)]
+        if len(matchedOrders) > 0:
+            if not self.isSelfSynchronizing:
+                return self.categorizer.Categorize(byteString.decode(self.encoding)).encode(self.encoding)
+            # First match in table order wins
+            return self.categories[min(matchedOrders)]
+        if len(byteString) > 0:
+            return self.otherElementsCategory
+        return self.unknownCategory
+
+    def CacheInfo(self):
+        # (hits, misses, maxsize, currsize)
+        return self.Categorize.cache_info()
+
+def GenerateRowStringsFromFilteredCsv(filteredCsvColumns, rowStrings, AriaLabelCategories, categorizer=None, state=None,
+                                      rowLiterals=TextRowLiterals):
+    # state: dict to resume from and save to when rows are exhausted
+    # rowLiterals: rows as bytes are categorized by AriaLabelBytesCategorizer
+    if categorizer is None:
+        categorizer = AriaLabelCategorizer(AriaLabelCategories)
+    if state is None:
+        state = {}
+    separator = rowLiterals["separator"]
+    quoteChar = rowLiterals["quoteChar"]
+    whitespace = rowLiterals["whitespace"]
+    rowNumber = state.get("rowNumber", 0)
+    previousFixationStartedTime = state.get("previousFixationStartedTime", 0)
+    previousFixationStartedCategory = state.get("previousFixationStartedCategory", rowLiterals["emptyField"])
+    try:
+        for rowNumber, rowString in enumerate(rowStrings, rowNumber + 1):
+            strippedRowString = rowString.strip(whitespace)
+            rowData = strippedRowString.split(separator) if quoteChar not in strippedRowString else SplitQuotedRowString(strippedRowString, rowLiterals)
+            eventID = int(rowData[filteredCsvColumns.get("EventID")])
+            if eventID == 0:
+                # FixationStarted
+                leafSideAriaLabel = rowData[filteredCsvColumns.get("AriaLabel")]
+                category = categorizer.Categorize(leafSideAriaLabel)
+                previousFixationStartedTime = int(rowData[filteredCsvColumns.get("AppTime")])
+                previousFixationStartedCategory = category
+                yield rowLiterals["fixationStartedRow"] % (rowNumber, category, strippedRowString)
+            elif eventID == 1:
+                timeSpan = int(rowData[filteredCsvColumns.get("AppTime")]) - previousFixationStartedTime
+                yield rowLiterals["fixationEndedRow"] % (rowNumber, previousFixationStartedCategory, strippedRowString, timeSpan)
+            elif eventID == 2:
+                yield rowLiterals["lfhfComputedRow"] % (rowNumber, strippedRowString)
+            else:
+                yield rowLiterals["unknownRow"] % (rowNumber, strippedRowString)
+    finally:
+        state["rowNumber"] = rowNumber
+        state["previousFixationStartedTime"] = previousFixationStartedTime
+        state["previousFixationStartedCategory"] = previousFixationStartedCategory
+
 def ProcessRowStringsFromFilteredCsv(filteredCsvColumns, rowStrings, categorizedCsv, AriaLabelCategories):
-    previousFixationStartedTime = 0
-    previousFixationStartedCategory = ""
-    for rowIndex, rowString in enumerate(rowStrings):
-        rowNumber = rowIndex + 1
-        strippedRowString = rowString.strip()
-        rowData = strippedRowString.split(",")
-        eventID = int(rowData[filteredCsvColumns.get("EventID")])
-        if eventID == 0:
-            # FixationStarted
-            leafSideAriaLabel = rowData[filteredCsvColumns.get("AriaLabel")]
-            category = CategorizeAriaLabel(AriaLabelCategories, leafSideAriaLabel)
-            categorizedCsv.write(str(rowNumber) + ",FixationStarted," + category + "," + strippedRowString + ",\n")
-            previousFixationStartedTime = int(rowData[filteredCsvColumns.get("AppTime")])
-            previousFixationStartedCategory = category
-        elif eventID == 1:
-            timeSpan = int(rowData[filteredCsvColumns.get("AppTime")]) - previousFixationStartedTime
-            categorizedCsv.write(str(rowNumber) + ",FixationEnded," + previousFixationStartedCategory + "," + strippedRowString + "," + str(timeSpan) + "\n")
-        elif eventID == 2:
-            categorizedCsv.write(str(rowNumber) + ",LFHFComputed," + "" + "," + strippedRowString + ",\n")
-        else:
-            categorizedCsv.write(str(rowNumber) + ",Unknown," + "" + "," + strippedRowString + ",\n")
+    categorizedCsv.writelines(GenerateRowStringsFromFilteredCsv(filteredCsvColumns, rowStrings, AriaLabelCategories))
+
+def CreateCategorizedCsvHeaders(filteredCsvHeaders):
+    return "#,Event,Category," + filteredCsvHeaders + ",TimeSpan\n"
 
 def Categorize(filteredCsvPath, filteredCsvEncoding, filteredCsvColumns,
                categorizedCsvPath, categorizedCsvEncoding,
                AriaLabelCategories):
-    with open(filteredCsvPath, mode="r", encoding=filteredCsvEncoding) as filteredCsv:
-        with open(categorizedCsvPath, mode="w", encoding=categorizedCsvEncoding) as categorizedCsv:
+    with OpenCsvFile(filteredCsvPath, "r", filteredCsvEncoding) as filteredCsv:
+        with OpenCsvFile(categorizedCsvPath, "w", categorizedCsvEncoding) as categorizedCsv:
             headers = filteredCsv.readline().strip()
-            categorizedCsv.write("#,Event,Category," + headers + ",TimeSpan\n")
-            rowStrings = filteredCsv.readlines()
+            categorizedCsv.write(CreateCategorizedCsvHeaders(headers))
+            # Process rows one by one without holding whole file
+            rowStrings = filteredCsv
             ProcessRowStringsFromFilteredCsv(filteredCsvColumns, rowStrings, categorizedCsv, AriaLabelCategories)
     print("Successfully saved: " + categorizedCsvPath)
 
 
 ## Interpolate LF/HF values
 ## Categorized csv -> Interpolated Csv
-def ProcessRowStringsFromCategorizedCsv(categorizedCsvColumns, rowStrings, interpolatedCsv, writeLFHFComputedRows):
-    hasLFHFComputedOnce = False
-    previousLFHFComputedTime = 0
-    previousComputedLFHF = 0.0
-    fixationStartedOrEndedTimes = []
-    fixationStartedOrEndedRowStrings = []
-    for rowIndex, rowString in enumerate(rowStrings):
-        strippedRowString = rowString.strip()
-        rowData = strippedRowString.split(",")
-        event = rowData[categorizedCsvColumns.get("Event")]
-        if event == "FixationStarted" or event == "FixationEnded":
-            if hasLFHFComputedOnce:
-                fixationStartedOrEndedTimes.append(int(rowData[categorizedCsvColumns.get("AppTime")]))
-                fixationStartedOrEndedRowStrings.append(strippedRowString)
+def GenerateRowStringsFromCategorizedCsv(categorizedCsvColumns, rowStrings, writeLFHFComputedRows, state=None,
+                                         rowLiterals=TextRowLiterals):
+    # state: dict to resume from and save to when rows are exhausted
+    if state is None:
+        state = {}
+    separator = rowLiterals["separator"]
+    quoteChar = rowLiterals["quoteChar"]
+    whitespace = rowLiterals["whitespace"]
+    fixationStarted = rowLiterals["FixationStarted"]
+    fixationEnded = rowLiterals["FixationEnded"]
+    lfhfComputed = rowLiterals["LFHFComputed"]
+    interpolatedRow = rowLiterals["interpolatedRow"]
+    hasLFHFComputedOnce = state.get("hasLFHFComputedOnce", False)
+    previousLFHFComputedTime = state.get("previousLFHFComputedTime", 0)
+    previousComputedLFHF = state.get("previousComputedLFHF", 0.0)
+    fixationStartedOrEndedTimes = state.get("fixationStartedOrEndedTimes", [])
+    fixationStartedOrEndedRowStrings = state.get("fixationStartedOrEndedRowStrings", [])
+    try:
+        for rowString in rowStrings:
+            strippedRowString = rowString.strip(whitespace)
+            rowData = strippedRowString.split(separator) if quoteChar not in strippedRowString else SplitQuotedRowString(strippedRowString, rowLiterals)
+            event = rowData[categorizedCsvColumns.get("Event")]
+            if event == fixationStarted or event == fixationEnded:
+                if hasLFHFComputedOnce:
+                    fixationStartedOrEndedTimes.append(int(rowData[categorizedCsvColumns.get("AppTime")]))
+                    fixationStartedOrEndedRowStrings.append(strippedRowString)
+                else:
+                    pass
+            elif event == lfhfComputed:
+                lfhfComputedTime = int(rowData[categorizedCsvColumns.get("AppTime")])
+                lfhf = float(rowData[categorizedCsvColumns.get("LFHF")])
+                if hasLFHFComputedOnce:
+                    lfhfComputedTimeDelta = lfhfComputedTime - previousLFHFComputedTime
+                    lfhfDelta = lfhf - previousComputedLFHF
+                    for fixRowTime, fixRowStr in zip(fixationStartedOrEndedTimes, fixationStartedOrEndedRowStrings):
+                        elapsedTime = fixRowTime - previousLFHFComputedTime
+                        estimatedLFHF = previousComputedLFHF + (elapsedTime * lfhfDelta / lfhfComputedTimeDelta)
+                        yield interpolatedRow % (fixRowStr, estimatedLFHF)
+                    if writeLFHFComputedRows:
+                        yield interpolatedRow % (strippedRowString, lfhf)
+                else:
+                    hasLFHFComputedOnce = True
+                    if writeLFHFComputedRows:
+                        yield interpolatedRow % (strippedRowString, lfhf)
+                previousLFHFComputedTime = lfhfComputedTime
+                previousComputedLFHF = lfhf
+                fixationStartedOrEndedTimes = []
+                fixationStartedOrEndedRowStrings = []
             else:
                 pass
-        elif event == "LFHFComputed":
-            lfhfComputedTime = int(rowData[categorizedCsvColumns.get("AppTime")])
-            lfhf = float(rowData[categorizedCsvColumns.get("LFHF")])
-            if hasLFHFComputedOnce:
-                lfhfComputedTimeDelta = lfhfComputedTime - previousLFHFComputedTime
-                lfhfDelta = lfhf - previousComputedLFHF
-                for fixRowStr in fixationStartedOrEndedRowStrings:
-                    fixRowData = fixRowStr.split(",")
-                    fixRowTime = int(fixRowData[categorizedCsvColumns.get("AppTime")])
-                    elapsedTime = fixRowTime - previousLFHFComputedTime
-                    estimatedLFHF = previousComputedLFHF + (elapsedTime * lfhfDelta / lfhfComputedTimeDelta)
-                    interpolatedCsv.write(fixRowStr + "," + f"{estimatedLFHF:.3f}" + "\n")
-                if writeLFHFComputedRows:
-                    interpolatedCsv.write(strippedRowString + "," + f"{lfhf:.3f}" + "\n")
+    finally:
+        state["hasLFHFComputedOnce"] = hasLFHFComputedOnce
+        state["previousLFHFComputedTime"] = previousLFHFComputedTime
+        state["previousComputedLFHF"] = previousComputedLFHF
+        state["fixationStartedOrEndedTimes"] = fixationStartedOrEndedTimes
+        state["fixationStartedOrEndedRowStrings"] = fixationStartedOrEndedRowStrings
+
+def GenerateRowStringsFromCategorizedCsvWithNumpy(categorizedCsvColumns, rowStrings, writeLFHFComputedRows, state=None,
+                                                  rowLiterals=TextRowLiterals):
+    import numpy as np
+    if state is None:
+        state = {}
+    separator = rowLiterals["separator"]
+    quoteChar = rowLiterals["quoteChar"]
+    whitespace = rowLiterals["whitespace"]
+    fixationStarted = rowLiterals["FixationStarted"]
+    fixationEnded = rowLiterals["FixationEnded"]
+    lfhfComputed = rowLiterals["LFHFComputed"]
+    interpolatedRow = rowLiterals["interpolatedRow"]
+    hasLFHFComputedOnce = state.get("hasLFHFComputedOnce", False)
+    previousLFHFComputedTime = state.get("previousLFHFComputedTime", 0)
+    previousComputedLFHF = state.get("previousComputedLFHF", 0.0)
+    fixationStartedOrEndedTimes = state.get("fixationStartedOrEndedTimes", [])
+    fixationStartedOrEndedRowStrings = state.get("fixationStartedOrEndedRowStrings", [])
+    try:
+        for chunk in GenerateChunks(rowStrings, LFHFChunkRows):
+            # Fixations waiting for the next LFHFComputed row come first
+            keptRowStrings = list(fixationStartedOrEndedRowStrings)
+            keptTimes = list(fixationStartedOrEndedTimes)
+            keptLFHFs = [0.0] * len(keptRowStrings)
+            keptIsLFHFComputed = [False] * len(keptRowStrings)
+            # An invalid row is raised after the rows before it, as in the row-by-row interpolation
+            rowError = None
+            for rowString in chunk:
+                strippedRowString = rowString.strip(whitespace)
+                try:
+                    rowData = strippedRowString.split(separator) if quoteChar not in strippedRowString else SplitQuotedRowString(strippedRowString, rowLiterals)
+                    event = rowData[categorizedCsvColumns.get("Event")]
+                    if event == fixationStarted or event == fixationEnded:
+                        if hasLFHFComputedOnce:
+                            keptTimes.append(int(rowData[categorizedCsvColumns.get("AppTime")]))
+                            keptRowStrings.append(strippedRowString)
+                            keptLFHFs.append(0.0)
+                            keptIsLFHFComputed.append(False)
+                    elif event == lfhfComputed:
+                        lfhfComputedTime = int(rowData[categorizedCsvColumns.get("AppTime")])
+                        lfhf = float(rowData[categorizedCsvColumns.get("LFHF")])
+                        hasLFHFComputedOnce = True
+                        keptRowStrings.append(strippedRowString)
+                        keptTimes.append(lfhfComputedTime)
+                        keptLFHFs.append(lfhf)
+                        keptIsLFHFComputed.append(True)
+                except (ValueError, IndexError) as error:
+                    rowError = error
+                    break
+            isLFHFComputed = np.array(keptIsLFHFComputed, dtype=bool)
+            lfhfComputedPositions = np.flatnonzero(isLFHFComputed)
+            if len(lfhfComputedPositions) == 0:
+                fixationStartedOrEndedRowStrings = keptRowStrings
+                fixationStartedOrEndedTimes = keptTimes
+                if rowError is not None:
+                    raise rowError
+                continue
+            # Rows after the last LFHFComputed row wait for the next chunk
+            lastLFHFComputedPosition = lfhfComputedPositions[-1]
+            rowCount = lastLFHFComputedPosition + 1
+            isLFHFComputed = isLFHFComputed[:rowCount]
+            times = np.array(keptTimes[:rowCount], dtype=np.int64)
+            # LFHFComputed rows as anchor points, preceded by the one from previous chunk
+            lfhfComputedTimes = np.concatenate(([previousLFHFComputedTime], times[isLFHFComputed]))
+            previousAnchors = np.cumsum(isLFHFComputed)[~isLFHFComputed]
+            isZeroWidth = lfhfComputedTimes[previousAnchors + 1] == lfhfComputedTimes[previousAnchors]
+            if np.any(isZeroWidth):
+                # Fixations between two LFHFComputed rows of the same time: the row-by-row interpolation
+                # raises ZeroDivisionError on the later one, after the rows up to the earlier one
+                zeroWidthAnchor = int(previousAnchors[np.argmax(isZeroWidth)])
+                rowCount = int(lfhfComputedPositions[zeroWidthAnchor - 1]) + 1 if zeroWidthAnchor > 0 else 0
+                fixationStartedOrEndedRowStrings = keptRowStrings[rowCount:lfhfComputedPositions[zeroWidthAnchor]]
+                fixationStartedOrEndedTimes = keptTimes[rowCount:lfhfComputedPositions[zeroWidthAnchor]]
+                rowError = ZeroDivisionError("float division by zero")
+                isLFHFComputed = isLFHFComputed[:rowCount]
+                times = times[:rowCount]
+                lfhfComputedTimes = lfhfComputedTimes[:zeroWidthAnchor + 1]
+                previousAnchors = np.cumsum(isLFHFComputed)[~isLFHFComputed]
             else:
-                hasLFHFComputedOnce = True
-                if writeLFHFComputedRows:
-                    interpolatedCsv.write(strippedRowString + "," + f"{lfhf:.3f}" + "\n")
-            previousLFHFComputedTime = lfhfComputedTime
-            previousComputedLFHF = lfhf
-            fixationStartedOrEndedTimes = []
-            fixationStartedOrEndedRowStrings = []
-        else:
-            pass
+                fixationStartedOrEndedRowStrings = keptRowStrings[rowCount:]
+                fixationStartedOrEndedTimes = keptTimes[rowCount:]
+            lfhfs = np.array(keptLFHFs[:rowCount], dtype=np.float64)
+            computedLFHFs = np.concatenate(([previousComputedLFHF], lfhfs[isLFHFComputed]))
+            nextAnchors = previousAnchors + 1
+            # Same arithmetic as the row-by-row interpolation to keep identical values
+            lfhfComputedTimeDeltas = lfhfComputedTimes[nextAnchors] - lfhfComputedTimes[previousAnchors]
+            lfhfDeltas = computedLFHFs[nextAnchors] - computedLFHFs[previousAnchors]
+            elapsedTimes = times[~isLFHFComputed] - lfhfComputedTimes[previousAnchors]
+            lfhfs[~isLFHFComputed] = computedLFHFs[previousAnchors] + (elapsedTimes * lfhfDeltas / lfhfComputedTimeDeltas)
+            previousLFHFComputedTime = int(lfhfComputedTimes[-1])
+            previousComputedLFHF = float(computedLFHFs[-1])
+            for keptRowString, lfhf, isLFHFComputedRow in zip(keptRowStrings, lfhfs.tolist(), isLFHFComputed.tolist()):
+                if not isLFHFComputedRow or writeLFHFComputedRows:
+                    yield interpolatedRow % (keptRowString, lfhf)
+            if rowError is not None:
+                raise rowError
+    finally:
+        state["hasLFHFComputedOnce"] = hasLFHFComputedOnce
+        state["previousLFHFComputedTime"] = previousLFHFComputedTime
+        state["previousComputedLFHF"] = previousComputedLFHF
+        state["fixationStartedOrEndedTimes"] = fixationStartedOrEndedTimes
+        state["fixationStartedOrEndedRowStrings"] = fixationStartedOrEndedRowStrings
+
+def GenerateRowStringsFromCategorizedCsvWithEngine(categorizedCsvColumns, rowStrings, writeLFHFComputedRows, lfhfEngine, state=None,
+                                                   rowLiterals=TextRowLiterals):
+    if lfhfEngine == "python":
+        return GenerateRowStringsFromCategorizedCsv(categorizedCsvColumns, rowStrings, writeLFHFComputedRows, state, rowLiterals)
+    elif lfhfEngine == "numpy":
+        return GenerateRowStringsFromCategorizedCsvWithNumpy(categorizedCsvColumns, rowStrings, writeLFHFComputedRows, state,
+                                                             rowLiterals)
+    raise ValueError("Unknown LF/HF engine: " + lfhfEngine)
+
+def ProcessRowStringsFromCategorizedCsv(categorizedCsvColumns, rowStrings, interpolatedCsv, writeLFHFComputedRows):
+    interpolatedCsv.writelines(GenerateRowStringsFromCategorizedCsv(categorizedCsvColumns, rowStrings, writeLFHFComputedRows))
+
+def CreateInterpolatedCsvHeaders(categorizedCsvHeaders):
+    return categorizedCsvHeaders + ",LFHF(Interpolated)\n"
 
 def InterpolateLFHF(categorizedCsvPath, categorizedCsvEncoding, categorizedCsvColumns,
                     interpolatedCsvPath, interpolatedCsvEncoding,
-                    writeLFHFComputedRows):
-    with open(categorizedCsvPath, mode="r", encoding=categorizedCsvEncoding) as categorizedCsv:
-        with open(interpolatedCsvPath, mode="w", encoding=interpolatedCsvEncoding) as interpolatedCsv:
+                    writeLFHFComputedRows, lfhfEngine="python"):
+    with OpenCsvFile(categorizedCsvPath, "r", categorizedCsvEncoding) as categorizedCsv:
+        with OpenCsvFile(interpolatedCsvPath, "w", interpolatedCsvEncoding) as interpolatedCsv:
             headers = categorizedCsv.readline().strip()
-            interpolatedCsv.write(headers + ",LFHF(Interpolated)\n")
-            rowStrings = categorizedCsv.readlines()
-            ProcessRowStringsFromCategorizedCsv(categorizedCsvColumns, rowStrings, interpolatedCsv, writeLFHFComputedRows)
+            interpolatedCsv.write(CreateInterpolatedCsvHeaders(headers))
+            # Process rows one by one without holding whole file
+            rowStrings = categorizedCsv
+            interpolatedCsv.writelines(GenerateRowStringsFromCategorizedCsvWithEngine(categorizedCsvColumns, rowStrings,
+                                                                                      writeLFHFComputedRows, lfhfEngine))
     print("Successfully saved: " + interpolatedCsvPath)
 
 
 ## Process interpolated LF/HF values
 ## Interpolated csv -> Processed csv
-def ProcessRowStringsFromInterpolatedCsv(interpolatedCsvColumns, rowStrings, processedCsv):
-    hasElementLFHFComputedOnce = False
-    fixationStartedLFHF = 0.0
-    previousElementLFHF = 0.0
-    for rowIndex, rowString in enumerate(rowStrings):
-        strippedRowString = rowString.strip()
-        rowData = strippedRowString.split(",")
-        event = rowData[interpolatedCsvColumns.get("Event")]
-        if event == "FixationStarted":
-            fixationStartedLFHF = float(rowData[interpolatedCsvColumns.get("InterpolatedLFHF")])
-            processedCsv.write(strippedRowString + ",,\n")
-        elif event == "FixationEnded":
-            fixationEndedLFHF = float(rowData[interpolatedCsvColumns.get("InterpolatedLFHF")])
-            elementLFHF = (fixationStartedLFHF + fixationEndedLFHF) / 2.0
-            if hasElementLFHFComputedOnce:
-                elementLFHFDelta = elementLFHF - previousElementLFHF
-                processedCsv.write(strippedRowString + "," + f"{elementLFHF:.3f}" + "," + f"{elementLFHFDelta:.3f}" + "\n")
+def GenerateRowStringsFromInterpolatedCsv(interpolatedCsvColumns, rowStrings, state=None, rowLiterals=TextRowLiterals):
+    # state: dict to resume from and save to when rows are exhausted
+    if state is None:
+        state = {}
+    separator = rowLiterals["separator"]
+    quoteChar = rowLiterals["quoteChar"]
+    whitespace = rowLiterals["whitespace"]
+    fixationStarted = rowLiterals["FixationStarted"]
+    fixationEnded = rowLiterals["FixationEnded"]
+    hasElementLFHFComputedOnce = state.get("hasElementLFHFComputedOnce", False)
+    fixationStartedLFHF = state.get("fixationStartedLFHF", 0.0)
+    previousElementLFHF = state.get("previousElementLFHF", 0.0)
+    try:
+        for rowString in rowStrings:
+            strippedRowString = rowString.strip(whitespace)
+            rowData = strippedRowString.split(separator) if quoteChar not in strippedRowString else SplitQuotedRowString(strippedRowString, rowLiterals)
+            event = rowData[interpolatedCsvColumns.get("Event")]
+            if event == fixationStarted:
+                fixationStartedLFHF = float(rowData[interpolatedCsvColumns.get("InterpolatedLFHF")])
+                yield rowLiterals["noElementLFHFRow"] % strippedRowString
+            elif event == fixationEnded:
+                fixationEndedLFHF = float(rowData[interpolatedCsvColumns.get("InterpolatedLFHF")])
+                elementLFHF = (fixationStartedLFHF + fixationEndedLFHF) / 2.0
+                if hasElementLFHFComputedOnce:
+                    elementLFHFDelta = elementLFHF - previousElementLFHF
+                    previousElementLFHF = elementLFHF
+                    yield rowLiterals["elementLFHFRow"] % (strippedRowString, elementLFHF, elementLFHFDelta)
+                else:
+                    hasElementLFHFComputedOnce = True
+                    previousElementLFHF = elementLFHF
+                    yield rowLiterals["firstElementLFHFRow"] % (strippedRowString, elementLFHF)
             else:
-                processedCsv.write(strippedRowString + "," + f"{elementLFHF:.3f}" + ",\n")
-                hasElementLFHFComputedOnce = True
-            previousElementLFHF = elementLFHF
-        else:
-            processedCsv.write(strippedRowString + ",,\n")
-            pass
+                yield rowLiterals["noElementLFHFRow"] % strippedRowString
+    finally:
+        state["hasElementLFHFComputedOnce"] = hasElementLFHFComputedOnce
+        state["fixationStartedLFHF"] = fixationStartedLFHF
+        state["previousElementLFHF"] = previousElementLFHF
+
+def GenerateRowStringsFromInterpolatedCsvWithNumpy(interpolatedCsvColumns, rowStrings, state=None, rowLiterals=TextRowLiterals):
+    import numpy as np
+    if state is None:
+        state = {}
+    separator = rowLiterals["separator"]
+    quoteChar = rowLiterals["quoteChar"]
+    newline = rowLiterals["newline"]
+    whitespace = rowLiterals["whitespace"]
+    fixationStarted = rowLiterals["FixationStarted"]
+    fixationEnded = rowLiterals["FixationEnded"]
+    lfhfValue = rowLiterals["lfhfValue"]
+    hasElementLFHFComputedOnce = state.get("hasElementLFHFComputedOnce", False)
+    fixationStartedLFHF = state.get("fixationStartedLFHF", 0.0)
+    previousElementLFHF = state.get("previousElementLFHF", 0.0)
+    try:
+        for chunk in GenerateChunks(rowStrings, LFHFChunkRows):
+            strippedRowStrings = []
+            eventsAreStarted = []
+            eventsAreEnded = []
+            interpolatedLFHFs = []
+            # An invalid row is raised after the rows before it, as in the row-by-row processing
+            rowError = None
+            for rowString in chunk:
+                strippedRowString = rowString.strip(whitespace)
+                try:
+                    rowData = strippedRowString.split(separator) if quoteChar not in strippedRowString else SplitQuotedRowString(strippedRowString, rowLiterals)
+                    event = rowData[interpolatedCsvColumns.get("Event")]
+                    if event == fixationStarted or event == fixationEnded:
+                        interpolatedLFHF = float(rowData[interpolatedCsvColumns.get("InterpolatedLFHF")])
+                    else:
+                        interpolatedLFHF = 0.0
+                except (ValueError, IndexError) as error:
+                    rowError = error
+                    break
+                strippedRowStrings.append(strippedRowString)
+                eventsAreStarted.append(event == fixationStarted)
+                eventsAreEnded.append(event == fixationEnded)
+                interpolatedLFHFs.append(interpolatedLFHF)
+            isStarted = np.array(eventsAreStarted, dtype=bool)
+            isEnded = np.array(eventsAreEnded, dtype=bool)
+            lfhfs = np.array(interpolatedLFHFs, dtype=np.float64)
+            # Pair each FixationEnded with the latest FixationStarted
+            positions = np.arange(len(strippedRowStrings))
+            startedPositions = np.maximum.accumulate(np.where(isStarted, positions, -1))
+            startedLFHFs = np.where(startedPositions >= 0, lfhfs[startedPositions], fixationStartedLFHF)
+            elementLFHFs = ((startedLFHFs + lfhfs) / 2.0)[isEnded]
+            elementLFHFDeltas = np.diff(elementLFHFs, prepend=previousElementLFHF)
+            if np.any(isStarted):
+                fixationStartedLFHF = float(startedLFHFs[-1])
+            elementLFHFStrings = [lfhfValue % elementLFHF for elementLFHF in elementLFHFs.tolist()]
+            elementLFHFDeltaStrings = [lfhfValue % elementLFHFDelta for elementLFHFDelta in elementLFHFDeltas.tolist()]
+            if len(elementLFHFs) > 0:
+                if not hasElementLFHFComputedOnce:
+                    elementLFHFDeltaStrings[0] = rowLiterals["emptyField"]
+                    hasElementLFHFComputedOnce = True
+                previousElementLFHF = float(elementLFHFs[-1])
+            elementIndex = 0
+            for strippedRowString, isEndedRow in zip(strippedRowStrings, eventsAreEnded):
+                if isEndedRow:
+                    yield (strippedRowString + separator + elementLFHFStrings[elementIndex]
+                           + separator + elementLFHFDeltaStrings[elementIndex] + newline)
+                    elementIndex += 1
+                else:
+                    yield rowLiterals["noElementLFHFRow"] % strippedRowString
+            if rowError is not None:
+                raise rowError
+    finally:
+        state["hasElementLFHFComputedOnce"] = hasElementLFHFComputedOnce
+        state["fixationStartedLFHF"] = fixationStartedLFHF
+        state["previousElementLFHF"] = previousElementLFHF
+
+def GenerateRowStringsFromInterpolatedCsvWithEngine(interpolatedCsvColumns, rowStrings, lfhfEngine, state=None,
+                                                    rowLiterals=TextRowLiterals):
+    if lfhfEngine == "python":
+        return GenerateRowStringsFromInterpolatedCsv(interpolatedCsvColumns, rowStrings, state, rowLiterals)
+    elif lfhfEngine == "numpy":
+        return GenerateRowStringsFromInterpolatedCsvWithNumpy(interpolatedCsvColumns, rowStrings, state, rowLiterals)
+    raise ValueError("Unknown LF/HF engine: " + lfhfEngine)
+
+def ProcessRowStringsFromInterpolatedCsv(interpolatedCsvColumns, rowStrings, processedCsv):
+    processedCsv.writelines(GenerateRowStringsFromInterpolatedCsv(interpolatedCsvColumns, rowStrings))
+
+def CreateProcessedCsvHeaders(interpolatedCsvHeaders):
+    return interpolatedCsvHeaders + ",LFHF(Element),LFHF(Element:Delta)\n"
+
+def CreateProcessedCsvHeadersFromFilteredCsv(filteredCsvHeaders):
+    # Headers after steps 2-4, for stages run in a single pass without intermediate files
+    categorizedCsvHeaders = CreateCategorizedCsvHeaders(filteredCsvHeaders.strip())
+    interpolatedCsvHeaders = CreateInterpolatedCsvHeaders(categorizedCsvHeaders.strip())
+    return CreateProcessedCsvHeaders(interpolatedCsvHeaders.strip())
 
 def ProcessLFHF(interpolatedCsvPath, interpolatedCsvEncoding, interpolatedCsvColumns,
-                processedCsvPath, processedCsvEncoding):
-    with open(interpolatedCsvPath, mode="r", encoding=interpolatedCsvEncoding) as interpolatedCsv:
-        with open(processedCsvPath, mode="w", encoding=processedCsvEncoding) as processedCsv:
+                processedCsvPath, processedCsvEncoding,
+                lfhfEngine="python"):
+    with OpenCsvFile(interpolatedCsvPath, "r", interpolatedCsvEncoding) as interpolatedCsv:
+        with OpenCsvFile(processedCsvPath, "w", processedCsvEncoding) as processedCsv:
             headers = interpolatedCsv.readline().strip()
-            processedCsv.write(headers + ",LFHF(Element),LFHF(Element:Delta)\n")
-            rowStrings = interpolatedCsv.readlines()
-            ProcessRowStringsFromInterpolatedCsv(interpolatedCsvColumns, rowStrings, processedCsv)
+            processedCsv.write(CreateProcessedCsvHeaders(headers))
+            # Process rows one by one without holding whole file
+            rowStrings = interpolatedCsv
+            processedCsv.writelines(GenerateRowStringsFromInterpolatedCsvWithEngine(interpolatedCsvColumns, rowStrings, lfhfEngine))
+    print("Successfully saved: " + processedCsvPath)
+
+
+## Write processed rows as a columnar table
+## Processed rows -> Parquet / Feather
+def CreateDictionaryArray(pa, values, dictionary):
+    # Values not in the dictionary (e.g. empty category) become null
+    dictionaryIndices = {value: i for i, value in enumerate(dictionary)}
+    indices = pa.array([dictionaryIndices.get(value) for value in values], type=pa.int32())
+    return pa.DictionaryArray.from_arrays(indices, pa.array(dictionary, type=pa.string()))
+
+def WriteProcessedTable(rowStrings, processedHeaders, processedTablePath, processedTableFormat, categories):
+    import pyarrow as pa
+    columnNames = processedHeaders.strip().split(",")
+    dictionaries = {
+        "Event": ProcessedTableEvents,
+        "Category": categories
+    }
+    fields = []
+    for columnName in columnNames:
+        columnType = ProcessedTableColumnTypes.get(columnName, "string")
+        if columnType == "dictionary":
+            fields.append(pa.field(columnName, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(columnName, pa.type_for_alias(columnType)))
+    schema = pa.schema(fields)
+    if processedTableFormat == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(processedTablePath, schema)
+    elif processedTableFormat == "feather":
+        writer = pa.ipc.new_file(processedTablePath, schema,
+                                 options=pa.ipc.IpcWriteOptions(compression="lz4"))
+    else:
+        raise ValueError("Unknown table format: " + processedTableFormat)
+    with writer:
+        for chunk in GenerateChunks(rowStrings, LFHFChunkRows):
+            columns = zip(*[SplitRowString(rowString.rstrip("\n")) for rowString in chunk])
+            arrays = []
+            for field, values in zip(schema, columns):
+                if pa.types.is_dictionary(field.type):
+                    arrays.append(CreateDictionaryArray(pa, values, dictionaries[field.name]))
+                elif pa.types.is_string(field.type):
+                    arrays.append(pa.array(values, type=pa.string()))
+                else:
+                    # Empty cells are missing values
+                    stringArray = pa.array([value if value != "" else None for value in values], type=pa.string())
+                    arrays.append(stringArray.cast(field.type))
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+
+
+## Read a time window of the raw csv
+## Sidecar index of Timestamp(App) -> byte offsets, sampled every RawCsvIndexRows rows
+## (rows are in time order as written by ETA-Browser)
+def BuildRawCsvIndex(rawCsvPath, rawCsvEncoding, indexRows):
+    with open(rawCsvPath, mode="rb") as rawCsv:
+        headerBytes = rawCsv.readline()
+        _, rawCsvColumns = ReadHeadersFromRawCsv(io.StringIO(headerBytes.decode(rawCsvEncoding)))
+        eventIDColumn = rawCsvColumns["EventID"]
+        appTimeColumn = rawCsvColumns["AppTime"]
+        rowLiterals = CreateBytesRowLiterals(rawCsvEncoding)
+        rawCsvStat = os.fstat(rawCsv.fileno())
+        rawCsvIndex = {
+            "rawCsvSize": rawCsvStat.st_size,
+            "rawCsvMtimeNs": rawCsvStat.st_mtime_ns,
+            "indexRows": indexRows,
+            "appTimes": [],
+            "resumeRowNumbers": [],
+            "resumeOffsets": []
+        }
+        # Resuming at a sample must reproduce the stage states of a full run:
+        # start from the LFHFComputed row before the FixationStarted row paired with
+        # the last FixationEnded row, or from the first row if there is none
+        firstRow = (1, len(headerBytes))
+        lastLFHFComputedRow = None
+        lfhfComputedRowBeforeStarted = None
+        lfhfComputedRowBeforeEnded = None
+        offset = len(headerBytes)
+        for rowNumber, rowBytes in enumerate(rawCsv, 1):
+            rowData = SplitRowString(rowBytes.strip(), rowLiterals)
+            if (rowNumber - 1) % indexRows == 0:
+                resumeRow = lfhfComputedRowBeforeEnded or firstRow
+                rawCsvIndex["appTimes"].append(int(rowData[appTimeColumn]))
+                rawCsvIndex["resumeRowNumbers"].append(resumeRow[0])
+                rawCsvIndex["resumeOffsets"].append(resumeRow[1])
+            eventID = int(rowData[eventIDColumn])
+            if eventID == 0:
+                lfhfComputedRowBeforeStarted = lastLFHFComputedRow
+            elif eventID == 1:
+                lfhfComputedRowBeforeEnded = lfhfComputedRowBeforeStarted
+            elif eventID == 2:
+                lastLFHFComputedRow = (rowNumber, offset)
+            offset += len(rowBytes)
+    return rawCsvIndex
+
+def LoadRawCsvIndex(rawCsvIndexPath, rawCsvPath, rawCsvEncoding, indexRows=RawCsvIndexRows):
+    # Rebuild the index when the raw csv changed since it was cached
+    rawCsvStat = os.stat(rawCsvPath)
+    if os.path.exists(rawCsvIndexPath):
+        with open(rawCsvIndexPath, mode="r", encoding="utf_8") as rawCsvIndexFile:
+            rawCsvIndex = json.load(rawCsvIndexFile)
+        if (rawCsvIndex["rawCsvSize"] == rawCsvStat.st_size
+            and rawCsvIndex["rawCsvMtimeNs"] == rawCsvStat.st_mtime_ns
+            and rawCsvIndex["indexRows"] == indexRows):
+            return rawCsvIndex
+    rawCsvIndex = BuildRawCsvIndex(rawCsvPath, rawCsvEncoding, indexRows)
+    try:
+        temporaryRawCsvIndexPath = rawCsvIndexPath + ".tmp"
+        with open(temporaryRawCsvIndexPath, mode="w", encoding="utf_8") as rawCsvIndexFile:
+            json.dump(rawCsvIndex, rawCsvIndexFile)
+        os.replace(temporaryRawCsvIndexPath, rawCsvIndexPath)
+        print("Successfully saved: " + rawCsvIndexPath)
+    except OSError:
+        # e.g. a read-only directory of raw csv files: use the index without caching it
+        pass
+    return rawCsvIndex
+
+def CreateWindowSuffix(startTime, endTime):
+    # "_window_600_1500.5", "_window_start_1500.5" (seconds)
+    formatTime = lambda time: ("%.3f" % (time / 1000.0)).rstrip("0").rstrip(".")
+    return ("_window_" + ("start" if startTime is None else formatTime(startTime))
+            + "_" + ("end" if endTime is None else formatTime(endTime)))
+
+def FindRawCsvSampleBefore(rawCsvIndex, startTime):
+    # Last sample before startTime
+    if startTime is None:
+        return 0
+    return max(bisect.bisect_left(rawCsvIndex["appTimes"], startTime) - 1, 0)
+
+def FindRawCsvResumeRow(rawCsvIndex, startTime):
+    # Resume row (row number, byte offset) of the last sample before startTime
+    sampleIndex = FindRawCsvSampleBefore(rawCsvIndex, startTime)
+    return rawCsvIndex["resumeRowNumbers"][sampleIndex], rawCsvIndex["resumeOffsets"][sampleIndex]
+
+def GenerateRowStringsFromMappedCsv(rawCsvMap, offset, rawCsvEncoding, rowLiterals=TextRowLiterals):
+    # Rows of the memory-mapped raw csv from offset in blocks of whole rows, decoded unless processed as bytes
+    while offset < len(rawCsvMap):
+        blockEnd = rawCsvMap.find(b"\n", min(offset + WindowReadBytes, len(rawCsvMap)) - 1)
+        blockEnd = len(rawCsvMap) if blockEnd < 0 else blockEnd + 1
+        if rowLiterals["encoding"] is None:
+            yield from io.StringIO(rawCsvMap[offset:blockEnd].decode(rawCsvEncoding), newline=None)
+        else:
+            yield from io.BytesIO(rawCsvMap[offset:blockEnd])
+        offset = blockEnd
+
+def GenerateRowStringsUntilWindowEnd(filteredCsvColumns, rowStrings, window, rowLiterals=TextRowLiterals):
+    # Rows before the end of the window are interpolated once the next LFHFComputed row is read
+    endTime = window.get("endTime")
+    endRowNumber = window.get("endRowNumber")
+    lastColumn = max(filteredCsvColumns.get("EventID"), filteredCsvColumns.get("AppTime"))
+    for rowNumber, rowString in enumerate(rowStrings, window["resumeRowNumber"]):
+        yield rowString
+        if endTime is None and rowNumber < endRowNumber:
+            continue
+        rowData = rowString.split(rowLiterals["separator"], lastColumn + 1)
+        if (int(rowData[filteredCsvColumns.get("EventID")]) == 2
+            and ((endTime is not None and int(rowData[filteredCsvColumns.get("AppTime")]) >= endTime)
+                 or (endRowNumber is not None and rowNumber >= endRowNumber))):
+            return
+
+def GenerateRowStringsFromRawCsvWindow(rawCsvMap, rawCsvEncoding, engine, rawCsvColumns, filteredCsvColumns, window,
+                                       rowLiterals=TextRowLiterals):
+    # Filtered rows from the resume row of the window to its end
+    rowStrings = GenerateRowStringsFromMappedCsv(rawCsvMap, window["resumeOffset"], rawCsvEncoding, rowLiterals)
+    if rowLiterals["encoding"] is None:
+        rowStrings = GenerateRowStringsFromRawCsvWithEngine(rowStrings, None, rawCsvEncoding, engine, rawCsvColumns)
+    else:
+        rowStrings = GenerateRowStringsFromRawCsv(rowStrings, rawCsvColumns, rowLiterals)
+    if window.get("endTime") is not None or window.get("endRowNumber") is not None:
+        rowStrings = GenerateRowStringsUntilWindowEnd(filteredCsvColumns, rowStrings, window, rowLiterals)
+    return rowStrings
+
+def SelectRowStringsInWindow(interpolatedCsvColumns, rowStrings, window, rowLiterals=TextRowLiterals):
+    # Rows of [startTime, endTime) and [firstRowNumber, endRowNumber), each bound optional
+    separator = rowLiterals["separator"]
+    startTime = window.get("startTime")
+    endTime = window.get("endTime")
+    firstRowNumber = window.get("firstRowNumber")
+    endRowNumber = window.get("endRowNumber")
+    numberColumn = interpolatedCsvColumns.get("Number")
+    appTimeColumn = interpolatedCsvColumns.get("AppTime")
+    # Rows keep the order of row numbers, so those out of the row range are only at both ends
+    if firstRowNumber is not None:
+        rowStrings = itertools.dropwhile(lambda rowString: int(rowString.split(separator, numberColumn + 1)[numberColumn]) < firstRowNumber,
+                                         rowStrings)
+    if endRowNumber is not None:
+        rowStrings = itertools.takewhile(lambda rowString: int(rowString.split(separator, numberColumn + 1)[numberColumn]) < endRowNumber,
+                                         rowStrings)
+    if startTime is None and endTime is None:
+        return rowStrings
+    return (rowString for rowString in rowStrings
+            if (startTime is None or int(rowString.split(separator, appTimeColumn + 1)[appTimeColumn]) >= startTime)
+            and (endTime is None or int(rowString.split(separator, appTimeColumn + 1)[appTimeColumn]) < endTime))
+
+
+## Run all stages in a single pass
+## Raw csv -> (Filtered csv -> Categorized csv -> Interpolated csv ->) Processed csv
+def TeeRowStrings(rowStrings, csvFile):
+    for rowString in rowStrings:
+        csvFile.write(rowString)
+        yield rowString
+
+def CanProcessInBytes(rawCsvEncoding, outputCsvEncoding, engine):
+    # Rows read and written in the same encoding are copied through as bytes, and only the fields to
+    # interpret are parsed from them, unless the raw csv is parsed as text by another engine
+    # (rows written as text also end with os.linesep)
+    outputEncodingName = codecs.lookup(outputCsvEncoding).name
+    return (codecs.lookup(rawCsvEncoding).name == outputEncodingName and outputEncodingName in BytesModeEncodings
+            and engine == "python" and os.linesep == "\n")
+
+def CreateBytesRowLiterals(encoding):
+    # Literals of TextRowLiterals encoded, to run the same stages on rows as bytes
+    rowLiterals = {name: literal.encode(encoding) for name, literal in TextRowLiterals.items() if name != "encoding"}
+    rowLiterals["encoding"] = encoding
+    rowLiterals["quoteChar"] = rowLiterals["quote"][0]
+    return rowLiterals
+
+def ProcessAllStages(rawCsvPath, rawCsvEncoding,
+                     filteredCsvPath, filteredCsvColumns,
+                     categorizedCsvPath, categorizedCsvColumns,
+                     interpolatedCsvPath, interpolatedCsvColumns,
+                     processedCsvPath, outputCsvEncoding,
+                     AriaLabelCategories, writeLFHFComputedRows, emitIntermediates,
+                     engine="python", lfhfEngine="python", processedTableFormat="csv", startStep=1,
+                     stepRecords=None, window=None):
+    # startStep > 1 resumes from the csv file written by the previous step
+    # window: rows of [startTime, endTime) read from the resume row (see FindRawCsvResumeRow)
+    # stepRecords: records of steps 1-4 to profile into (None: no instrumentation)
+    categorizer = AriaLabelCategorizer(AriaLabelCategories)
+    inBytes = CanProcessInBytes(rawCsvEncoding, outputCsvEncoding, engine)
+    rowLiterals = CreateBytesRowLiterals(outputCsvEncoding) if inBytes else TextRowLiterals
+    rowCategorizer = AriaLabelBytesCategorizer(categorizer, outputCsvEncoding) if inBytes else categorizer
+    # Headers are handled as text either way
+    readMode, writeMode, fileEncoding = ("rb", "wb", None) if inBytes else ("r", "w", outputCsvEncoding)
+    encodeHeaders = (lambda headers: headers.encode(outputCsvEncoding)) if inBytes else (lambda headers: headers)
+    savedCsvPaths = []
+    activeProfilers = []
+    profileRowStrings = lambda rowStrings, step: rowStrings
+    if stepRecords is not None:
+        profileRowStrings = lambda rowStrings, step: ProfileRowStrings(rowStrings, stepRecords[step - 1], activeProfilers)
+    with contextlib.ExitStack() as stack:
+        # Chain stages as generators over the rows of the raw csv
+        categorizeState = None
+        if startStep == 1 and window is not None:
+            originalCsv = stack.enter_context(open(rawCsvPath, mode="rb"))
+            rawCsvMap = stack.enter_context(mmap.mmap(originalCsv.fileno(), 0, access=mmap.ACCESS_READ))
+            headers, rawCsvColumns = ReadHeadersFromRawCsv(io.StringIO(rawCsvMap.readline().decode(rawCsvEncoding)))
+            rowStrings = GenerateRowStringsFromRawCsvWindow(rawCsvMap, rawCsvEncoding, engine, rawCsvColumns,
+                                                            filteredCsvColumns, window, rowLiterals)
+            categorizeState = {"rowNumber": window["resumeRowNumber"] - 1}
+        elif startStep == 1 and inBytes:
+            originalCsv = stack.enter_context(OpenCsvFile(rawCsvPath, "rb"))
+            headers, rawCsvColumns = ReadHeadersFromRawCsv(io.StringIO(originalCsv.readline().decode(rawCsvEncoding)))
+            rowStrings = GenerateRowStringsFromRawCsv(originalCsv, rawCsvColumns, rowLiterals)
+        elif startStep == 1:
+            originalCsv = stack.enter_context(OpenCsvFile(rawCsvPath, "r", rawCsvEncoding))
+            headers, rawCsvColumns = ReadHeadersFromRawCsv(originalCsv)
+            rowStrings = GenerateRowStringsFromRawCsvWithEngine(originalCsv, rawCsvPath, rawCsvEncoding, engine, rawCsvColumns)
+        else:
+            previousCsvPath = [filteredCsvPath, categorizedCsvPath, interpolatedCsvPath][startStep - 2]
+            previousCsv = stack.enter_context(OpenCsvFile(previousCsvPath, readMode, fileEncoding))
+            headers = previousCsv.readline()
+            if inBytes:
+                headers = headers.decode(outputCsvEncoding)
+            rowStrings = previousCsv
+        if startStep <= 1 and emitIntermediates:
+            filteredCsv = stack.enter_context(OpenCsvFile(filteredCsvPath, writeMode, fileEncoding))
+            filteredCsv.write(encodeHeaders(headers))
+            rowStrings = TeeRowStrings(rowStrings, filteredCsv)
+            savedCsvPaths.append(filteredCsvPath)
+        if startStep <= 1:
+            rowStrings = profileRowStrings(rowStrings, 1)
+        if startStep <= 2:
+            headers = CreateCategorizedCsvHeaders(headers.strip())
+            rowStrings = GenerateRowStringsFromFilteredCsv(filteredCsvColumns, rowStrings, AriaLabelCategories, rowCategorizer,
+                                                           categorizeState, rowLiterals)
+            if emitIntermediates:
+                categorizedCsv = stack.enter_context(OpenCsvFile(categorizedCsvPath, writeMode, fileEncoding))
+                categorizedCsv.write(encodeHeaders(headers))
+                rowStrings = TeeRowStrings(rowStrings, categorizedCsv)
+                savedCsvPaths.append(categorizedCsvPath)
+            rowStrings = profileRowStrings(rowStrings, 2)
+        if startStep <= 3:
+            headers = CreateInterpolatedCsvHeaders(headers.strip())
+            rowStrings = GenerateRowStringsFromCategorizedCsvWithEngine(categorizedCsvColumns, rowStrings, writeLFHFComputedRows, lfhfEngine,
+                                                                        None, rowLiterals)
+            if emitIntermediates:
+                interpolatedCsv = stack.enter_context(OpenCsvFile(interpolatedCsvPath, writeMode, fileEncoding))
+                interpolatedCsv.write(encodeHeaders(headers))
+                rowStrings = TeeRowStrings(rowStrings, interpolatedCsv)
+                savedCsvPaths.append(interpolatedCsvPath)
+            rowStrings = profileRowStrings(rowStrings, 3)
+        headers = CreateProcessedCsvHeaders(headers.strip())
+        rowStrings = GenerateRowStringsFromInterpolatedCsvWithEngine(interpolatedCsvColumns, rowStrings, lfhfEngine, None, rowLiterals)
+        if window is not None:
+            rowStrings = SelectRowStringsInWindow(interpolatedCsvColumns, rowStrings, window, rowLiterals)
+        # Pull all rows through the chain
+        rowStrings = profileRowStrings(rowStrings, 4)
+        if processedTableFormat == "csv":
+            processedCsv = stack.enter_context(OpenCsvFile(processedCsvPath, writeMode, fileEncoding))
+            processedCsv.write(encodeHeaders(headers))
+            processedCsv.writelines(rowStrings)
+        else:
+            if inBytes:
+                rowStrings = (rowString.decode(outputCsvEncoding) for rowString in rowStrings)
+            WriteProcessedTable(rowStrings, headers, processedCsvPath, processedTableFormat,
+                                categorizer.ListCategories())
+        savedCsvPaths.append(processedCsvPath)
+    for savedCsvPath in savedCsvPaths:
+        print("Successfully saved: " + savedCsvPath)
+    return savedCsvPaths
+
+
+## Profile steps of a single pass
+## Steps stream rows through each other, so each step is timed inside next() of its rows
+## (upstream steps included) and its own time is the difference to the upstream step
+def CreateStepRecord(step, name, withCProfile):
+    return {
+        "step": step,
+        "name": name,
+        "inclusiveWallSeconds": 0.0,
+        "inclusiveCPUSeconds": 0.0,
+        "rowsOut": 0,
+        "profiler": cProfile.Profile() if withCProfile else None
+    }
+
+def SwitchToProfiler(activeProfilers, profiler):
+    if activeProfilers:
+        activeProfilers[-1].disable()
+    activeProfilers.append(profiler)
+    profiler.enable()
+
+def SwitchBackFromProfiler(activeProfilers):
+    activeProfilers.pop().disable()
+    if activeProfilers:
+        activeProfilers[-1].enable()
+
+def ProfileRowStrings(rowStrings, stepRecord, activeProfilers):
+    # Only the profiler of the step whose code is running is enabled
+    iterator = iter(rowStrings)
+    profiler = stepRecord["profiler"]
+    while True:
+        startedTime = time.perf_counter()
+        startedCPUTime = time.process_time()
+        if profiler is not None:
+            SwitchToProfiler(activeProfilers, profiler)
+        try:
+            rowString = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            if profiler is not None:
+                SwitchBackFromProfiler(activeProfilers)
+            stepRecord["inclusiveWallSeconds"] += time.perf_counter() - startedTime
+            stepRecord["inclusiveCPUSeconds"] += time.process_time() - startedCPUTime
+        stepRecord["rowsOut"] += 1
+        yield rowString
+
+def CreateProfileReport(stepRecords, stepInputPaths, stepOutputPaths, startStep, wallSeconds, cpuSeconds):
+    # Steps before startStep did not run: their outputs were up to date in the manifest
+    steps = [{"step": stepRecord["step"], "name": stepRecord["name"], "skipped": True} for stepRecord in stepRecords[:startStep - 1]]
+    upstreamRecord = None
+    for stepRecord in stepRecords[startStep - 1:]:
+        step = stepRecord["step"]
+        inputPath = stepInputPaths[step - 1]
+        outputPath = stepOutputPaths[step - 1]
+        steps.append({
+            "step": step,
+            "name": stepRecord["name"],
+            "wallSeconds": stepRecord["inclusiveWallSeconds"] - (upstreamRecord["inclusiveWallSeconds"] if upstreamRecord else 0.0),
+            "cpuSeconds": stepRecord["inclusiveCPUSeconds"] - (upstreamRecord["inclusiveCPUSeconds"] if upstreamRecord else 0.0),
+            "rowsIn": upstreamRecord["rowsOut"] if upstreamRecord else stepRecord["rowsOut"],
+            "rowsOut": stepRecord["rowsOut"],
+            # Steps 2-4 read rows from the previous step in memory unless resumed from its csv file
+            "bytesRead": os.path.getsize(inputPath) if upstreamRecord is None else 0,
+            "bytesWritten": os.path.getsize(outputPath) if outputPath is not None and os.path.exists(outputPath) else 0
+        })
+        upstreamRecord = stepRecord
+    return {
+        "wallSeconds": wallSeconds,
+        "cpuSeconds": cpuSeconds,
+        # Steps run interleaved in one pass, so peak RSS is that of the whole pass
+        "peakRSSMB": ReadPeakRSSMegabytes(),
+        "steps": steps
+    }
+
+def WriteProfileReport(profilePath, profileReport, stepRecords):
+    # With cProfile, also dump the stats of the step with the longest own wall time
+    runSteps = [step for step in profileReport["steps"] if not step.get("skipped", False)]
+    if stepRecords[0]["profiler"] is not None and runSteps:
+        slowestStep = max(runSteps, key=lambda step: step["wallSeconds"])
+        cProfilePath = os.path.splitext(profilePath)[0] + "_step_" + str(slowestStep["step"]) + ".prof"
+        stepRecords[slowestStep["step"] - 1]["profiler"].dump_stats(cProfilePath)
+        profileReport["cProfile"] = {"step": slowestStep["step"], "path": cProfilePath}
+        print("Successfully saved: " + cProfilePath)
+    with open(profilePath, mode="w", encoding="utf_8") as profileFile:
+        json.dump(profileReport, profileFile, ensure_ascii=False, indent=2)
+    print("Successfully saved: " + profilePath)
+
+
+## Skip stages whose inputs and options are unchanged
+## Manifest of content-addressed stage keys in the output directory
+def HashFile(path):
+    fileHash = hashlib.sha256()
+    with open(path, mode="rb") as hashedFile:
+        for block in iter(lambda: hashedFile.read(HashBlockBytes), b""):
+            fileHash.update(block)
+    return fileHash.hexdigest()
+
+def HashRawCsv(rawCsvPath, manifest):
+    # Hash recorded by the last run, while the raw csv keeps its size and mtime
+    rawCsvStat = os.stat(rawCsvPath)
+    recordedRawCsv = manifest.get("rawCsv", {})
+    if (recordedRawCsv.get("size") == rawCsvStat.st_size
+        and recordedRawCsv.get("mtimeNs") == rawCsvStat.st_mtime_ns):
+        return recordedRawCsv["hash"]
+    rawCsvHash = HashFile(rawCsvPath)
+    manifest["rawCsv"] = {"size": rawCsvStat.st_size, "mtimeNs": rawCsvStat.st_mtime_ns, "hash": rawCsvHash}
+    return rawCsvHash
+
+def CreateCategoryTableVersion(AriaLabelCategories):
+    categoryTableString = json.dumps(list(AriaLabelCategories.items()), ensure_ascii=False)
+    return hashlib.sha256(categoryTableString.encode("utf_8")).hexdigest()
+
+def CreateStageRecords(rawCsvHash, stageOptions, stageOutputPaths):
+    # Each key addresses the content of a stage output:
+    # hash of the previous key (or raw csv hash) and the options of the stage
+    stageRecords = []
+    inputHash = rawCsvHash
+    for options, outputPath in zip(stageOptions, stageOutputPaths):
+        keyString = json.dumps({"inputHash": inputHash, "options": options}, sort_keys=True)
+        key = hashlib.sha256(keyString.encode("utf_8")).hexdigest()
+        stageRecords.append({
+            "inputHash": inputHash,
+            "options": options,
+            "key": key,
+            "output": outputPath
+        })
+        inputHash = key
+    return stageRecords
+
+def LoadManifest(manifestPath):
+    if not os.path.exists(manifestPath):
+        return {"stages": {}}
+    with open(manifestPath, mode="r", encoding="utf_8") as manifestFile:
+        return json.load(manifestFile)
+
+def SaveManifest(manifestPath, manifest):
+    temporaryManifestPath = manifestPath + ".tmp"
+    with open(temporaryManifestPath, mode="w", encoding="utf_8") as manifestFile:
+        json.dump(manifest, manifestFile, ensure_ascii=False, indent=2)
+    os.replace(temporaryManifestPath, manifestPath)
+
+def IsStageUpToDate(manifest, step, stageRecord):
+    recordedStage = manifest["stages"].get(str(step))
+    if recordedStage is None or recordedStage["key"] != stageRecord["key"]:
+        return False
+    # The output must still be the file written when the key was recorded
+    outputPath = stageRecord["output"]
+    if not os.path.exists(outputPath):
+        return False
+    outputStat = os.stat(outputPath)
+    return (recordedStage["outputSize"] == outputStat.st_size
+            and recordedStage["outputMtimeNs"] == outputStat.st_mtime_ns)
+
+def FindStepToStartFrom(manifest, stageRecords, requestedSteps):
+    # 5: every requested output is up to date, 1: start from the raw csv
+    # requestedSteps: steps whose outputs must exist (intermediates only with --emit-intermediates)
+    outdatedSteps = [step for step in requestedSteps if not IsStageUpToDate(manifest, step, stageRecords[step - 1])]
+    if len(outdatedSteps) == 0:
+        return len(stageRecords) + 1
+    # Resume from the output of the last up to date step before the first outdated one
+    for step in range(min(outdatedSteps) - 1, 0, -1):
+        if IsStageUpToDate(manifest, step, stageRecords[step - 1]):
+            return step + 1
+    return 1
+
+def UpdateManifest(manifest, stageRecords, startStep, savedCsvPaths):
+    for step in range(startStep, len(stageRecords) + 1):
+        stageRecord = stageRecords[step - 1]
+        if stageRecord["output"] in savedCsvPaths:
+            outputStat = os.stat(stageRecord["output"])
+            manifest["stages"][str(step)] = dict(stageRecord,
+                                                 outputSize=outputStat.st_size,
+                                                 outputMtimeNs=outputStat.st_mtime_ns)
+        elif manifest["stages"].get(str(step), stageRecord)["key"] != stageRecord["key"]:
+            # Not rewritten and recorded from other inputs or options, so a previous output of this step is stale
+            # (an output with the same key is still valid, e.g. step 1-3 on --force without --emit-intermediates)
+            manifest["stages"].pop(str(step))
+            if os.path.exists(stageRecord["output"]):
+                os.remove(stageRecord["output"])
+                print("Removed stale: " + stageRecord["output"])
+    return manifest
+
+
+## Follow a raw csv that is still being recorded
+## Raw csv (being appended) -> Processed csv (appended)
+def CreateStageStates():
+    return {
+        "categorize": {},
+        "interpolateLFHF": {},
+        "processLFHF": {}
+    }
+
+def GenerateProcessedRowStrings(filteredRowStrings, AriaLabelCategories, categorizer, writeLFHFComputedRows, stageStates,
+                                lfhfEngine="python", rowLiterals=TextRowLiterals):
+    rowStrings = GenerateRowStringsFromFilteredCsv(FilteredCsvColumns, filteredRowStrings, AriaLabelCategories,
+                                                   categorizer, stageStates["categorize"], rowLiterals)
+    rowStrings = GenerateRowStringsFromCategorizedCsvWithEngine(CategorizedCsvColumns, rowStrings, writeLFHFComputedRows,
+                                                                lfhfEngine, stageStates["interpolateLFHF"], rowLiterals)
+    return GenerateRowStringsFromInterpolatedCsvWithEngine(InterpolatedCsvColumns, rowStrings, lfhfEngine,
+                                                           stageStates["processLFHF"], rowLiterals)
+
+def LoadFollowCheckpoint(checkpointPath):
+    if not os.path.exists(checkpointPath):
+        return None
+    with open(checkpointPath, mode="r", encoding="utf_8") as checkpointFile:
+        return json.load(checkpointFile)
+
+def SaveFollowCheckpoint(checkpointPath, checkpoint):
+    # Replace atomically so that a killed follower never leaves a broken checkpoint
+    temporaryCheckpointPath = checkpointPath + ".tmp"
+    with open(temporaryCheckpointPath, mode="w", encoding="utf_8") as checkpointFile:
+        json.dump(checkpoint, checkpointFile, ensure_ascii=False)
+    os.replace(temporaryCheckpointPath, checkpointPath)
+
+def ReadRawCsvHeaderBytes(rawCsv, followInterval):
+    # Wait until ETA-Browser has written the whole header row
+    headerBytes = rawCsv.readline()
+    while not headerBytes.endswith(b"\n"):
+        time.sleep(followInterval)
+        rawCsv.seek(0)
+        headerBytes = rawCsv.readline()
+    return headerBytes
+
+def FollowRawCsv(rawCsvPath, rawCsvEncoding, processedCsvPath, processedCsvEncoding, checkpointPath,
+                 AriaLabelCategories, writeLFHFComputedRows, followInterval, followIdleTimeout):
+    categorizer = AriaLabelCategorizer(AriaLabelCategories)
+    with open(rawCsvPath, mode="rb") as rawCsv:
+        headerBytes = ReadRawCsvHeaderBytes(rawCsv, followInterval)
+        filteredHeaders, rawCsvColumns = ReadHeadersFromRawCsv(io.StringIO(headerBytes.decode(rawCsvEncoding)))
+        processedHeaders = CreateProcessedCsvHeadersFromFilteredCsv(filteredHeaders)
+        # Resume only from a checkpoint of the same session and options
+        checkpoint = LoadFollowCheckpoint(checkpointPath)
+        if (checkpoint is not None
+            and checkpoint["rawCsvPath"] == os.path.abspath(rawCsvPath)
+            and checkpoint.get("rawCsvEncoding") == rawCsvEncoding
+            and checkpoint.get("processedCsvEncoding") == processedCsvEncoding
+            and checkpoint["writeLFHFComputedRows"] == writeLFHFComputedRows
+            and checkpoint["rawCsvOffset"] <= os.path.getsize(rawCsvPath)
+            and os.path.exists(processedCsvPath)):
+            processedCsv = open(processedCsvPath, mode="r+b")
+            # Drop rows written after the last checkpoint
+            processedCsv.truncate(checkpoint["processedCsvSize"])
+            processedCsv.seek(checkpoint["processedCsvSize"])
+            print("Resumed from: " + checkpointPath)
+        else:
+            checkpoint = {
+                "rawCsvPath": os.path.abspath(rawCsvPath),
+                # Offsets and sizes are in bytes of these encodings
+                "rawCsvEncoding": rawCsvEncoding,
+                "processedCsvEncoding": processedCsvEncoding,
+                "writeLFHFComputedRows": writeLFHFComputedRows,
+                "rawCsvOffset": len(headerBytes),
+                "processedCsvSize": 0,
+                "stageStates": CreateStageStates()
+            }
+            processedCsv = open(processedCsvPath, mode="wb")
+            processedCsv.write(processedHeaders.encode(processedCsvEncoding))
+        with processedCsv:
+            rawCsv.seek(checkpoint["rawCsvOffset"])
+            idleStartTime = time.monotonic()
+            try:
+                while True:
+                    newBytes = rawCsv.read(FollowReadBytes)
+                    lastNewlineIndex = newBytes.rfind(b"\n")
+                    if lastNewlineIndex < 0:
+                        # No complete row yet
+                        rawCsv.seek(checkpoint["rawCsvOffset"])
+                        if followIdleTimeout > 0 and time.monotonic() - idleStartTime >= followIdleTimeout:
+                            break
+                        time.sleep(followInterval)
+                        continue
+                    completeBytes = newBytes[:lastNewlineIndex + 1]
+                    rawCsv.seek(checkpoint["rawCsvOffset"] + len(completeBytes))
+                    # Process newly arrived rows with the stage states carried over
+                    rowStrings = GenerateRowStringsFromRawCsv(io.StringIO(completeBytes.decode(rawCsvEncoding), newline=None),
+                                                              rawCsvColumns)
+                    rowStrings = GenerateProcessedRowStrings(rowStrings, AriaLabelCategories, categorizer,
+                                                             writeLFHFComputedRows, checkpoint["stageStates"])
+                    processedCsv.write("".join(rowStrings).encode(processedCsvEncoding))
+                    processedCsv.flush()
+                    checkpoint["rawCsvOffset"] += len(completeBytes)
+                    checkpoint["processedCsvSize"] = processedCsv.tell()
+                    SaveFollowCheckpoint(checkpointPath, checkpoint)
+                    idleStartTime = time.monotonic()
+            except KeyboardInterrupt:
+                pass
+    print("Successfully saved: " + processedCsvPath)
+
+
+## Process a single raw csv in chunks in parallel
+## Each chunk starts at a resume row (as in the index), so the stage states of a serial run
+## are rebuilt from a few rows before the chunk and stitching is plain concatenation
+def CountRowsInMappedCsv(rawCsvMap, start, end):
+    return sum(rawCsvMap[blockStart:min(blockStart + WindowReadBytes, end)].count(b"\n")
+               for blockStart in range(start, end, WindowReadBytes))
+
+def FindResumeRowInMappedCsv(rawCsvMap, rowNumber, offset, firstRow, eventIDColumn, rowLiterals):
+    # Resume row (row number, byte offset) of the row at offset, reading rows backwards:
+    # the LFHFComputed row before the FixationStarted row paired with the last FixationEnded row
+    awaitedEventIDs = [1, 0, 2]
+    rowEnd = offset
+    while rowEnd > firstRow[1]:
+        rowStart = rawCsvMap.rfind(b"\n", firstRow[1] - 1, rowEnd - 1) + 1
+        rowNumber -= 1
+        eventID = int(SplitRowString(rawCsvMap[rowStart:rowEnd].strip(), rowLiterals)[eventIDColumn])
+        if eventID == awaitedEventIDs[0]:
+            awaitedEventIDs.pop(0)
+            if len(awaitedEventIDs) == 0:
+                return rowNumber, rowStart
+        rowEnd = rowStart
+    return firstRow
+
+def CreateRawCsvChunksAtOffsets(rawCsvPath, rawCsvEncoding, chunkCount):
+    # Byte ranges of about the same size starting at whole rows, without the index of the raw csv
+    with open(rawCsvPath, mode="rb") as rawCsv, \
+         mmap.mmap(rawCsv.fileno(), 0, access=mmap.ACCESS_READ) as rawCsvMap:
+        headerBytes = rawCsvMap.readline()
+        _, rawCsvColumns = ReadHeadersFromRawCsv(io.StringIO(headerBytes.decode(rawCsvEncoding)))
+        rowLiterals = CreateBytesRowLiterals(rawCsvEncoding)
+        firstRow = (1, len(headerBytes))
+        boundaryRows = [firstRow]
+        for i in range(1, chunkCount):
+            offset = rawCsvMap.find(b"\n", firstRow[1] + (len(rawCsvMap) - firstRow[1]) * i // chunkCount - 1) + 1
+            if boundaryRows[-1][1] < offset < len(rawCsvMap):
+                rowNumber = boundaryRows[-1][0] + CountRowsInMappedCsv(rawCsvMap, boundaryRows[-1][1], offset)
+                boundaryRows.append((rowNumber, offset))
+        chunks = []
+        for i, (rowNumber, offset) in enumerate(boundaryRows):
+            isFirstChunk = i == 0
+            isLastChunk = i == len(boundaryRows) - 1
+            resumeRowNumber, resumeOffset = firstRow if isFirstChunk else \
+                FindResumeRowInMappedCsv(rawCsvMap, rowNumber, offset, firstRow, rawCsvColumns["EventID"], rowLiterals)
+            chunks.append({
+                "startTime": None,
+                "endTime": None,
+                "resumeRowNumber": resumeRowNumber,
+                "resumeOffset": resumeOffset,
+                "firstRowNumber": None if isFirstChunk else rowNumber,
+                "endRowNumber": None if isLastChunk else boundaryRows[i + 1][0]
+            })
+    return chunks
+
+def CreateRawCsvChunks(rawCsvIndex, window, chunkCount):
+    # Row ranges between samples of the index, within the time window
+    firstSampleIndex = FindRawCsvSampleBefore(rawCsvIndex, window["startTime"])
+    endSampleIndex = len(rawCsvIndex["appTimes"])
+    if window["endTime"] is not None:
+        endSampleIndex = max(bisect.bisect_left(rawCsvIndex["appTimes"], window["endTime"]), firstSampleIndex + 1)
+    sampleCount = endSampleIndex - firstSampleIndex
+    boundarySampleIndices = sorted(set(firstSampleIndex + sampleCount * i // chunkCount for i in range(chunkCount)))
+    chunks = []
+    for i, sampleIndex in enumerate(boundarySampleIndices):
+        isFirstChunk = i == 0
+        isLastChunk = i == len(boundarySampleIndices) - 1
+        chunks.append({
+            "startTime": window["startTime"],
+            "endTime": window["endTime"],
+            "resumeRowNumber": rawCsvIndex["resumeRowNumbers"][sampleIndex],
+            "resumeOffset": rawCsvIndex["resumeOffsets"][sampleIndex],
+            "firstRowNumber": None if isFirstChunk else sampleIndex * rawCsvIndex["indexRows"] + 1,
+            "endRowNumber": None if isLastChunk else boundarySampleIndices[i + 1] * rawCsvIndex["indexRows"] + 1
+        })
+    return chunks
+
+def ProcessRawCsvChunk(rawCsvPath, rawCsvEncoding, chunkCsvPath, outputCsvEncoding,
+                       AriaLabelCategories, writeLFHFComputedRows, engine, lfhfEngine, chunk):
+    # Run in a worker process: processed rows of the chunk without headers
+    categorizer = AriaLabelCategorizer(AriaLabelCategories)
+    inBytes = CanProcessInBytes(rawCsvEncoding, outputCsvEncoding, engine)
+    rowLiterals = CreateBytesRowLiterals(outputCsvEncoding) if inBytes else TextRowLiterals
+    rowCategorizer = AriaLabelBytesCategorizer(categorizer, outputCsvEncoding) if inBytes else categorizer
+    stageStates = CreateStageStates()
+    stageStates["categorize"]["rowNumber"] = chunk["resumeRowNumber"] - 1
+    with open(rawCsvPath, mode="rb") as originalCsv, \
+         mmap.mmap(originalCsv.fileno(), 0, access=mmap.ACCESS_READ) as rawCsvMap, \
+         (open(chunkCsvPath, mode="wb") if inBytes else open(chunkCsvPath, mode="w", encoding=outputCsvEncoding)) as chunkCsv:
+        _, rawCsvColumns = ReadHeadersFromRawCsv(io.StringIO(rawCsvMap.readline().decode(rawCsvEncoding)))
+        rowStrings = GenerateRowStringsFromRawCsvWindow(rawCsvMap, rawCsvEncoding, engine, rawCsvColumns,
+                                                        FilteredCsvColumns, chunk, rowLiterals)
+        rowStrings = GenerateProcessedRowStrings(rowStrings, AriaLabelCategories, rowCategorizer, writeLFHFComputedRows,
+                                                 stageStates, lfhfEngine, rowLiterals)
+        chunkCsv.writelines(SelectRowStringsInWindow(InterpolatedCsvColumns, rowStrings, chunk, rowLiterals))
+
+def GenerateRowStringsFromChunkCsvs(chunkCsvPaths, outputCsvEncoding):
+    for chunkCsvPath in chunkCsvPaths:
+        with open(chunkCsvPath, mode="r", encoding=outputCsvEncoding) as chunkCsv:
+            yield from chunkCsv
+
+def ProcessAllStagesInChunks(rawCsvPath, rawCsvEncoding, processedCsvPath, outputCsvEncoding,
+                             AriaLabelCategories, writeLFHFComputedRows, engine, lfhfEngine, processedTableFormat,
+                             rawCsvIndex, window, chunkJobs):
+    # rawCsvIndex and window: None for the whole raw csv
+    if window is None:
+        chunks = CreateRawCsvChunksAtOffsets(rawCsvPath, rawCsvEncoding, chunkJobs * ChunksPerJob)
+    else:
+        chunks = CreateRawCsvChunks(rawCsvIndex, window, chunkJobs * ChunksPerJob)
+    chunkCsvPaths = [os.path.splitext(processedCsvPath)[0] + "_chunk_" + str(i) + ".csv" for i in range(len(chunks))]
+    with OpenCsvFile(rawCsvPath, "r", rawCsvEncoding) as originalCsv:
+        headers, _ = ReadHeadersFromRawCsv(originalCsv)
+    headers = CreateProcessedCsvHeadersFromFilteredCsv(headers)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(chunkJobs, len(chunks))) as executor:
+            futures = [executor.submit(ProcessRawCsvChunk, rawCsvPath, rawCsvEncoding, chunkCsvPath, outputCsvEncoding,
+                                       AriaLabelCategories, writeLFHFComputedRows, engine, lfhfEngine, chunk)
+                       for chunkCsvPath, chunk in zip(chunkCsvPaths, chunks)]
+            for future in futures:
+                future.result()
+        # Stitch chunks in row order
+        if processedTableFormat == "csv":
+            with OpenCsvFile(processedCsvPath, "wb") as processedCsv:
+                processedCsv.write(headers.encode(outputCsvEncoding))
+                for chunkCsvPath in chunkCsvPaths:
+                    with open(chunkCsvPath, mode="rb") as chunkCsv:
+                        shutil.copyfileobj(chunkCsv, processedCsv)
+        else:
+            WriteProcessedTable(GenerateRowStringsFromChunkCsvs(chunkCsvPaths, outputCsvEncoding), headers,
+                                processedCsvPath, processedTableFormat,
+                                AriaLabelCategorizer(AriaLabelCategories).ListCategories())
+    finally:
+        for chunkCsvPath in chunkCsvPaths:
+            if os.path.exists(chunkCsvPath):
+                os.remove(chunkCsvPath)
     print("Successfully saved: " + processedCsvPath)
+    return [processedCsvPath]
+
+
+## Process a session in memory
+## Raw csv (bytes, path or file object) -> Processed table (NumPy arrays or DataFrame)
+def CreateColumnArray(np, values, columnType):
+    # Empty cells are missing values (NaN, or None for strings)
+    if columnType == "int64" and "" not in values:
+        return np.fromiter(map(int, values), np.int64, len(values))
+    elif columnType == "int64" or columnType == "float64":
+        return np.fromiter((float(value or "nan") for value in values), np.float64, len(values))
+    return np.array([value if value != "" else None for value in values], dtype=object)
+
+def CreateProcessedArrays(rowStrings, processedHeaders):
+    import numpy as np
+    columnNames = processedHeaders.strip().split(",")
+    chunkArrays = {columnName: [] for columnName in columnNames}
+    for chunk in GenerateChunks(rowStrings, LFHFChunkRows):
+        columns = zip(*[SplitRowString(rowString.rstrip("\n")) for rowString in chunk])
+        for columnName, values in zip(columnNames, columns):
+            chunkArrays[columnName].append(CreateColumnArray(np, values, ProcessedTableColumnTypes.get(columnName, "string")))
+    # Columns with missing values in any chunk become float64
+    emptyArrays = {"int64": np.array([], dtype=np.int64), "float64": np.array([], dtype=np.float64)}
+    return {columnName: np.concatenate(arrays) if arrays
+            else emptyArrays.get(ProcessedTableColumnTypes.get(columnName), np.array([], dtype=object))
+            for columnName, arrays in chunkArrays.items()}
+
+class SessionProcessor:
+    # Runs all steps in memory without temporary files. The column mapping is found per raw csv,
+    # so one instance can process sessions concurrently (e.g. from threads of a worker)
+    def __init__(self, AriaLabelCategories=AriaLabelCategories, rawCsvEncoding="shift_jis",
+                 writeLFHFComputedRows=False, lfhfEngine="python"):
+        self.ariaLabelCategories = AriaLabelCategories
+        self.categorizer = AriaLabelCategorizer(AriaLabelCategories)
+        self.rawCsvEncoding = rawCsvEncoding
+        self.writeLFHFComputedRows = writeLFHFComputedRows
+        self.lfhfEngine = lfhfEngine
+
+    @contextlib.contextmanager
+    def OpenRawCsv(self, source):
+        # bytes, a path, or a text or binary file object
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            yield io.StringIO(bytes(source).decode(self.rawCsvEncoding), newline=None)
+        elif isinstance(source, (str, os.PathLike)):
+            with OpenCsvFile(source, "r", self.rawCsvEncoding) as rawCsv:
+                yield rawCsv
+        elif isinstance(source, io.TextIOBase):
+            yield source
+        else:
+            rawCsv = io.TextIOWrapper(source, encoding=self.rawCsvEncoding, newline=None)
+            try:
+                yield rawCsv
+            finally:
+                # Leave the file object of the caller open
+                rawCsv.detach()
+
+    def GenerateProcessedRowStrings(self, rawCsv):
+        # (headers, rows) of the processed csv from a raw csv opened via OpenRawCsv
+        filteredHeaders, rawCsvColumns = ReadHeadersFromRawCsv(rawCsv)
+        processedHeaders = CreateProcessedCsvHeadersFromFilteredCsv(filteredHeaders)
+        rowStrings = GenerateRowStringsFromRawCsv(rawCsv, rawCsvColumns)
+        rowStrings = GenerateProcessedRowStrings(rowStrings, self.ariaLabelCategories, self.categorizer,
+                                                 self.writeLFHFComputedRows, CreateStageStates(), self.lfhfEngine)
+        return processedHeaders, rowStrings
+
+    def ProcessToArrays(self, source):
+        # {column name: NumPy array} with the columns of the processed csv
+        with self.OpenRawCsv(source) as rawCsv:
+            processedHeaders, rowStrings = self.GenerateProcessedRowStrings(rawCsv)
+            return CreateProcessedArrays(rowStrings, processedHeaders)
+
+    def ProcessToDataFrame(self, source):
+        import pandas as pd
+        return pd.DataFrame(self.ProcessToArrays(source))
 
 
 # Main Function
-def Main(identifierString, rawCsvPath, rawCsvEncoding, outputCsvEncoding, outputDir, writeLFHFComputedRowsWhenInterpolateLFHF):
-    filteredCsvPath = outputDir + identifierString + "/" + identifierString + "_step_1_filtered_rows.csv"
+def Main(identifierString, rawCsvPath, rawCsvEncoding, outputCsvEncoding, outputDir, writeLFHFComputedRowsWhenInterpolateLFHF,
+         emitIntermediates=False, engine="python", lfhfEngine="python", processedTableFormat="csv",
+         follow=False, followInterval=1.0, followIdleTimeout=0.0, force=False, profile=False, profileWithCProfile=False,
+         startTime=None, endTime=None, chunkJobs=1, compression="none", processedOutputPath=None):
+    # rawCsvPath and processedOutputPath may be "-" for stdin/stdout
+    # Outputs of a window are named after it, next to those of the whole session
+    outputPathPrefix = outputDir + identifierString + "/" + identifierString
+    if startTime is not None or endTime is not None:
+        outputPathPrefix += CreateWindowSuffix(startTime, endTime)
+    filteredCsvPath = CreateCompressedPath(outputPathPrefix + "_step_1_filtered_rows.csv", compression)
     filteredCsvEncoding = outputCsvEncoding
-    filteredCsvColumns = {
-        "EventID": 0,
-        "AppTime": 1,
-        "ServerTime": 2,
-        "X": 3,
-        "Y": 4,
-        "AriaLabel": 5,
-        "LFHF": 6
-    }
-    categorizedCsvPath = outputDir + identifierString + "/" + identifierString + "_step_2_categorized.csv"
+    filteredCsvColumns = FilteredCsvColumns
+    categorizedCsvPath = CreateCompressedPath(outputPathPrefix + "_step_2_categorized.csv", compression)
     categorizedCsvEncoding = outputCsvEncoding
-    categorizedCsvColumns = {
-        "Number": 0,
-        "Event": 1,
-        "Category": 2,
-        "EventID": 3,
-        "AppTime": 4,
-        "ServerTime": 5,
-        "X": 6,
-        "Y": 7,
-        "AriaLabel": 8,
-        "LFHF": 9,
-        "TimeSpan": 10
-    }
-    interpolatedCsvPath = outputDir + identifierString + "/" + identifierString + "_step_3_interpolated_lfhf.csv"
+    categorizedCsvColumns = CategorizedCsvColumns
+    interpolatedCsvPath = CreateCompressedPath(outputPathPrefix + "_step_3_interpolated_lfhf.csv", compression)
     interpolatedCsvEncoding = outputCsvEncoding
-    interpolatedCsvColumns = {
-        "Number": 0,
-        "Event": 1,
-        "Category": 2,
-        "EventID": 3,
-        "AppTime": 4,
-        "ServerTime": 5,
-        "X": 6,
-        "Y": 7,
-        "AriaLabel": 8,
-        "LFHF": 9,
-        "TimeSpan": 10,
-        "InterpolatedLFHF": 11
-    }
-    processedCsvPath = outputDir + identifierString + "/" + identifierString + "_step_4_processed_lfhf.csv"
+    interpolatedCsvColumns = InterpolatedCsvColumns
+    processedCsvPath = outputPathPrefix + "_step_4_processed_lfhf." + processedTableFormat
+    if processedTableFormat == "csv":
+        processedCsvPath = CreateCompressedPath(processedCsvPath, compression)
+    if processedOutputPath is not None:
+        processedCsvPath = processedOutputPath
     processedCsvEncoding = outputCsvEncoding
 
-    FilterRows(rawCsvPath, rawCsvEncoding,
-               filteredCsvPath, filteredCsvEncoding)
-    Categorize(filteredCsvPath, filteredCsvEncoding, filteredCsvColumns,
-               categorizedCsvPath, categorizedCsvEncoding,
-               AriaLabelCategories)
-    InterpolateLFHF(categorizedCsvPath, categorizedCsvEncoding, categorizedCsvColumns,
-                    interpolatedCsvPath, interpolatedCsvEncoding,
-                    writeLFHFComputedRowsWhenInterpolateLFHF)
-    ProcessLFHF(interpolatedCsvPath, interpolatedCsvEncoding, interpolatedCsvColumns,
-                processedCsvPath, processedCsvEncoding)
+    if follow:
+        checkpointPath = outputPathPrefix + "_follow_checkpoint.json"
+        FollowRawCsv(rawCsvPath, rawCsvEncoding, processedCsvPath, processedCsvEncoding, checkpointPath,
+                     AriaLabelCategories, writeLFHFComputedRowsWhenInterpolateLFHF, followInterval, followIdleTimeout)
+        return
+
+    if rawCsvPath == "-" or processedCsvPath == "-":
+        # Streams cannot be hashed or skipped, so run every step without a manifest
+        ProcessAllStages(rawCsvPath, rawCsvEncoding,
+                         filteredCsvPath, filteredCsvColumns,
+                         categorizedCsvPath, categorizedCsvColumns,
+                         interpolatedCsvPath, interpolatedCsvColumns,
+                         processedCsvPath, processedCsvEncoding,
+                         AriaLabelCategories, writeLFHFComputedRowsWhenInterpolateLFHF, emitIntermediates,
+                         engine, lfhfEngine, processedTableFormat)
+        return
+
+    # Find the first stage whose input or options changed since the last run
+    manifestPath = outputPathPrefix + "_manifest.json"
+    stageOptions = [
+        {"rawCsvEncoding": rawCsvEncoding, "outputCsvEncoding": outputCsvEncoding},
+        {"outputCsvEncoding": outputCsvEncoding, "categoryTableVersion": CreateCategoryTableVersion(AriaLabelCategories)},
+        {"outputCsvEncoding": outputCsvEncoding, "writeLFHFComputedRows": writeLFHFComputedRowsWhenInterpolateLFHF},
+        {"outputCsvEncoding": outputCsvEncoding, "processedTableFormat": processedTableFormat}
+    ]
+    window = None
+    if startTime is not None or endTime is not None:
+        stageOptions[0]["window"] = [startTime, endTime]
+        window = {"startTime": startTime, "endTime": endTime}
+    if compression != "none":
+        for options in stageOptions:
+            options["compression"] = compression
+    stageOutputPaths = [filteredCsvPath, categorizedCsvPath, interpolatedCsvPath, processedCsvPath]
+    manifest = LoadManifest(manifestPath)
+    rawCsvIndex = None
+    if window is not None:
+        rawCsvIndex = LoadRawCsvIndex(rawCsvPath + ".index.json", rawCsvPath, rawCsvEncoding)
+        window["resumeRowNumber"], window["resumeOffset"] = FindRawCsvResumeRow(rawCsvIndex, startTime)
+        # A window reads a part of the raw csv through the index, which is rebuilt
+        # whenever the raw csv changes size or mtime, so these address its input instead of a hash
+        rawCsvHash = "size:%d,mtimeNs:%d" % (rawCsvIndex["rawCsvSize"], rawCsvIndex["rawCsvMtimeNs"])
+    else:
+        rawCsvHash = HashRawCsv(rawCsvPath, manifest)
+    stageRecords = CreateStageRecords(rawCsvHash, stageOptions, stageOutputPaths)
+    requestedSteps = [1, 2, 3, 4] if emitIntermediates else [4]
+    startStep = 1 if force else FindStepToStartFrom(manifest, stageRecords, requestedSteps)
+    stepRecords = None
+    if profile or profileWithCProfile:
+        profilePath = outputPathPrefix + "_profile.json"
+        stepInputPaths = [rawCsvPath, filteredCsvPath, categorizedCsvPath, interpolatedCsvPath]
+        stepRecords = [CreateStepRecord(step, name, profileWithCProfile)
+                       for step, name in enumerate(["FilterRows", "Categorize", "InterpolateLFHF", "ProcessLFHF"], 1)]
+    if startStep > len(stageRecords):
+        SaveManifest(manifestPath, manifest)
+        print("Up to date: " + processedCsvPath)
+        if stepRecords is not None:
+            # Nightly batches still get a report for the session, with every step marked as skipped
+            print("Profiling skipped: no step was rerun")
+            WriteProfileReport(profilePath, CreateProfileReport(stepRecords, stepInputPaths, [None] * len(stepRecords),
+                                                                startStep, 0.0, 0.0), stepRecords)
+        return
+    if chunkJobs > 1 and startStep == 1:
+        savedCsvPaths = ProcessAllStagesInChunks(rawCsvPath, rawCsvEncoding, processedCsvPath, processedCsvEncoding,
+                                                 AriaLabelCategories, writeLFHFComputedRowsWhenInterpolateLFHF,
+                                                 engine, lfhfEngine, processedTableFormat, rawCsvIndex, window, chunkJobs)
+        SaveManifest(manifestPath, UpdateManifest(manifest, stageRecords, startStep, savedCsvPaths))
+        return
+
+    if stepRecords is not None:
+        startedTime = time.perf_counter()
+        startedCPUTime = time.process_time()
+    savedCsvPaths = ProcessAllStages(rawCsvPath, rawCsvEncoding,
+                                     filteredCsvPath, filteredCsvColumns,
+                                     categorizedCsvPath, categorizedCsvColumns,
+                                     interpolatedCsvPath, interpolatedCsvColumns,
+                                     processedCsvPath, processedCsvEncoding,
+                                     AriaLabelCategories, writeLFHFComputedRowsWhenInterpolateLFHF, emitIntermediates,
+                                     engine, lfhfEngine, processedTableFormat, startStep, stepRecords, window)
+    SaveManifest(manifestPath, UpdateManifest(manifest, stageRecords, startStep, savedCsvPaths))
+    if stepRecords is not None:
+        stepOutputPaths = [path if path in savedCsvPaths else None for path in stageOutputPaths]
+        profileReport = CreateProfileReport(stepRecords, stepInputPaths, stepOutputPaths, startStep,
+                                            time.perf_counter() - startedTime, time.process_time() - startedCPUTime)
+        WriteProfileReport(profilePath, profileReport, stepRecords)
+
+
+# Batch Functions
+def ProcessSession(identifierString, sourcePath, outputDir, mainArgs):
+    # Run in a worker process: report the error instead of stopping the batch
+    try:
+        os.makedirs(outputDir + identifierString, exist_ok=True)
+        Main(identifierString, sourcePath, *mainArgs)
+        return None
+    except Exception:
+        return traceback.format_exc()
 
 
 if __name__ == "__main__":
@@ -306,9 +1763,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="ETA-Analyzer: CSV Processor",
                                      formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument("source", type=str,
-                        help="Raw csv file created via ETA-Browser")
-    parser.add_argument("-i", "--identifier", type=str, default=currentDatetimeString,
-                        help="Unique identifier for output csv files \n (default: YYYYMMDDhhmmss)")
+                        help="Raw csv file created via ETA-Browser (.gz/.bz2/.xz/.zst compressed, or - for stdin), \nor a directory / glob pattern of raw csv files (batch mode)")
+    parser.add_argument("-i", "--identifier", type=str, default=None,
+                        help="Unique identifier for output csv files \n (default: YYYYMMDDhhmmss, file name in batch mode)")
     parser.add_argument("-e", "--input-encoding", type=str, choices=["utf_8", "shift_jis"], default="shift_jis",
                         help="Encoding of the input csv file \n (default: shift_jis)")
     parser.add_argument("-d", "--output-dir", type=str, default="csvout",
@@ -317,12 +1774,99 @@ if __name__ == "__main__":
                         help="Encoding of output csv files \n (default: shift_jis)")
     parser.add_argument("--write-lfhf-computed", action="store_true",
                         help="Write \"LFHFComputed\" rows on \nLF/HF interpolation")
+    parser.add_argument("--emit-intermediates", action="store_true",
+                        help="Also write csv files of step 1-3 \n (default: only step 4 is written)")
+    parser.add_argument("--engine", type=str, choices=RawCsvEngines, default="python",
+                        help="Parser to read the raw csv file \n (default: python)")
+    parser.add_argument("--lfhf-engine", type=str, choices=LFHFEngines, default="python",
+                        help="Implementation of LF/HF interpolation and element LF/HF \n (default: python)")
+    parser.add_argument("-F", "--output-format", type=str, choices=ProcessedTableFormats, default="csv",
+                        help="File format of the processed (step 4) output file \n (default: csv)")
+    parser.add_argument("--follow", action="store_true",
+                        help="Keep processing rows appended to the raw csv file \nwhile ETA-Browser is recording, resuming from \nthe last checkpoint (only step 4 csv is written)")
+    parser.add_argument("--follow-interval", type=float, default=1.0,
+                        help="Seconds to wait for new rows on --follow \n (default: 1.0)")
+    parser.add_argument("--follow-idle-timeout", type=float, default=0.0,
+                        help="Stop --follow after this many seconds without new rows \n (default: 0.0, never stop)")
+    parser.add_argument("--force", action="store_true",
+                        help="Rerun all steps even if the manifest says \noutputs are up to date")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of sessions processed in parallel in batch mode \n (default: number of CPUs)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write wall/CPU time, rows, bytes and peak RSS of each step \nto <identifier>_profile.json")
+    parser.add_argument("--profile-cprofile", action="store_true",
+                        help="--profile and also dump cProfile stats of the slowest step")
+    parser.add_argument("--start", type=float, default=None,
+                        help="Process only rows from this Timestamp(App) in seconds, \nseeking through a cached index <source>.index.json \n (default: first row)")
+    parser.add_argument("--end", type=float, default=None,
+                        help="Process only rows before this Timestamp(App) in seconds \n (default: last row)")
+    parser.add_argument("-o", "--output", type=str, default=None,
+                        help="Path of the processed (step 4) output file, - for stdout \n (default: <output-dir>/<identifier>/<identifier>_step_4_processed_lfhf.<format>, \n <identifier>_window_<start>_<end>_step_4_... with --start/--end)")
+    parser.add_argument("--compress", type=str, choices=CompressionFormats, default="none",
+                        help="Compress csv outputs of each step (.gz/.bz2/.xz/.zst appended) \n (default: none)")
+    parser.add_argument("--chunk-jobs", type=int, default=1,
+                        help="Number of worker processes processing chunks \nof a single raw csv file (not in batch mode) \n (default: 1, process in a single pass)")
     args = parser.parse_args()
+    if args.follow and (args.emit_intermediates or args.output_format != "csv"):
+        parser.error("--follow writes only the step 4 csv file")
+    if args.follow and (args.profile or args.profile_cprofile):
+        parser.error("--profile measures a single pass, not --follow")
+    isBatch = IsBatchSource(args.source)
+    if isBatch and (args.identifier is not None or args.follow):
+        parser.error("-i/--identifier and --follow take a single source file")
+    if args.jobs < 1:
+        parser.error("-j/--jobs must be at least 1")
+    isWindowed = args.start is not None or args.end is not None
+    if isWindowed and (args.follow or args.emit_intermediates):
+        parser.error("--start/--end write only the step 4 output of the window, without --follow")
+    if isWindowed and args.engine not in ["python", "csv"]:
+        parser.error("--start/--end read the raw csv with the python or csv engine")
+    if args.chunk_jobs < 1:
+        parser.error("--chunk-jobs must be at least 1")
+    if args.chunk_jobs > 1 and (isBatch or args.follow or args.emit_intermediates
+                                or args.profile or args.profile_cprofile or args.engine not in ["python", "csv"]):
+        parser.error("--chunk-jobs takes a single source file and writes only the step 4 output, \n"
+                     "without --follow, --profile or the pandas/pyarrow engines")
+    if args.start is not None and args.end is not None and args.start >= args.end:
+        parser.error("--start must be before --end")
+    isStreamed = args.source == "-" or args.output == "-"
+    if not IsSeekableCsvPath(args.source) and (isWindowed or args.follow or args.chunk_jobs > 1):
+        parser.error("--start/--end, --follow and --chunk-jobs need an uncompressed source file")
+    if args.source == "-" and args.engine not in ["python", "csv"]:
+        parser.error("- (stdin) is read with the python or csv engine")
+    if args.output == "-" and args.output_format != "csv":
+        parser.error("-o - writes the step 4 csv to stdout")
+    if isStreamed and (args.profile or args.profile_cprofile):
+        parser.error("--profile measures files, not - (stdin/stdout)")
+    if args.follow and (args.compress != "none" or args.output is not None):
+        parser.error("--follow writes the step 4 csv file without --compress or -o")
+    if isBatch and args.output is not None:
+        parser.error("-o/--output takes a single source file")
+    startTime = round(args.start * 1000) if args.start is not None else None
+    endTime = round(args.end * 1000) if args.end is not None else None
 
     # Get output directory path
     formattedOutputDir = args.output_dir
     if args.output_dir[-1] != "/":
         formattedOutputDir = args.output_dir + "/"
-    os.makedirs(formattedOutputDir + args.identifier, exist_ok=True)
 
-    Main(args.identifier, args.source, args.input_encoding, args.output_encoding, formattedOutputDir, args.write_lfhf_computed)
+    mainArgs = (args.input_encoding, args.output_encoding, formattedOutputDir, args.write_lfhf_computed,
+                args.emit_intermediates, args.engine, args.lfhf_engine,
+                args.output_format, args.follow, args.follow_interval, args.follow_idle_timeout,
+                args.force, args.profile, args.profile_cprofile, startTime, endTime, args.chunk_jobs, args.compress)
+    if isBatch:
+        sourcePaths = ListSourcePaths(args.source, RawCsvFilePatterns)
+        identifiers = [CreateIdentifierFrom(sourcePath) for sourcePath in sourcePaths]
+        if not sourcePaths:
+            parser.error("no raw csv files found: " + args.source)
+        if len(set(identifiers)) != len(identifiers):
+            parser.error("file names of raw csv files must be unique in batch mode")
+        failedSessions = RunSessions(ProcessSession, sourcePaths, identifiers, formattedOutputDir, mainArgs, args.jobs, "Processed")
+        sys.exit(1 if failedSessions else 0)
+
+    identifierString = args.identifier if args.identifier is not None else currentDatetimeString
+    if args.output != "-" or args.emit_intermediates:
+        os.makedirs(formattedOutputDir + identifierString, exist_ok=True)
+    # Messages go to stderr while the processed csv is written to stdout
+    with contextlib.redirect_stdout(sys.stderr) if args.output == "-" else contextlib.nullcontext():
+        Main(identifierString, args.source, *mainArgs, args.output)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8-unix -*-
+# Python 3.9
+
+# ETA-Analyzer (Generate Raw CSV)
+# Generate synthetic raw csv files in the format of ETA-Browser for benchmarks
+
+
+# Modules
+## Built-in
+import os
+import argparse
+## Additional
+import numpy as np
+## Local
+from eta_csv_processor import AriaLabelCategories
+
+# Configs
+LabelDistributions = ["uniform", "zipf"]
+OtherElementLabels = ["ヘッダー ロゴ", "フッター リンク", "メニュー 戻る ボタン", "ページ 見出し"]
+NoiseColumnValues = ["div", "span", "button", "img", "a", "p"]
+GeneratedRowsPerChunk = 65536
+## Appended to aria-labels written as quoted fields (see --quoted-ratio)
+QuotedLabelSuffix = ", \"注文\""
+
+# Global Variables
+
+# Functions
+def CreateRawCsvHeaders(noiseColumns):
+    # Noise headers must not contain the substrings matched by eta_csv_processor.py
+    # ("EventID", "Timestamp(App)", "Timestamp(Server)", "X", "Y", aria-label, "LFHF")
+    headers = ["EventID", "Timestamp(App)", "Timestamp(Server)", "X", "Y",
+               "LeafSideElem(1): tag", "LeafSideElem(1): aria-label"]
+    headers += ["LeafSideElem(" + str(i + 2) + "): tag" for i in range(noiseColumns)]
+    headers += ["LFHF"]
+    return ",".join(headers) + "\n"
+
+def QuoteLabel(label):
+    # As written by csv writers: separators and quotes inside a field quoted
+    return "\"" + (label + QuotedLabelSuffix).replace("\"", "\"\"") + "\""
+
+def CreateLabelsAndWeights(AriaLabelCategories, labelDistribution, otherRatio, unknownRatio, quotedRatio=0.0):
+    # Labels of fixated elements and their probabilities:
+    # categorized elements, other elements (no identifier) and elements without aria-label,
+    # quotedRatio of the labelled ones written as quoted fields
+    categoryLabels = ["メニュー " + identifier + " ボタン" for identifier in AriaLabelCategories.values()]
+    if labelDistribution == "zipf":
+        categoryWeights = 1.0 / np.arange(1, len(categoryLabels) + 1)
+    else:
+        categoryWeights = np.ones(len(categoryLabels))
+    categoryWeights = categoryWeights / categoryWeights.sum() * (1.0 - otherRatio - unknownRatio)
+    otherWeights = np.full(len(OtherElementLabels), otherRatio / len(OtherElementLabels))
+    labels = categoryLabels + OtherElementLabels
+    weights = np.concatenate([categoryWeights, otherWeights])
+    if quotedRatio > 0:
+        labels = labels + [QuoteLabel(label) for label in labels]
+        weights = np.concatenate([weights * (1.0 - quotedRatio), weights * quotedRatio])
+    labels = labels + [""]
+    weights = np.concatenate([weights, [unknownRatio]])
+    return labels, weights / weights.sum()
+
+def GenerateRawRowStrings(rows, labels, weights, lfhfIntervalMs, meanFixationMs, noiseColumns, seed):
+    # Yields chunks of rows: FixationStarted (0) / FixationEnded (1) pairs
+    # and LFHFComputed (2) rows every lfhfIntervalMs, in time order
+    rng = np.random.default_rng(seed)
+    currentTime = 1000
+    nextLFHFTime = currentTime + lfhfIntervalMs
+    lfhf = 2.0
+    writtenRows = 0
+    while writtenRows < rows:
+        fixationCount = GeneratedRowsPerChunk // 2
+        gaps = rng.integers(20, 400, fixationCount)
+        durations = np.maximum(rng.gamma(2.0, meanFixationMs / 2.0, fixationCount).astype(np.int64), 20)
+        startTimes = currentTime + np.cumsum(gaps + np.concatenate([[0], durations[:-1]]))
+        endTimes = startTimes + durations
+        currentTime = int(endTimes[-1])
+        lfhfTimes = np.arange(nextLFHFTime, currentTime + 1, lfhfIntervalMs)
+        nextLFHFTime = int(lfhfTimes[-1]) + lfhfIntervalMs if len(lfhfTimes) > 0 else nextLFHFTime
+        # LF/HF as a bounded random walk
+        lfhfValues = np.empty(len(lfhfTimes))
+        for i, step in enumerate(rng.normal(0.0, 0.15, len(lfhfTimes))):
+            lfhf = min(max(lfhf + step, 0.3), 5.0)
+            lfhfValues[i] = lfhf
+
+        eventTimes = np.concatenate([startTimes, endTimes, lfhfTimes])
+        eventIDs = np.concatenate([np.zeros(fixationCount, dtype=np.int64), np.ones(fixationCount, dtype=np.int64),
+                                   np.full(len(lfhfTimes), 2, dtype=np.int64)])
+        order = np.lexsort((eventIDs, eventTimes))
+        eventTimes = eventTimes[order]
+        eventIDs = eventIDs[order]
+        labelIndices = rng.choice(len(labels), size=len(eventTimes), p=weights)
+        xs = rng.integers(0, 1920, len(eventTimes))
+        ys = rng.integers(0, 1080, len(eventTimes))
+        serverDelays = rng.integers(3, 8, len(eventTimes))
+        lfhfStrings = iter(["%.6f" % value for value in lfhfValues])
+        noiseString = ",".join(NoiseColumnValues[i % len(NoiseColumnValues)] for i in range(noiseColumns))
+        noiseString = noiseString + "," if noiseColumns > 0 else ""
+
+        rowStrings = []
+        for eventID, eventTime, labelIndex, x, y, serverDelay in zip(eventIDs.tolist(), eventTimes.tolist(), labelIndices.tolist(),
+                                                                     xs.tolist(), ys.tolist(), serverDelays.tolist()):
+            if writtenRows + len(rowStrings) >= rows:
+                break
+            if eventID == 0:
+                rowStrings.append("0,%d,%d,%d,%d,div,%s,%s\n" % (eventTime, eventTime + serverDelay, x, y, labels[labelIndex], noiseString))
+            elif eventID == 1:
+                rowStrings.append("1,%d,%d,%d,%d,div,,%s\n" % (eventTime, eventTime + serverDelay, x, y, noiseString))
+            else:
+                rowStrings.append("2,%d,%d,0,0,,,%s%s\n" % (eventTime, eventTime + serverDelay, noiseString, next(lfhfStrings)))
+        writtenRows += len(rowStrings)
+        yield "".join(rowStrings)
+
+def GenerateRawCsv(rawCsvPath, rawCsvEncoding, rows, labelDistribution="uniform", otherRatio=0.1, unknownRatio=0.05,
+                   lfhfIntervalMs=2000, meanFixationMs=250, noiseColumns=1, seed=0, quotedRatio=0.0):
+    labels, weights = CreateLabelsAndWeights(AriaLabelCategories, labelDistribution, otherRatio, unknownRatio, quotedRatio)
+    with open(rawCsvPath, mode="w", encoding=rawCsvEncoding, newline="") as rawCsv:
+        rawCsv.write(CreateRawCsvHeaders(noiseColumns))
+        rawCsv.writelines(GenerateRawRowStrings(rows, labels, weights, lfhfIntervalMs, meanFixationMs, noiseColumns, seed))
+    print("Successfully saved: " + rawCsvPath)
+
+
+# Main Function
+def Main(rawCsvPath, rawCsvEncoding, rows, labelDistribution, otherRatio, unknownRatio,
+         lfhfIntervalMs, meanFixationMs, noiseColumns, seed, quotedRatio):
+    outputDir = os.path.dirname(rawCsvPath)
+    if outputDir:
+        os.makedirs(outputDir, exist_ok=True)
+    GenerateRawCsv(rawCsvPath, rawCsvEncoding, rows, labelDistribution, otherRatio, unknownRatio,
+                   lfhfIntervalMs, meanFixationMs, noiseColumns, seed, quotedRatio)
+
+
+def ParseRowCount(string):
+    # 10k, 1M, 50M, 1000
+    multipliers = {"k": 1000, "m": 1000000}
+    if string[-1].lower() in multipliers:
+        return int(float(string[:-1]) * multipliers[string[-1].lower()])
+    return int(string)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETA-Analyzer: Raw CSV Generator",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("destination", type=str,
+                        help="Path of the raw csv file to generate")
+    parser.add_argument("-n", "--rows", type=ParseRowCount, default=100000,
+                        help="Number of rows (e.g. 10k, 1M) \n (default: 100000)")
+    parser.add_argument("-E", "--output-encoding", type=str, choices=["utf_8", "shift_jis"], default="shift_jis",
+                        help="Encoding of the generated csv file \n (default: shift_jis)")
+    parser.add_argument("--label-distribution", type=str, choices=LabelDistributions, default="uniform",
+                        help="Distribution of fixations over AriaLabelCategories \n (default: uniform)")
+    parser.add_argument("--other-ratio", type=float, default=0.1,
+                        help="Ratio of fixations on elements matching no category \n (default: 0.1)")
+    parser.add_argument("--unknown-ratio", type=float, default=0.05,
+                        help="Ratio of fixations on elements without aria-label \n (default: 0.05)")
+    parser.add_argument("--quoted-ratio", type=float, default=0.0,
+                        help="Ratio of aria-labels containing separators and quotes, \nwritten as quoted fields \n (default: 0.0)")
+    parser.add_argument("--lfhf-interval", type=int, default=2000,
+                        help="Milliseconds between LF/HF samples \n (default: 2000)")
+    parser.add_argument("--mean-fixation", type=int, default=250,
+                        help="Mean fixation duration in milliseconds \n (default: 250)")
+    parser.add_argument("--noise-columns", type=int, default=1,
+                        help="Number of extra columns not read by eta_csv_processor.py \n (default: 1)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the random generator \n (default: 0)")
+    args = parser.parse_args()
+    if args.other_ratio < 0 or args.unknown_ratio < 0 or args.other_ratio + args.unknown_ratio > 1:
+        parser.error("--other-ratio and --unknown-ratio must be non-negative and sum to at most 1")
+    if not 0 <= args.quoted_ratio <= 1:
+        parser.error("--quoted-ratio must be between 0 and 1")
+    if args.lfhf_interval < 1 or args.mean_fixation < 1 or args.noise_columns < 0:
+        parser.error("--lfhf-interval and --mean-fixation must be positive, --noise-columns non-negative")
+
+    Main(args.destination, args.output_encoding, args.rows, args.label_distribution, args.other_ratio, args.unknown_ratio,
+         args.lfhf_interval, args.mean_fixation, args.noise_columns, args.seed, args.quoted_ratio)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8-unix -*-
+# Python 3.9
+
+# ETA-Analyzer (Ingestion Load Generator)
+# Stream synthetic raw csv sessions to eta_ingestion_server.py as fake ETA-Browser clients
+
+
+# Modules
+## Built-in
+import os
+import argparse
+import asyncio
+import bisect
+import time
+## Local
+from eta_data_generator import LabelDistributions, CreateRawCsvHeaders, CreateLabelsAndWeights, GenerateRawRowStrings, ParseRowCount
+from eta_csv_processor import AriaLabelCategories
+from eta_ingestion_server import CreatePercentiles
+
+# Configs
+LoadBatchRows = 64
+PushedAppTimeColumn = 2
+
+# Global Variables
+
+# Functions
+def GenerateRawRows(rows, labelDistribution, seed):
+    # (AppTime, raw csv row) in time order
+    labels, weights = CreateLabelsAndWeights(AriaLabelCategories, labelDistribution, 0.1, 0.05)
+    for chunk in GenerateRawRowStrings(rows, labels, weights, 2000, 250, 1, seed):
+        for rowString in chunk.splitlines(keepends=True):
+            yield int(rowString.split(",", 2)[1]), rowString
+
+async def SendRawRows(writer, session, rows, labelDistribution, seed, speed, rawCsvEncoding, rawCsv):
+    # speed: app time per wall time (0: as fast as the server reads)
+    startedTime = time.perf_counter()
+    firstAppTime = None
+    batchRowStrings = []
+    for appTime, rowString in GenerateRawRows(rows, labelDistribution, seed):
+        if firstAppTime is None:
+            firstAppTime = appTime
+        dueTime = startedTime + (appTime - firstAppTime) / 1000.0 / speed if speed > 0 else 0.0
+        if batchRowStrings and (time.perf_counter() < dueTime or len(batchRowStrings) >= LoadBatchRows):
+            await WriteRawRows(writer, session, batchRowStrings, rawCsvEncoding, rawCsv)
+            batchRowStrings = []
+        if speed > 0 and time.perf_counter() < dueTime:
+            await asyncio.sleep(dueTime - time.perf_counter())
+        batchRowStrings.append((appTime, rowString))
+    if batchRowStrings:
+        await WriteRawRows(writer, session, batchRowStrings, rawCsvEncoding, rawCsv)
+    writer.write_eof()
+
+async def WriteRawRows(writer, session, batchRowStrings, rawCsvEncoding, rawCsv):
+    rowString = "".join(rowString for appTime, rowString in batchRowStrings)
+    writer.write(rowString.encode(rawCsvEncoding))
+    if rawCsv is not None:
+        rawCsv.write(rowString)
+    await writer.drain()
+    sentTime = time.perf_counter()
+    session["rowsSent"] += len(batchRowStrings)
+    for appTime, rowString in batchRowStrings:
+        # LFHFComputed rows complete the fixations before them
+        if rowString.startswith("2,"):
+            session["lfhfTimes"].append(appTime)
+            session["lfhfSentTimes"].append(sentTime)
+
+async def ReceiveResults(reader, session, outputCsvEncoding):
+    headers = (await reader.readline()).decode(outputCsvEncoding)
+    if not headers or headers.startswith("#error"):
+        raise ConnectionError("refused by the server: " + headers.strip())
+    while True:
+        rowBytes = await reader.readline()
+        if not rowBytes:
+            break
+        receivedTime = time.perf_counter()
+        appTime = int(rowBytes.decode(outputCsvEncoding).split(",")[PushedAppTimeColumn])
+        # The first LFHFComputed row at or after the fixation
+        lfhfIndex = bisect.bisect_left(session["lfhfTimes"], appTime)
+        if lfhfIndex < len(session["lfhfSentTimes"]):
+            session["latencies"].append(receivedTime - session["lfhfSentTimes"][lfhfIndex])
+        session["resultsReceived"] += 1
+
+async def RunSession(identifierString, host, port, unixSocketPath, rows, labelDistribution, seed, speed,
+                     rawCsvEncoding, outputCsvEncoding, rawCsvDir):
+    session = {"identifier": identifierString, "rowsSent": 0, "resultsReceived": 0,
+               "lfhfTimes": [], "lfhfSentTimes": [], "latencies": []}
+    if unixSocketPath is not None:
+        reader, writer = await asyncio.open_unix_connection(unixSocketPath)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    rawCsv = None
+    if rawCsvDir is not None:
+        rawCsv = open(os.path.join(rawCsvDir, identifierString + ".csv"), mode="w", encoding=rawCsvEncoding, newline="")
+        rawCsv.write(CreateRawCsvHeaders(1))
+    try:
+        writer.write(("#" + identifierString + "\n" + CreateRawCsvHeaders(1)).encode(rawCsvEncoding))
+        await asyncio.gather(SendRawRows(writer, session, rows, labelDistribution, seed, speed, rawCsvEncoding, rawCsv),
+                             ReceiveResults(reader, session, outputCsvEncoding))
+    finally:
+        writer.close()
+        if rawCsv is not None:
+            rawCsv.close()
+    return session
+
+
+# Main Function
+async def Main(host, port, unixSocketPath, sessions, rows, labelDistribution, seed, speed,
+               rawCsvEncoding, outputCsvEncoding, rawCsvDir=None):
+    startedTime = time.perf_counter()
+    results = await asyncio.gather(*[RunSession("load_" + str(i + 1), host, port, unixSocketPath, rows, labelDistribution,
+                                                seed + i, speed, rawCsvEncoding, outputCsvEncoding, rawCsvDir)
+                                     for i in range(sessions)], return_exceptions=True)
+    wallSeconds = time.perf_counter() - startedTime
+    latencies = []
+    rowsSent = 0
+    for i, session in enumerate(results):
+        if isinstance(session, Exception):
+            print("Failed: load_" + str(i + 1) + " (" + repr(session) + ")")
+            continue
+        latencies.extend(session["latencies"])
+        rowsSent += session["rowsSent"]
+        percentiles = CreatePercentiles(session["latencies"])
+        print(session["identifier"] + ": " + str(session["rowsSent"]) + " rows sent, "
+              + str(session["resultsReceived"]) + " results received, "
+              + ", ".join("latency " + name + ": " + ("-" if value is None else f"{value:.2f}") + " ms" for name, value in percentiles.items()))
+    percentiles = CreatePercentiles(latencies)
+    print("Total: " + str(rowsSent) + " rows in " + f"{wallSeconds:.2f}" + " s (" + f"{rowsSent / wallSeconds:.0f}" + " rows/s), "
+          + ", ".join("latency " + name + ": " + ("-" if value is None else f"{value:.2f}") + " ms" for name, value in percentiles.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETA-Analyzer: Ingestion Load Generator",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--host", type=str, default="127.0.0.1",
+                        help="Host of eta_ingestion_server.py \n (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="TCP port of eta_ingestion_server.py \n (default: 8765)")
+    parser.add_argument("--unix-socket", type=str, default=None,
+                        help="Connect to this Unix socket instead of TCP")
+    parser.add_argument("-c", "--sessions", type=int, default=4,
+                        help="Number of concurrent fake clients \n (default: 4)")
+    parser.add_argument("-n", "--rows", type=ParseRowCount, default=20000,
+                        help="Number of raw rows of each session (e.g. 10k, 1M) \n (default: 20000)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="App time per wall time, e.g. 10 replays ten times faster than recorded \n (default: 1.0, 0 sends as fast as the server reads)")
+    parser.add_argument("-e", "--input-encoding", type=str, choices=["utf_8", "shift_jis"], default="shift_jis",
+                        help="Encoding of the raw csv streams (-e of the server) \n (default: shift_jis)")
+    parser.add_argument("-E", "--output-encoding", type=str, choices=["utf_8", "shift_jis"], default="shift_jis",
+                        help="Encoding of pushed rows (-E of the server) \n (default: shift_jis)")
+    parser.add_argument("--label-distribution", type=str, choices=LabelDistributions, default="uniform",
+                        help="Distribution of fixations over AriaLabelCategories \n (default: uniform)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the first session, incremented per session \n (default: 0)")
+    parser.add_argument("--raw-csv-dir", type=str, default=None,
+                        help="Also save the sent raw csv files to this directory \n(e.g. to compare with eta_csv_processor.py)")
+    args = parser.parse_args()
+    if args.sessions < 1 or args.rows < 1:
+        parser.error("-c/--sessions and -n/--rows must be at least 1")
+    if args.speed < 0:
+        parser.error("--speed must be non-negative")
+    if args.raw_csv_dir is not None:
+        os.makedirs(args.raw_csv_dir, exist_ok=True)
+
+    asyncio.run(Main(args.host, args.port, args.unix_socket, args.sessions, args.rows, args.label_distribution,
+                     args.seed, args.speed, args.input_encoding, args.output_encoding, args.raw_csv_dir))
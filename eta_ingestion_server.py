@@ -0,0 +1,314 @@
+# -*- coding: utf-8-unix -*-
+# Python 3.9
+
+# ETA-Analyzer (Ingestion Server)
+# Process raw csv streams of ETA-Browser sessions in real time via eta_csv_processor.py
+# and push per-element LF/HF back to the clients
+
+
+# Modules
+## Built-in
+import sys
+import os
+import argparse
+import datetime
+import asyncio
+import collections
+import io
+import json
+import math
+import re
+import signal
+import time
+## Local
+from eta_csv_processor import (AriaLabelCategories, AriaLabelCategorizer, LFHFEngines, InterpolatedCsvColumns,
+                               ReadHeadersFromRawCsv, GenerateRowStringsFromRawCsv, GenerateProcessedRowStrings,
+                               CreateStageStates, CreateProcessedCsvHeadersFromFilteredCsv, SplitRowString, JoinRowFields)
+
+# Configs
+IngestionReadBytes = 65536
+IngestionStreamLimit = 1048576
+LatencySamples = 100000
+LatencyPercentiles = [50, 99]
+SessionIdentifierPattern = re.compile("^[A-Za-z0-9_.-]+$")
+ProcessedCsvColumns = dict(InterpolatedCsvColumns, ElementLFHF=12, ElementLFHFDelta=13)
+## Columns of processed FixationEnded rows pushed back to clients
+PushedCsvHeaders = "#,Category,AppTime,TimeSpan,LFHF(Element),LFHF(Element:Delta)\n"
+PushedCsvColumns = ["Number", "Category", "AppTime", "TimeSpan", "ElementLFHF", "ElementLFHFDelta"]
+
+# Global Variables
+
+# Functions
+## Protocol (per connection, in the input encoding):
+##   an optional "#<session identifier>" line, the raw csv headers, then raw csv rows as they are recorded.
+## The server answers PushedCsvHeaders and a row for each fixation with element LF/HF,
+## or a "#error: <message>" line before closing the connection.
+## A session reconnecting with the same identifier continues its stage states and processed csv file.
+def CreateServerState(maxSessions):
+    return {
+        "sessionSlots": asyncio.Semaphore(maxSessions),
+        "sessionIdentifiers": set(),
+        # Stage states of each session identifier, kept for reconnects
+        "sessionStageStates": {},
+        "connectionCount": 0,
+        # Totals and latencies since the last metrics report
+        "rowsIn": 0,
+        "resultsOut": 0,
+        "latencies": collections.deque(maxlen=LatencySamples)
+    }
+
+def CreateSessionIdentifier(serverState):
+    serverState["connectionCount"] += 1
+    return datetime.datetime.now().strftime("%Y%m%d%H%M%S") + "_" + str(serverState["connectionCount"])
+
+def CreatePercentiles(latencies):
+    # Nearest-rank percentiles in milliseconds
+    sortedLatencies = sorted(latencies)
+    if len(sortedLatencies) == 0:
+        return {"p" + str(p): None for p in LatencyPercentiles}
+    return {"p" + str(p): sortedLatencies[max(math.ceil(p / 100.0 * len(sortedLatencies)) - 1, 0)] * 1000.0
+            for p in LatencyPercentiles}
+
+def CreatePushedRowStrings(processedRowStrings):
+    pushedRowStrings = []
+    for rowString in processedRowStrings:
+        rowData = SplitRowString(rowString.rstrip("\n"))
+        if rowData[ProcessedCsvColumns["Event"]] == "FixationEnded":
+            pushedRowStrings.append(JoinRowFields([rowData[ProcessedCsvColumns[column]] for column in PushedCsvColumns]))
+    return pushedRowStrings
+
+def ProcessSessionBytes(session, completeBytes):
+    # Raw csv rows -> processed rows, with the stage states of the session carried over
+    rowStrings = GenerateRowStringsFromRawCsv(io.StringIO(completeBytes.decode(session["rawCsvEncoding"]), newline=None),
+                                              session["rawCsvColumns"])
+    return list(GenerateProcessedRowStrings(rowStrings, session["ariaLabelCategories"], session["categorizer"],
+                                            session["writeLFHFComputedRows"], session["stageStates"], session["lfhfEngine"]))
+
+async def CloseWriter(writer):
+    # Wait until written lines (e.g. "#error: ...") are sent and the transport is closed
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+
+async def PushRowStrings(writer, rowStrings, outputCsvEncoding):
+    # Waits while the client does not read: the session stops reading from it (backpressure)
+    writer.write("".join(rowStrings).encode(outputCsvEncoding))
+    await writer.drain()
+
+async def ReadSessionHeaders(reader, serverState, rawCsvEncoding):
+    firstLine = await reader.readline()
+    if firstLine.startswith(b"#"):
+        identifierString = firstLine[1:].decode(rawCsvEncoding).strip()
+        if not SessionIdentifierPattern.match(identifierString):
+            raise ValueError("invalid session identifier: " + identifierString)
+        headerBytes = await reader.readline()
+    else:
+        identifierString = CreateSessionIdentifier(serverState)
+        headerBytes = firstLine
+    if not headerBytes.endswith(b"\n"):
+        raise ValueError("no raw csv headers")
+    return identifierString, headerBytes
+
+def WriteSessionMetrics(metricsPath, session, wallSeconds):
+    metrics = {
+        "identifier": session["identifier"],
+        "wallSeconds": wallSeconds,
+        "bytesIn": session["bytesIn"],
+        "rowsIn": session["rowsIn"],
+        "resultsOut": session["resultsOut"],
+        # From reading raw rows to pushing the results they completed
+        "latencyMilliseconds": dict(CreatePercentiles(session["latencies"]),
+                                    max=max(session["latencies"]) * 1000.0 if session["latencies"] else None)
+    }
+    with open(metricsPath, mode="w", encoding="utf_8") as metricsFile:
+        json.dump(metrics, metricsFile, indent=2)
+    print("Successfully saved: " + metricsPath)
+
+async def HandleSession(reader, writer, serverState, serverOptions):
+    # Sessions over --max-sessions wait here without being read
+    async with serverState["sessionSlots"]:
+        try:
+            identifierString, headerBytes = await ReadSessionHeaders(reader, serverState, serverOptions["rawCsvEncoding"])
+        except (ValueError, UnicodeDecodeError, asyncio.LimitOverrunError) as error:
+            writer.write(("#error: " + str(error) + "\n").encode(serverOptions["outputCsvEncoding"]))
+            await CloseWriter(writer)
+            return
+        if identifierString in serverState["sessionIdentifiers"]:
+            writer.write(("#error: session already connected: " + identifierString + "\n").encode(serverOptions["outputCsvEncoding"]))
+            await CloseWriter(writer)
+            return
+        sessionDir = serverOptions["outputDir"] + identifierString + "/"
+        processedCsvPath = sessionDir + identifierString + "_step_4_processed_lfhf.csv"
+        stageStates = serverState["sessionStageStates"].get(identifierString)
+        if stageStates is None and os.path.exists(processedCsvPath):
+            # Saved before this server started: its stage states are lost, so the file cannot be continued
+            writer.write(("#error: session already saved: " + identifierString + "\n").encode(serverOptions["outputCsvEncoding"]))
+            await CloseWriter(writer)
+            return
+        serverState["sessionIdentifiers"].add(identifierString)
+        isReconnect = stageStates is not None
+        if not isReconnect:
+            stageStates = serverState["sessionStageStates"][identifierString] = CreateStageStates()
+        startedTime = time.perf_counter()
+        filteredHeaders, rawCsvColumns = ReadHeadersFromRawCsv(io.StringIO(headerBytes.decode(serverOptions["rawCsvEncoding"])))
+        processedHeaders = CreateProcessedCsvHeadersFromFilteredCsv(filteredHeaders)
+        session = dict(serverOptions, identifier=identifierString, rawCsvColumns=rawCsvColumns, stageStates=stageStates,
+                       bytesIn=len(headerBytes), rowsIn=0, resultsOut=0, latencies=collections.deque(maxlen=LatencySamples))
+        os.makedirs(sessionDir, exist_ok=True)
+        print(("Reconnected: " if isReconnect else "Connected: ") + identifierString)
+        loop = asyncio.get_running_loop()
+        isFinished = False
+        try:
+            # A reconnect appends to the rows saved so far
+            with open(processedCsvPath, mode="a" if isReconnect else "w", encoding=serverOptions["outputCsvEncoding"]) as processedCsv:
+                if not isReconnect:
+                    processedCsv.write(processedHeaders)
+                await PushRowStrings(writer, [PushedCsvHeaders], serverOptions["outputCsvEncoding"])
+                pendingBytes = b""
+                while True:
+                    newBytes = await reader.read(IngestionReadBytes)
+                    receivedTime = time.perf_counter()
+                    session["bytesIn"] += len(newBytes)
+                    if not newBytes:
+                        # The last row may have no newline
+                        if not pendingBytes:
+                            break
+                        newBytes = b"\n"
+                    pendingBytes += newBytes
+                    lastNewlineIndex = pendingBytes.rfind(b"\n")
+                    if lastNewlineIndex < 0:
+                        # No complete row yet
+                        continue
+                    completeBytes = pendingBytes[:lastNewlineIndex + 1]
+                    pendingBytes = pendingBytes[lastNewlineIndex + 1:]
+                    rowCount = completeBytes.count(b"\n")
+                    session["rowsIn"] += rowCount
+                    serverState["rowsIn"] += rowCount
+                    # In a worker thread, so that other sessions are read and pushed meanwhile
+                    processedRowStrings = await loop.run_in_executor(None, ProcessSessionBytes, session, completeBytes)
+                    if not processedRowStrings:
+                        continue
+                    # Persist as the step-4 csv of eta_csv_processor.py
+                    processedCsv.writelines(processedRowStrings)
+                    processedCsv.flush()
+                    pushedRowStrings = CreatePushedRowStrings(processedRowStrings)
+                    if pushedRowStrings:
+                        await PushRowStrings(writer, pushedRowStrings, serverOptions["outputCsvEncoding"])
+                        latency = time.perf_counter() - receivedTime
+                        session["resultsOut"] += len(pushedRowStrings)
+                        serverState["resultsOut"] += len(pushedRowStrings)
+                        session["latencies"].extend([latency] * len(pushedRowStrings))
+                        serverState["latencies"].extend([latency] * len(pushedRowStrings))
+            isFinished = True
+        except ConnectionError as error:
+            print("Disconnected: " + identifierString + " (" + str(error) + ")", file=sys.stderr)
+        except (ValueError, IndexError, KeyError) as error:
+            # Malformed raw csv rows (UnicodeDecodeError is a ValueError): tell the client before closing
+            print("Failed: " + identifierString + " (" + repr(error) + ")", file=sys.stderr)
+            writer.write(("#error: invalid raw csv rows: " + repr(error) + "\n").encode(serverOptions["outputCsvEncoding"], errors="replace"))
+        finally:
+            serverState["sessionIdentifiers"].discard(identifierString)
+            await CloseWriter(writer)
+            if isFinished:
+                print("Successfully saved: " + processedCsvPath)
+            WriteSessionMetrics(sessionDir + identifierString + "_ingestion_metrics.json", session,
+                                time.perf_counter() - startedTime)
+
+async def ReportMetrics(serverState, metricsInterval):
+    while True:
+        await asyncio.sleep(metricsInterval)
+        percentiles = CreatePercentiles(serverState["latencies"])
+        print("Sessions: " + str(len(serverState["sessionIdentifiers"]))
+              + ", rows in: " + f"{serverState['rowsIn'] / metricsInterval:.0f}" + "/s"
+              + ", results out: " + f"{serverState['resultsOut'] / metricsInterval:.0f}" + "/s"
+              + "".join(", latency " + name + ": " + ("-" if value is None else f"{value:.2f}") + " ms"
+                        for name, value in percentiles.items()))
+        serverState["rowsIn"] = 0
+        serverState["resultsOut"] = 0
+        serverState["latencies"].clear()
+
+
+# Main Function
+async def Main(host, port, unixSocketPath, rawCsvEncoding, outputCsvEncoding, outputDir, writeLFHFComputedRows=False,
+               lfhfEngine="python", maxSessions=64, metricsInterval=10.0):
+    serverState = CreateServerState(maxSessions)
+    serverOptions = {
+        "rawCsvEncoding": rawCsvEncoding,
+        "outputCsvEncoding": outputCsvEncoding,
+        "outputDir": outputDir,
+        "ariaLabelCategories": AriaLabelCategories,
+        "categorizer": AriaLabelCategorizer(AriaLabelCategories),
+        "writeLFHFComputedRows": writeLFHFComputedRows,
+        "lfhfEngine": lfhfEngine
+    }
+    async def HandleConnection(reader, writer):
+        try:
+            await HandleSession(reader, writer, serverState, serverOptions)
+        except asyncio.CancelledError:
+            # The server is stopping, the session has been saved
+            writer.close()
+    # limit: reading from a client pauses while its buffer is full
+    if unixSocketPath is not None:
+        server = await asyncio.start_unix_server(HandleConnection, path=unixSocketPath, limit=IngestionStreamLimit)
+    else:
+        server = await asyncio.start_server(HandleConnection, host=host, port=port, limit=IngestionStreamLimit)
+    print("Listening on: " + ", ".join(str(socket.getsockname()) for socket in server.sockets))
+    # Stop on SIGTERM as on Ctrl-C: sessions are closed and their metrics saved
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:
+        pass
+    metricsTask = asyncio.create_task(ReportMetrics(serverState, metricsInterval)) if metricsInterval > 0 else None
+    try:
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        if metricsTask is not None:
+            metricsTask.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETA-Analyzer: Ingestion Server",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--host", type=str, default="127.0.0.1",
+                        help="Host to listen on \n (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="TCP port to listen on \n (default: 8765)")
+    parser.add_argument("--unix-socket", type=str, default=None,
+                        help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("-e", "--input-encoding", type=str, choices=["utf_8", "shift_jis"], default="shift_jis",
+                        help="Encoding of the raw csv streams \n (default: shift_jis)")
+    parser.add_argument("-d", "--output-dir", type=str, default="csvout",
+                        help="The destination directory for processed csv files \n (default: csvout)")
+    parser.add_argument("-E", "--output-encoding", type=str, choices=["utf_8", "shift_jis"], default="shift_jis",
+                        help="Encoding of processed csv files and pushed rows \n (default: shift_jis)")
+    parser.add_argument("--write-lfhf-computed", action="store_true",
+                        help="Write LFHFComputed rows to processed csv files")
+    parser.add_argument("--lfhf-engine", type=str, choices=LFHFEngines, default="python",
+                        help="Engine of LF/HF interpolation and processing \n (default: python)")
+    parser.add_argument("--max-sessions", type=int, default=64,
+                        help="Number of sessions processed at once, \nfurther connections wait without being read \n (default: 64)")
+    parser.add_argument("--metrics-interval", type=float, default=10.0,
+                        help="Seconds between reports of throughput and p50/p99 latency \n (default: 10.0, 0 to disable)")
+    args = parser.parse_args()
+    if args.max_sessions < 1:
+        parser.error("--max-sessions must be at least 1")
+    if args.metrics_interval < 0:
+        parser.error("--metrics-interval must be non-negative")
+
+    # Get output directory path
+    formattedOutputDir = args.output_dir
+    if args.output_dir[-1] != "/":
+        formattedOutputDir = args.output_dir + "/"
+    os.makedirs(formattedOutputDir, exist_ok=True)
+
+    try:
+        asyncio.run(Main(args.host, args.port, args.unix_socket, args.input_encoding, args.output_encoding,
+                         formattedOutputDir, args.write_lfhf_computed, args.lfhf_engine, args.max_sessions,
+                         args.metrics_interval))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,43 @@
+# -*- coding: utf-8-unix -*-
+# Python 3.9
+
+# ETA-Analyzer (Resource Usage)
+# Peak memory and CPU time of processes for --profile of eta_csv_processor.py / eta_csv_plotter.py and eta_benchmark.py
+
+
+# Modules
+## Built-in
+import sys
+import os
+
+# Configs
+
+# Global Variables
+
+# Functions
+def ReadPeakRSSMegabytes():
+    # VmHWM of this process where available (Linux), otherwise ru_maxrss
+    # (VmHWM is reset on exec, while ru_maxrss keeps the high-water mark of the forking parent on Linux)
+    if os.path.exists("/proc/self/status"):
+        with open("/proc/self/status", mode="r") as statusFile:
+            for line in statusFile:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    return ReadMaxRSSMegabytes()
+
+def ReadMaxRSSMegabytes(children=False):
+    # ru_maxrss of this process, or of the largest waited child process; None without resource (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peakRSS = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peakRSS / 1024.0 / 1024.0 if sys.platform == "darwin" else peakRSS / 1024.0
+
+def ReadCPUSeconds(children=False):
+    # User and system CPU seconds of this process, or of waited child processes (0 on Windows)
+    processTimes = os.times()
+    if children:
+        return processTimes.children_user + processTimes.children_system
+    return processTimes.user + processTimes.system
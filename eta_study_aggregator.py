@@ -0,0 +1,446 @@
+# -*- coding: utf-8-unix -*-
+# Python 3.9
+
+# ETA-Analyzer (Aggregate Processed CSV)
+# Aggregate processed csv files of many sessions via eta_csv_processor.py into study-level summaries
+
+
+# Modules
+## Built-in
+import sys
+import os
+import argparse
+import datetime
+import re
+import math
+import concurrent.futures
+import traceback
+## Additional
+import pandas as pd
+import numpy as np
+## Additional (imported via ImportPlotModules only when figures are rendered)
+mpl = None
+plt = None
+## Local
+from eta_batch import ListSourcePaths, IsBatchSource, CreateIdentifierFrom
+from eta_csv_plotter import (ProcessedFilePatterns, ProcessedFileSuffix, CreatePlotStyle, WriteCategorySummary,
+                             SummaryFormats, Colormaps, PlotMarginFor4PlotsWithXCategories)
+
+# Configs
+AggregateChunkRows = 65536
+SketchRelativeAccuracy = 0.01
+AggregatedPercentiles = [5, 25, 75, 90, 95]
+## Metric name, column of processed csv files and name of its count column
+AggregatedMetrics = [
+    ("FixationTime", "TimeSpan", "FixationCount"),
+    ("LFHF", "LFHF(Element)", "LFHFCount"),
+    ("LFHFDelta", "LFHF(Element:Delta)", "LFHFDeltaCount")
+]
+
+# Global Variables
+ColumnsToAggregate = ["Category"] + [columnName for metricName, columnName, countName in AggregatedMetrics]
+PlotMarginFor2PlotsWithXCategoriesYParticipants = {
+    "figure.subplot.left": 0.12,
+    "figure.subplot.right": 0.95,
+    "figure.subplot.bottom": 0.28,
+    "figure.subplot.top": 0.93,
+    "figure.subplot.wspace": 0.3,
+    "figure.subplot.hspace": 0.2
+}
+
+# Functions
+## Mergeable reducer of a metric: memory depends on the value range, not on the number of rows
+class MetricReducer:
+    def __init__(self, relativeAccuracy=SketchRelativeAccuracy):
+        # Count, sum, min/max and mean/M2 of Welford's algorithm
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        # Quantile sketch (DDSketch): counts of logarithmic buckets,
+        # every quantile is within relativeAccuracy of a value of the stream
+        self.relativeAccuracy = relativeAccuracy
+        self.gamma = (1.0 + relativeAccuracy) / (1.0 - relativeAccuracy)
+        self.logGamma = math.log(self.gamma)
+        self.positiveBuckets = {}
+        self.negativeBuckets = {}
+        self.zeroCount = 0
+
+    def Update(self, values):
+        # values: float array without NaN
+        if len(values) == 0:
+            return
+        valuesMean = float(values.mean())
+        self.MergeMoments(len(values), float(values.sum()), valuesMean, float(np.square(values - valuesMean).sum()),
+                          float(values.min()), float(values.max()))
+        self.zeroCount += int(np.count_nonzero(values == 0))
+        for buckets, absoluteValues in ((self.positiveBuckets, values[values > 0]), (self.negativeBuckets, -values[values < 0])):
+            if len(absoluteValues) == 0:
+                continue
+            bucketKeys, bucketCounts = np.unique(np.ceil(np.log(absoluteValues) / self.logGamma).astype(np.int64), return_counts=True)
+            for bucketKey, bucketCount in zip(bucketKeys.tolist(), bucketCounts.tolist()):
+                buckets[bucketKey] = buckets.get(bucketKey, 0) + bucketCount
+
+    def Merge(self, other):
+        if other.relativeAccuracy != self.relativeAccuracy:
+            raise ValueError("cannot merge sketches of different relative accuracy")
+        self.MergeMoments(other.count, other.total, other.mean, other.m2, other.minimum, other.maximum)
+        self.zeroCount += other.zeroCount
+        for buckets, otherBuckets in ((self.positiveBuckets, other.positiveBuckets), (self.negativeBuckets, other.negativeBuckets)):
+            for bucketKey, bucketCount in otherBuckets.items():
+                buckets[bucketKey] = buckets.get(bucketKey, 0) + bucketCount
+
+    def MergeMoments(self, count, total, mean, m2, minimum, maximum):
+        # Parallel variant of Welford's algorithm (Chan et al.)
+        if count == 0:
+            return
+        mergedCount = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / mergedCount
+        self.m2 += m2 + delta * delta * self.count * count / mergedCount
+        self.count = mergedCount
+        self.total += total
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
+
+    def Variance(self):
+        # Sample variance as pandas (ddof=1)
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    def Quantile(self, q):
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        cumulativeCount = 0
+        # From the most negative bucket to the largest positive bucket
+        for bucketKey in sorted(self.negativeBuckets, reverse=True):
+            cumulativeCount += self.negativeBuckets[bucketKey]
+            if cumulativeCount > rank:
+                return max(-self.CreateBucketValue(bucketKey), self.minimum)
+        cumulativeCount += self.zeroCount
+        if cumulativeCount > rank:
+            return 0.0
+        for bucketKey in sorted(self.positiveBuckets):
+            cumulativeCount += self.positiveBuckets[bucketKey]
+            if cumulativeCount > rank:
+                return min(self.CreateBucketValue(bucketKey), self.maximum)
+        return self.maximum
+
+    def CreateBucketValue(self, bucketKey):
+        return 2.0 * self.gamma ** bucketKey / (self.gamma + 1.0)
+
+
+## Stream a processed file in chunks of rows
+def GenerateDataFramesFrom(processedPath, csvEncoding, columns, chunkRows):
+    extension = os.path.splitext(processedPath)[1].lower()
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+        parquetFile = pq.ParquetFile(processedPath)
+        try:
+            for recordBatch in parquetFile.iter_batches(batch_size=chunkRows, columns=columns):
+                yield recordBatch.to_pandas()
+        finally:
+            parquetFile.close()
+    elif extension == ".feather":
+        import pyarrow as pa
+        with pa.memory_map(processedPath) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).select(columns).to_pandas()
+    else:
+        # csv files are decompressed by pandas by extension (.gz/.bz2/.xz/.zst)
+        with pd.read_csv(processedPath, encoding=csvEncoding, usecols=columns, chunksize=chunkRows) as reader:
+            yield from reader
+
+def ReduceSessionFrom(processedPath, csvEncoding, chunkRows, relativeAccuracy):
+    # {(Category, metric name): MetricReducer} of a session
+    reducers = {}
+    for dfChunk in GenerateDataFramesFrom(processedPath, csvEncoding, ColumnsToAggregate, chunkRows):
+        for metricName, columnName, countName in AggregatedMetrics:
+            dfMetric = dfChunk[["Category", columnName]].dropna()
+            for category, values in dfMetric.groupby("Category", observed=True, sort=False)[columnName]:
+                reducer = reducers.get((category, metricName))
+                if reducer is None:
+                    reducer = reducers[(category, metricName)] = MetricReducer(relativeAccuracy)
+                reducer.Update(values.to_numpy(dtype=np.float64))
+    return reducers
+
+def ReduceSession(processedPath, csvEncoding, chunkRows, relativeAccuracy):
+    # Run in a worker process: report the error instead of stopping the study
+    try:
+        return ReduceSessionFrom(processedPath, csvEncoding, chunkRows, relativeAccuracy), None
+    except Exception:
+        return None, traceback.format_exc()
+
+def CreateParticipantFrom(identifierString, participantPattern):
+    # e.g. --participant-pattern "^(P[0-9]+)_" groups P01_day1 and P01_day2 as P01
+    if participantPattern is None:
+        return identifierString
+    match = re.search(participantPattern, identifierString)
+    if match is None:
+        return identifierString
+    return match.group(1) if match.groups() else match.group(0)
+
+def MergeReducersInto(mergedReducers, keyPrefix, reducers):
+    for key, reducer in reducers.items():
+        mergedKey = keyPrefix + key
+        if mergedKey in mergedReducers:
+            mergedReducers[mergedKey].Merge(reducer)
+        else:
+            mergedReducers[mergedKey] = reducer
+
+
+## Per-category tables of the study and of each participant
+def CreateSummaryColumnNames():
+    columnNames = []
+    for metricName, columnName, countName in AggregatedMetrics:
+        columnNames += [countName, "Total" + metricName, "Mean" + metricName, "Std" + metricName,
+                        "Min" + metricName, "Median" + metricName, "Max" + metricName]
+        columnNames += [metricName + "P" + str(p) for p in AggregatedPercentiles]
+    return columnNames
+
+def CreateSummaryColumns(metricName, countName, reducer):
+    summaryColumns = {
+        countName: reducer.count,
+        "Total" + metricName: reducer.total,
+        "Mean" + metricName: reducer.mean,
+        "Std" + metricName: math.sqrt(reducer.Variance()),
+        "Min" + metricName: reducer.minimum,
+        "Median" + metricName: reducer.Quantile(0.5),
+        "Max" + metricName: reducer.maximum
+    }
+    for p in AggregatedPercentiles:
+        summaryColumns[metricName + "P" + str(p)] = reducer.Quantile(p / 100.0)
+    return summaryColumns
+
+def CreateSummaryFrom(reducers, indexNames, sessionCounts):
+    # reducers: {(*index, metric name): MetricReducer}, sessionCounts: {index: number of sessions}
+    countNames = {metricName: countName for metricName, columnName, countName in AggregatedMetrics}
+    rows = {index: {"SessionCount": sessionCount} for index, sessionCount in sessionCounts.items()}
+    for key, reducer in reducers.items():
+        rows[key[:-1]].update(CreateSummaryColumns(key[-1], countNames[key[-1]], reducer))
+    dfSummary = pd.DataFrame([dict(zip(indexNames, index), **columns) for index, columns in rows.items()],
+                             columns=indexNames + ["SessionCount"] + CreateSummaryColumnNames())
+    # Categories without a metric (e.g. no element LF/HF): no values as CreateCategorySummary of eta_csv_plotter.py
+    for metricName, columnName, countName in AggregatedMetrics:
+        dfSummary[countName] = dfSummary[countName].fillna(0).astype(np.int64)
+        dfSummary["Total" + metricName] = dfSummary["Total" + metricName].fillna(0.0)
+    return dfSummary.set_index(indexNames).sort_index()
+
+def CreateStudySummary(studyReducers, studySessionCounts, dfParticipantSummary):
+    dfSummary = CreateSummaryFrom(studyReducers, ["Category"], studySessionCounts)
+    participantCounts = dfParticipantSummary.groupby(level="Category").size()
+    dfSummary.insert(0, "ParticipantCount", participantCounts.reindex(dfSummary.index).astype(np.int64))
+    return dfSummary
+
+
+## Figures
+def ImportPlotModules():
+    # matplotlib is slow to import and not needed for --stats-only
+    global mpl, plt
+    import matplotlib as mpl
+    import matplotlib.pyplot as plt
+
+def CreateBoxStatsFrom(dfSummary, metricName):
+    # Box of the sketch quantiles: P25/median/P75, whiskers at P5/P95
+    dfStats = dfSummary.dropna(subset=["Median" + metricName])
+    return [{"label": category, "med": row["Median" + metricName],
+             "q1": row[metricName + "P25"], "q3": row[metricName + "P75"],
+             "whislo": row[metricName + "P5"], "whishi": row[metricName + "P95"],
+             "mean": row["Mean" + metricName]}
+            for category, row in dfStats.iterrows()]
+
+def DrawParticipantMeans(ax, dfStudySummary, dfParticipantSummary, metricName):
+    # Mean of each participant per category
+    categories = dfStudySummary.index.tolist()
+    dfMeans = dfParticipantSummary["Mean" + metricName].dropna().reset_index()
+    positions = dfMeans["Category"].map({category: i for i, category in enumerate(categories)})
+    ax.scatter(positions, dfMeans["Mean" + metricName], s=12, alpha=0.6, color=mpl.colormaps[Colormaps[1]](0))
+    ax.set_xticks(range(len(categories)))
+    ax.set_xticklabels(categories, rotation=90)
+
+def ProcessStudySummary(identifier, dfStudySummary, dfParticipantSummary, figurePath, plotStyle,
+                        metricName, totalMetricName, metricLabel, totalMetricLabel, unitLabel):
+    dfTotal = dfStudySummary[["Total" + totalMetricName]].rename(columns={"Total" + totalMetricName: "Total " + totalMetricLabel})
+    dfMean = dfStudySummary["Mean" + metricName].dropna()
+    dfStd = dfStudySummary["Std" + metricName].reindex(dfMean.index).fillna(0.0)
+
+    with plt.rc_context(plotStyle), plt.rc_context(PlotMarginFor4PlotsWithXCategories):
+        currentFigSize = list(plt.rcParams["figure.figsize"])
+        multiFigSize = [currentFigSize[0] * 2, currentFigSize[1] * 2]
+        fig, axes = plt.subplots(nrows=2, ncols=2, figsize=tuple(multiFigSize))
+        dfTotal.plot(ax=axes[0, 0],
+                     kind="bar", title="Total " + totalMetricLabel + " by categories (" + identifier + ")", legend=None, grid=True,
+                     xlabel="Category of elements in HTML", ylabel="Total " + totalMetricLabel + unitLabel, colormap=Colormaps[0])
+        dfMean.plot(ax=axes[0, 1], yerr=dfStd, capsize=3,
+                    kind="bar", title="Mean " + metricLabel + " (±SD) by categories (" + identifier + ")", legend=None, grid=True,
+                    xlabel="Category of elements in HTML", ylabel="Mean " + metricLabel + unitLabel, colormap=Colormaps[1])
+        boxStats = CreateBoxStatsFrom(dfStudySummary, metricName)
+        if boxStats:
+            axes[1, 0].bxp(boxStats, showfliers=False, showmeans=True)
+            axes[1, 0].tick_params(axis="x", labelrotation=90)
+        axes[1, 0].set(title="Distribution of " + metricLabel + " by categories (" + identifier + ")",
+                       xlabel="Category of elements in HTML", ylabel=metricLabel.capitalize() + unitLabel)
+        axes[1, 0].grid(True)
+        DrawParticipantMeans(axes[1, 1], dfStudySummary, dfParticipantSummary, metricName)
+        axes[1, 1].set(title="Mean " + metricLabel + " of participants by categories (" + identifier + ")",
+                       xlabel="Category of elements in HTML", ylabel="Mean " + metricLabel + unitLabel)
+        axes[1, 1].grid(True)
+        plt.savefig(figurePath)
+    plt.close("all")
+    print("Successfully saved: " + figurePath)
+
+def ProcessStudyFixationTimeSummary(identifier, dfStudySummary, dfParticipantSummary, figurePath, plotStyle):
+    ProcessStudySummary(identifier, dfStudySummary, dfParticipantSummary, figurePath, plotStyle,
+                        "FixationTime", "FixationTime", "fixation time", "fixation time", " [ms]")
+
+def ProcessStudyLFHFSummary(identifier, dfStudySummary, dfParticipantSummary, figurePath, plotStyle):
+    ProcessStudySummary(identifier, dfStudySummary, dfParticipantSummary, figurePath, plotStyle,
+                        "LFHF", "LFHFDelta", "LF/HF", "LF/HF delta", "")
+
+def ProcessParticipantCategoryHeatmaps(identifier, dfStudySummary, dfParticipantSummary, figurePath, plotStyle):
+    categories = dfStudySummary.index.tolist()
+    with plt.rc_context(plotStyle), plt.rc_context(PlotMarginFor2PlotsWithXCategoriesYParticipants):
+        currentFigSize = list(plt.rcParams["figure.figsize"])
+        fig, axes = plt.subplots(nrows=1, ncols=2, figsize=(currentFigSize[0] * 2, currentFigSize[1]))
+        for ax, columnName, metricLabel in ((axes[0], "MeanFixationTime", "Mean fixation time [ms]"), (axes[1], "MeanLFHF", "Mean LF/HF")):
+            dfMeans = dfParticipantSummary[columnName].unstack("Category").reindex(columns=categories)
+            image = ax.imshow(np.ma.masked_invalid(dfMeans.to_numpy(dtype=np.float64)), aspect="auto", interpolation="nearest")
+            fig.colorbar(image, ax=ax, label=metricLabel)
+            ax.set_xticks(range(len(categories)))
+            ax.set_xticklabels(categories, rotation=90)
+            # Labels of many participants do not fit
+            if len(dfMeans.index) <= 50:
+                ax.set_yticks(range(len(dfMeans.index)))
+                ax.set_yticklabels(dfMeans.index)
+            ax.set(title=metricLabel + " by participants and categories (" + identifier + ")",
+                   xlabel="Category of elements in HTML", ylabel="Participant")
+        plt.savefig(figurePath)
+    plt.close("all")
+    print("Successfully saved: " + figurePath)
+
+
+# Main Function
+def Main(identifierString, sourcePaths, csvEncoding, outputDir, outputFormat, plotStyle, jobs=1,
+         summaryFormat="csv", statsOnly=False, participantPattern=None,
+         chunkRows=AggregateChunkRows, relativeAccuracy=SketchRelativeAccuracy):
+    # Reducers of the study and of each participant, merged session by session in the order of sourcePaths
+    studyReducers = {}
+    participantReducers = {}
+    studySessionCounts = {}
+    participantSessionCounts = {}
+    failedSessions = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(ReduceSession, sourcePath, csvEncoding, chunkRows, relativeAccuracy) for sourcePath in sourcePaths]
+        for sourcePath, future in zip(sourcePaths, futures):
+            sessionIdentifier = CreateIdentifierFrom(sourcePath, ProcessedFileSuffix)
+            try:
+                reducers, errorString = future.result()
+            except Exception:
+                # The worker itself died (e.g. killed by the OS)
+                reducers, errorString = None, traceback.format_exc()
+            if errorString is not None:
+                print("Failed: " + sessionIdentifier + " (" + sourcePath + ")\n" + errorString, file=sys.stderr)
+                failedSessions.append(sessionIdentifier)
+                continue
+            participant = CreateParticipantFrom(sessionIdentifier, participantPattern)
+            for category in set(category for category, metricName in reducers):
+                studySessionCounts[(category,)] = studySessionCounts.get((category,), 0) + 1
+                participantSessionCounts[(participant, category)] = participantSessionCounts.get((participant, category), 0) + 1
+            # Session reducers are merged into the participant first, copies go into the study
+            MergeReducersInto(participantReducers, (participant,), reducers)
+            for key, reducer in reducers.items():
+                studyReducer = studyReducers.get(key)
+                if studyReducer is None:
+                    studyReducer = studyReducers[key] = MetricReducer(relativeAccuracy)
+                studyReducer.Merge(reducer)
+            print("Succeeded: " + sessionIdentifier + " (" + sourcePath + ")")
+    print("Aggregated " + str(len(sourcePaths)) + " sessions: "
+          + str(len(sourcePaths) - len(failedSessions)) + " succeeded, " + str(len(failedSessions)) + " failed")
+
+    # Category summaries
+    dfParticipantSummary = CreateSummaryFrom(participantReducers, ["Participant", "Category"], participantSessionCounts)
+    dfStudySummary = CreateStudySummary(studyReducers, studySessionCounts, dfParticipantSummary)
+    WriteCategorySummary(dfStudySummary, outputDir + identifierString + "/" + identifierString + "_study_category_summary." + summaryFormat,
+                         summaryFormat, csvEncoding)
+    WriteCategorySummary(dfParticipantSummary, outputDir + identifierString + "/" + identifierString + "_participant_category_summary." + summaryFormat,
+                         summaryFormat, csvEncoding)
+    if statsOnly or dfStudySummary.empty:
+        return failedSessions
+
+    ImportPlotModules()
+    figures = [
+        # Study fixation time summary
+        (ProcessStudyFixationTimeSummary, outputDir + identifierString + "/" + identifierString + "_study_fixation_time_summary." + outputFormat),
+        # Study LF/HF summary
+        (ProcessStudyLFHFSummary, outputDir + identifierString + "/" + identifierString + "_study_lfhf_summary." + outputFormat),
+        # Participant and category heatmaps
+        (ProcessParticipantCategoryHeatmaps, outputDir + identifierString + "/" + identifierString + "_participant_category_heatmaps." + outputFormat)
+    ]
+    for processFigure, figurePath in figures:
+        processFigure(identifierString, dfStudySummary, dfParticipantSummary, figurePath, plotStyle)
+    return failedSessions
+
+
+if __name__ == "__main__":
+    currentDatetime = datetime.datetime.now()
+    currentDatetimeString = currentDatetime.strftime("%Y%m%d%H%M%S")
+
+    parser = argparse.ArgumentParser(description="ETA-Analyzer: Study Aggregator",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("source", type=str,
+                        help="Directory (searched recursively) or glob pattern of processed csv \n(.gz/.bz2/.xz/.zst compressed) or parquet/feather files created via eta_csv_processor.py")
+    parser.add_argument("-i", "--identifier", type=str, default=None,
+                        help="Unique identifier of the study for output files \n (default: YYYYMMDDhhmmss)")
+    parser.add_argument("-e", "--input-encoding", type=str, choices=["utf_8", "shift_jis"], default="shift_jis",
+                        help="Encoding of the input csv files and the summaries \n (default: shift_jis)")
+    parser.add_argument("-d", "--output-dir", type=str, default="studyout",
+                        help="The destination directory for output files \n (default: studyout)")
+    parser.add_argument("-F", "--output-format", type=str, choices=["png", "pdf", "svg"], default="png",
+                        help="File format of output image files \n (default: png)")
+    parser.add_argument("-S", "--output-size", type=float, nargs=2, default=[8, 6],
+                        help="Output size for figures in images \n (default: 8 6)")
+    parser.add_argument("-D", "--output-dpi", type=float, default=300.0,
+                        help="Output DPI \n (default: 300.0)")
+    parser.add_argument("-G", "--output-grid-disable", action="store_true",
+                        help="Disable grid on figures on output images")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of sessions read in parallel \n (default: number of CPUs)")
+    parser.add_argument("-p", "--participant-pattern", type=str, default=None,
+                        help="Regular expression on file names selecting the participant of a session \n(the first group, or the whole match), e.g. \"^(P[0-9]+)_\" \n (default: None, every session is a participant)")
+    parser.add_argument("--summary-format", type=str, choices=SummaryFormats, default="csv",
+                        help="File format of the per-category summaries \n (default: csv)")
+    parser.add_argument("--stats-only", action="store_true",
+                        help="Write only the per-category summaries, \nwithout importing matplotlib or rendering figures")
+    parser.add_argument("--chunk-rows", type=int, default=AggregateChunkRows,
+                        help="Number of rows read at once from a processed file \n (default: " + str(AggregateChunkRows) + ")")
+    parser.add_argument("--relative-accuracy", type=float, default=SketchRelativeAccuracy,
+                        help="Relative accuracy of the approximate median and percentiles \n (default: " + str(SketchRelativeAccuracy) + ")")
+    args = parser.parse_args()
+    if args.jobs < 1 or args.chunk_rows < 1:
+        parser.error("-j/--jobs and --chunk-rows must be at least 1")
+    if not 0 < args.relative_accuracy < 1:
+        parser.error("--relative-accuracy must be between 0 and 1")
+    if args.participant_pattern is not None:
+        try:
+            re.compile(args.participant_pattern)
+        except re.error as error:
+            parser.error("invalid --participant-pattern: " + str(error))
+    sourcePaths = ListSourcePaths(args.source, ProcessedFilePatterns, recursive=True) if IsBatchSource(args.source) else [args.source]
+    if not sourcePaths:
+        parser.error("no processed files found: " + args.source)
+
+    # Get output directory path
+    formattedOutputDir = args.output_dir
+    if args.output_dir[-1] != "/":
+        formattedOutputDir = args.output_dir + "/"
+    identifierString = args.identifier if args.identifier is not None else currentDatetimeString
+    os.makedirs(formattedOutputDir + identifierString, exist_ok=True)
+
+    plotStyle = CreatePlotStyle(args.output_size, args.output_dpi, args.output_grid_disable)
+    failedSessions = Main(identifierString, sourcePaths, args.input_encoding, formattedOutputDir, args.output_format,
+                          plotStyle, args.jobs, args.summary_format, args.stats_only, args.participant_pattern,
+                          args.chunk_rows, args.relative_accuracy)
+    sys.exit(1 if failedSessions else 0)